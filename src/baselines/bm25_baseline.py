@@ -0,0 +1,325 @@
+"""BM25 baseline search engine over a compact, array-backed inverted index."""
+
+import json
+import math
+import os
+from array import array
+from collections import Counter
+from itertools import accumulate
+
+from src.baselines.text import iter_opinion_texts, tokenize
+from src.baselines.topk import PruningStats, TermPostings, exhaustive_top_k, maxscore_top_k
+from src.corpus import DEFAULT_STORE_PATH, corpus_fingerprint, load_sections, save_sections
+from src.interface import SearchEngine
+
+
+DEFAULT_INDEX_PATH = "data/bm25.idx"
+SNAPSHOT_INDEX = "bm25.idx"
+SNAPSHOT_PARAMS = "params.json"
+INDEX_MAGIC = b"FPPCBM25"
+INDEX_VERSION = 2
+PRUNING_STRATEGIES = ("maxscore", "exhaustive")
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+
+
+class BM25Index:
+    """Inverted index with integer doc IDs and delta-encoded postings.
+
+    Postings for every term are stored back to back in flat typed arrays:
+
+        postings_offsets  uint64[num_terms + 1]  start of each term's postings
+        doc_deltas        uint32[num_postings]   doc ID gaps (first entry absolute)
+        term_freqs        uint16[num_postings]   in-document term frequency
+        doc_lengths       uint32[num_docs]       token count per document
+        max_scores        float64[num_terms]     largest tf * (k1 + 1) / (tf + norm) in each
+                                                 term's postings, for the build's k1/b
+
+    max_scores gives query processors a tight bound on each term's BM25
+    contribution without scanning its postings (see src/baselines/topk.py).
+
+    Saved indexes are memory-mapped on load, so opening one costs only the
+    vocabulary and doc ID tables. The meta also records the corpus
+    fingerprint (see corpus.corpus_fingerprint) the index was built from.
+    """
+
+    def __init__(
+        self,
+        doc_ids: list[str],
+        terms: list[str],
+        doc_lengths,
+        postings_offsets,
+        doc_deltas,
+        term_freqs,
+        max_scores,
+        bound_params: tuple[float, float],
+        corpus: dict | None = None,
+    ):
+        self.doc_ids = doc_ids
+        self.terms = terms
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.doc_lengths = doc_lengths
+        self.postings_offsets = postings_offsets
+        self.doc_deltas = doc_deltas
+        self.term_freqs = term_freqs
+        self.max_scores = max_scores
+        self.bound_params = tuple(bound_params)
+        self.corpus = corpus
+        self.num_docs = len(doc_ids)
+        self.avg_doc_length = (sum(doc_lengths) / self.num_docs) if self.num_docs else 0.0
+        self._mm = None
+
+    @classmethod
+    def build(cls, documents, k1: float = DEFAULT_K1, b: float = DEFAULT_B) -> "BM25Index":
+        """Build an index from an iterable of (opinion_id, text) pairs.
+
+        k1 and b only determine the stored per-term score bounds; engines with
+        other parameters still score correctly (see BM25Baseline.upper_bound).
+        """
+        doc_ids = []
+        doc_lengths = array("I")
+        term_docs = {}
+        term_tfs = {}
+        for doc, (opinion_id, text) in enumerate(documents):
+            tokens = tokenize(text)
+            doc_ids.append(opinion_id)
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                if term not in term_docs:
+                    term_docs[term] = array("I")
+                    term_tfs[term] = array("H")
+                term_docs[term].append(doc)
+                term_tfs[term].append(min(tf, 0xFFFF))
+
+        avgdl = ((sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0) or 1.0
+        norms = [k1 * (1.0 - b + b * dl / avgdl) for dl in doc_lengths]
+
+        terms = sorted(term_docs)
+        postings_offsets = array("Q", [0])
+        doc_deltas = array("I")
+        term_freqs = array("H")
+        max_scores = array("d")
+        for term in terms:
+            docs = term_docs.pop(term)
+            tfs = term_tfs.pop(term)
+            prev = 0
+            for doc in docs:
+                doc_deltas.append(doc - prev)
+                prev = doc
+            term_freqs.extend(tfs)
+            postings_offsets.append(len(doc_deltas))
+            max_scores.append(max_term_score(docs, tfs, norms, k1))
+
+        return cls(
+            doc_ids, terms, doc_lengths, postings_offsets, doc_deltas, term_freqs,
+            max_scores, (k1, b),
+        )
+
+    def document_frequency(self, term_id: int) -> int:
+        return self.postings_offsets[term_id + 1] - self.postings_offsets[term_id]
+
+    def postings(self, term_id: int):
+        """Return (doc IDs, term frequencies) for a term, doc IDs decoded from deltas."""
+        start = self.postings_offsets[term_id]
+        end = self.postings_offsets[term_id + 1]
+        return accumulate(self.doc_deltas[start:end]), self.term_freqs[start:end]
+
+    # -- persistence --------------------------------------------------------
+
+    def _sections(self) -> dict:
+        return {
+            "doc_lengths": self.doc_lengths,
+            "postings_offsets": self.postings_offsets,
+            "doc_deltas": self.doc_deltas,
+            "term_freqs": self.term_freqs,
+            "max_scores": self.max_scores,
+        }
+
+    def save(self, path: str):
+        """Write the index to path (replaced atomically)."""
+        save_sections(path, INDEX_MAGIC, INDEX_VERSION, self._sections(), {
+            "doc_ids": self.doc_ids,
+            "terms": self.terms,
+            "bound_params": list(self.bound_params),
+            "corpus": self.corpus,
+        })
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Memory-map an index written by save().
+
+        Raises:
+            ValueError: If the file is not a BM25 index of the current version.
+        """
+        mm, arrays, meta = load_sections(path, INDEX_MAGIC, INDEX_VERSION, "BM25 index")
+        index = cls(
+            meta["doc_ids"], meta["terms"], bound_params=meta["bound_params"], corpus=meta.get("corpus"), **arrays,
+        )
+        index._mm = mm
+        return index
+
+
+def max_term_score(docs, tfs, norms, k1: float) -> float:
+    """Largest tf * (k1 + 1) / (tf + norm) over one term's postings (IDF excluded)."""
+    k1_plus_1 = k1 + 1.0
+    return max(tf * k1_plus_1 / (tf + norms[doc]) for doc, tf in zip(docs, tfs))
+
+
+class BM25Baseline(SearchEngine):
+    """Okapi BM25 over embedding.qa_text (falling back to content.full_text).
+
+    The index is built from the corpus store (or data_dir) on first use and
+    saved to index_path; later runs memory-map it instead of rebuilding,
+    unless the corpus fingerprint stored in it no longer matches the corpus.
+
+    Top-k retrieval uses MaxScore dynamic pruning by default, which returns
+    the same ranking as exhaustive scoring while skipping most postings of
+    long queries. Pass pruning="exhaustive" to score every posting.
+
+    Supports scorer snapshots: save_state copies the index next to the
+    engine parameters, and load_state memory-maps it. with_params shares
+    the loaded index across k1/b/pruning settings in a sweep.
+    """
+
+    def __init__(
+        self,
+        data_dir: str = "data/extracted",
+        index_path: str = DEFAULT_INDEX_PATH,
+        store_path: str = DEFAULT_STORE_PATH,
+        k1: float = DEFAULT_K1,
+        b: float = DEFAULT_B,
+        pruning: str = PRUNING_STRATEGIES[0],
+    ):
+        if pruning not in PRUNING_STRATEGIES:
+            raise ValueError(f"Unknown pruning strategy '{pruning}' (expected one of {PRUNING_STRATEGIES})")
+        self.index = None
+        corpus = corpus_fingerprint(data_dir, store_path)
+        if os.path.isfile(index_path):
+            try:
+                self.index = BM25Index.load(index_path)
+            except ValueError:
+                print(f"Warning: '{index_path}' is stale or not a BM25 index — rebuilding")
+            # Without a corpus to compare against (or rebuild from), keep the index
+            if self.index is not None and corpus is not None and self.index.corpus != corpus:
+                print(f"Warning: '{index_path}' was built from a different corpus — rebuilding")
+                self.index = None
+        if self.index is None:
+            self.index = BM25Index.build(iter_opinion_texts(data_dir, store_path), k1=k1, b=b)
+            if not self.index.num_docs:
+                raise RuntimeError(f"No opinions found to index in '{data_dir}'")
+            self.index.corpus = corpus
+            os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+            self.index.save(index_path)
+        self._configure(k1, b, pruning)
+
+    def _configure(self, k1: float, b: float, pruning: str):
+        """Set the scoring parameters for self.index."""
+        if pruning not in PRUNING_STRATEGIES:
+            raise ValueError(f"Unknown pruning strategy '{pruning}' (expected one of {PRUNING_STRATEGIES})")
+        self.k1 = k1
+        self.b = b
+        self.pruning = pruning
+        # Length normalization depends only on the document, so precompute it
+        avgdl = self.index.avg_doc_length or 1.0
+        self._bound_cache = {}
+        self._norms = [k1 * (1.0 - b + b * dl / avgdl) for dl in self.index.doc_lengths]
+
+    def with_params(self, **params) -> "BM25Baseline":
+        """Share this engine's index with another k1/b/pruning setting.
+
+        Parameters that select the index (data_dir, index_path, store_path)
+        fall back to full construction.
+        """
+        if params.keys() & {"data_dir", "index_path", "store_path"}:
+            return super().with_params(**params)
+        unknown = params.keys() - {"k1", "b", "pruning"}
+        if unknown:
+            raise TypeError(f"BM25Baseline got unexpected parameters {sorted(unknown)}")
+        engine = type(self).__new__(type(self))
+        engine.index = self.index
+        engine._configure(
+            params.get("k1", DEFAULT_K1), params.get("b", DEFAULT_B), params.get("pruning", PRUNING_STRATEGIES[0]),
+        )
+        return engine
+
+    def save_state(self, path: str):
+        self.index.save(os.path.join(path, SNAPSHOT_INDEX))
+        with open(os.path.join(path, SNAPSHOT_PARAMS), "w") as f:
+            json.dump({"k1": self.k1, "b": self.b, "pruning": self.pruning}, f)
+
+    @classmethod
+    def load_state(cls, path: str) -> "BM25Baseline":
+        with open(os.path.join(path, SNAPSHOT_PARAMS), "r") as f:
+            params = json.load(f)
+        engine = cls.__new__(cls)
+        engine.index = BM25Index.load(os.path.join(path, SNAPSHOT_INDEX))
+        engine._configure(params["k1"], params["b"], params["pruning"])
+        return engine
+
+    def idf(self, term_id: int) -> float:
+        """Lucene-style BM25 IDF, always positive."""
+        df = self.index.document_frequency(term_id)
+        return math.log(1.0 + (self.index.num_docs - df + 0.5) / (df + 0.5))
+
+    def query_terms(self, query: str) -> list[int]:
+        """Unique in-vocabulary term IDs of a query, in first-occurrence order."""
+        term_ids = self.index.term_ids
+        return [term_ids[t] for t in dict.fromkeys(tokenize(query)) if t in term_ids]
+
+    def score_all(self, query: str) -> dict[int, float]:
+        """Exhaustively score every posting of every query term (term-at-a-time)."""
+        scores = {}
+        norms = self._norms
+        k1_plus_1 = self.k1 + 1.0
+        for term_id in self.query_terms(query):
+            idf = self.idf(term_id)
+            docs, tfs = self.index.postings(term_id)
+            for doc, tf in zip(docs, tfs):
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * k1_plus_1 / (tf + norms[doc])
+        return scores
+
+    def upper_bound(self, term_id: int, idf: float) -> float:
+        """Largest BM25 contribution term_id can make to any document.
+
+        Uses the bound stored in the index when it was built with this
+        engine's k1/b; otherwise scans the term's postings once and caches it.
+        """
+        if (self.k1, self.b) == self.index.bound_params:
+            return idf * self.index.max_scores[term_id]
+        if term_id not in self._bound_cache:
+            docs, tfs = self.index.postings(term_id)
+            self._bound_cache[term_id] = max_term_score(list(docs), tfs, self._norms, self.k1)
+        return idf * self._bound_cache[term_id]
+
+    def term_postings(self, query: str) -> list[TermPostings]:
+        """Decode postings and scoring constants for each query term, in query order."""
+        terms = []
+        for term_id in self.query_terms(query):
+            idf = self.idf(term_id)
+            docs, tfs = self.index.postings(term_id)
+            terms.append(TermPostings(list(docs), tfs, idf, self.upper_bound(term_id, idf)))
+        return terms
+
+    def top_k(
+        self,
+        query: str,
+        top_k: int = 20,
+        pruning: str | None = None,
+        stats: PruningStats | None = None,
+    ) -> list[tuple[int, float]]:
+        """Return the top_k (doc position, score) pairs for a query.
+
+        Ties are broken by doc position so rankings are reproducible.
+        """
+        strategy = pruning or self.pruning
+        process = maxscore_top_k if strategy == "maxscore" else exhaustive_top_k
+        return process(self.term_postings(query), self._norms, self.k1, top_k, stats)
+
+    def search(self, query: str, top_k: int = 20) -> list[str]:
+        return [self.index.doc_ids[doc] for doc, _ in self.top_k(query, top_k)]
+
+    def search_scored(self, query: str, top_k: int = 20) -> list[tuple[str, float]]:
+        return [(self.index.doc_ids[doc], score) for doc, score in self.top_k(query, top_k)]
+
+    def name(self) -> str:
+        return "BM25Baseline"
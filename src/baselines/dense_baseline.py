@@ -0,0 +1,508 @@
+"""Dense vector baseline: exact inner-product search over a memory-mapped matrix.
+
+Requires NumPy. Embeddings are computed offline with no model download and
+no GPU: each opinion's text is tokenized, every term is feature-hashed to
+one of `dim` signed dimensions, weighted by sublinear TF-IDF, and the row
+is L2-normalized. This is a fixed random projection of the TF-IDF vector,
+so the same text always gets the same vector on every machine.
+
+The index is a directory:
+
+    meta.json            format version, dim, doc IDs, vocabulary and
+                         document frequencies (for query-side IDF)
+    vectors.npy          float32[num_docs, dim], unit-length rows
+    vectors.float16.npy  optional float16 copy (half the memory)
+    vectors.int8.npy     optional int8 copy, rows scaled to [-127, 127]
+    int8_scales.npy      float32[num_docs], per-row dequantization scale
+
+    ivf<nlist>.*.npy     optional IVF lists for approximate search
+                         (see src/baselines/ivf.py)
+
+Every matrix is memory-mapped on load, so only pages touched by a search
+become resident. Quantized copies and IVF lists are written the first time
+an engine asks for them.
+"""
+
+import json
+import os
+import shutil
+import zlib
+from array import array
+from collections import Counter
+from itertools import chain
+
+import numpy as np
+
+from src.baselines.ivf import DEFAULT_NPROBE, IVFIndex, default_nlist, ivf_files
+from src.baselines.text import iter_opinion_texts, tokenize
+from src.corpus import DEFAULT_STORE_PATH, corpus_fingerprint
+from src.interface import Reranker, SearchEngine
+
+
+DEFAULT_INDEX_DIR = "data/dense"
+DEFAULT_DIM = 256
+INDEX_VERSION = 1
+QUANTIZATIONS = ("none", "float16", "int8")
+ANN_METHODS = ("exact", "ivf")
+SNAPSHOT_INDEX = "dense"
+SNAPSHOT_PARAMS = "params.json"
+
+META_FILE = "meta.json"
+VECTORS_FILE = "vectors.npy"
+QUANTIZED_FILES = {
+    "float16": ("vectors.float16.npy",),
+    "int8": ("vectors.int8.npy", "int8_scales.npy"),
+}
+
+# Rows converted to float32 at a time when scoring a quantized matrix, so the
+# temporary copy stays a few MB regardless of corpus size
+SCORE_BLOCK_ROWS = 16384
+
+
+def hash_terms(terms: list[str], dim: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return (dimension, sign) for each term under the feature-hashing projection.
+
+    Uses CRC-32 rather than hash(), which is salted per process.
+    """
+    hashes = np.fromiter((zlib.crc32(t.encode("utf-8")) for t in terms), dtype=np.uint32, count=len(terms))
+    buckets = (hashes % dim).astype(np.intp)
+    signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+    return buckets, signs
+
+
+def _write_npy(path: str, values: np.ndarray):
+    """Save values to path (replaced atomically)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, values)
+    os.replace(tmp_path, path)
+
+
+class DenseIndex:
+    """Unit-length float32 document vectors plus the embedding vocabulary.
+
+    meta.json also records the corpus fingerprint (see
+    corpus.corpus_fingerprint) the index was built from.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        doc_ids: list[str],
+        terms: list[str],
+        document_frequencies,
+        dim: int,
+        vectors,
+        corpus: dict | None = None,
+    ):
+        self.path = path
+        self.doc_ids = doc_ids
+        self.terms = terms
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.dim = dim
+        self.vectors = vectors
+        self.corpus = corpus
+        self.num_docs = len(doc_ids)
+        df = np.asarray(document_frequencies, dtype=np.float64)
+        self.idf = (np.log((1.0 + self.num_docs) / (1.0 + df)) + 1.0).astype(np.float32)
+        self.buckets, self.signs = hash_terms(terms, dim)
+        self._quantized = {}
+        self._ivf = {}
+
+    @classmethod
+    def build(cls, path: str, documents, dim: int = DEFAULT_DIM, corpus: dict | None = None) -> "DenseIndex":
+        """Embed an iterable of (opinion_id, text) pairs into an index at path.
+
+        Term counts are collected in one pass (as flat arrays, like the BM25
+        postings), then the matrix is filled block by block on disk.
+        """
+        doc_ids = []
+        term_ids = {}
+        df = array("I")
+        offsets = array("Q", [0])
+        doc_terms = array("I")
+        doc_tfs = array("H")
+        for opinion_id, text in documents:
+            doc_ids.append(opinion_id)
+            for term, tf in Counter(tokenize(text)).items():
+                term_id = term_ids.setdefault(term, len(term_ids))
+                if term_id == len(df):
+                    df.append(0)
+                df[term_id] += 1
+                doc_terms.append(term_id)
+                doc_tfs.append(min(tf, 0xFFFF))
+            offsets.append(len(doc_terms))
+        if not doc_ids:
+            raise ValueError("No documents to embed")
+
+        os.makedirs(path, exist_ok=True)
+        terms = list(term_ids)
+        index = cls(path, doc_ids, terms, df, dim, None, corpus)
+        offsets = np.frombuffer(offsets, dtype=np.uint64).astype(np.intp)
+        doc_terms = np.frombuffer(doc_terms, dtype=np.uint32).astype(np.intp)
+        weights = (1.0 + np.log(np.frombuffer(doc_tfs, dtype=np.uint16), dtype=np.float32))
+        weights *= index.idf[doc_terms] * index.signs[doc_terms]
+        cells = index.buckets[doc_terms]
+
+        tmp_path = os.path.join(path, VECTORS_FILE + ".tmp")
+        vectors = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(len(doc_ids), dim))
+        for start in range(0, len(doc_ids), SCORE_BLOCK_ROWS):
+            end = min(start + SCORE_BLOCK_ROWS, len(doc_ids))
+            lo, hi = offsets[start], offsets[end]
+            rows = np.repeat(np.arange(end - start), np.diff(offsets[start:end + 1]))
+            block = np.zeros((end - start, dim), dtype=np.float32)
+            np.add.at(block, (rows, cells[lo:hi]), weights[lo:hi])
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            vectors[start:end] = block / np.maximum(norms, 1e-12)
+        vectors.flush()
+        del vectors
+        os.replace(tmp_path, os.path.join(path, VECTORS_FILE))
+        index._write_meta(df)
+        return cls.load(path)
+
+    def _write_meta(self, document_frequencies):
+        tmp_path = os.path.join(self.path, META_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "version": INDEX_VERSION,
+                "dim": self.dim,
+                "doc_ids": self.doc_ids,
+                "terms": self.terms,
+                "document_frequencies": list(document_frequencies),
+                "corpus": self.corpus,
+            }, f)
+        os.replace(tmp_path, os.path.join(self.path, META_FILE))
+
+    @classmethod
+    def load(cls, path: str) -> "DenseIndex":
+        """Memory-map an index directory written by build().
+
+        Raises:
+            ValueError: If path does not hold a dense index of the current version.
+        """
+        try:
+            with open(os.path.join(path, META_FILE), "r") as f:
+                meta = json.load(f)
+            vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        except (OSError, json.JSONDecodeError) as e:
+            raise ValueError(f"'{path}' is not a dense index: {e}") from e
+        if meta.get("version") != INDEX_VERSION or vectors.shape != (len(meta["doc_ids"]), meta["dim"]):
+            raise ValueError(f"'{path}' is not a version {INDEX_VERSION} dense index; rebuild it")
+        return cls(
+            path, meta["doc_ids"], meta["terms"], meta["document_frequencies"], meta["dim"], vectors,
+            meta.get("corpus"),
+        )
+
+    def save(self, path: str, quantizations: tuple[str, ...] = (), nlists: tuple[int, ...] = ()):
+        """Copy the index (and the requested quantized copies and IVF lists) into directory path."""
+        os.makedirs(path, exist_ok=True)
+        names = [VECTORS_FILE, META_FILE]
+        for kind in quantizations:
+            self.quantized(kind)
+            names.extend(QUANTIZED_FILES[kind])
+        for nlist in nlists:
+            names.extend(ivf_files(self.ivf(nlist).nlist))
+        for name in names:
+            shutil.copyfile(os.path.join(self.path, name), os.path.join(path, name))
+
+    def quantized(self, kind: str) -> tuple[np.ndarray, np.ndarray | None]:
+        """Return (matrix, per-row scales or None) for a quantization in QUANTIZATIONS.
+
+        Quantized copies are computed from the float32 matrix on first use and
+        saved next to it, then memory-mapped like the original.
+        """
+        if kind == "none":
+            return self.vectors, None
+        if kind not in self._quantized:
+            paths = [os.path.join(self.path, name) for name in QUANTIZED_FILES[kind]]
+            if not all(os.path.isfile(p) for p in paths):
+                self._write_quantized(kind, paths)
+            arrays = [np.load(p, mmap_mode="r") for p in paths]
+            self._quantized[kind] = (arrays[0], arrays[1] if kind == "int8" else None)
+        return self._quantized[kind]
+
+    def _write_quantized(self, kind: str, paths: list[str]):
+        if kind == "float16":
+            _write_npy(paths[0], self.vectors.astype(np.float16))
+            return
+        # Symmetric per-row int8: row ≈ codes * scale, scale = max|row| / 127
+        scales = np.abs(self.vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.rint(self.vectors / scales[:, None]).astype(np.int8)
+        _write_npy(paths[0], codes)
+        _write_npy(paths[1], scales.astype(np.float32))
+
+    def ivf(self, nlist: int | None = None) -> IVFIndex:
+        """Return IVF lists over the float32 vectors (default_nlist() lists if nlist is None).
+
+        Lists are trained on first use and saved next to the matrix.
+        """
+        nlist = min(nlist or default_nlist(self.num_docs), self.num_docs)
+        if nlist not in self._ivf:
+            try:
+                self._ivf[nlist] = IVFIndex.load(self.path, nlist)
+            except ValueError:
+                IVFIndex.build(self.vectors, nlist).save(self.path)
+                self._ivf[nlist] = IVFIndex.load(self.path, nlist)
+        return self._ivf[nlist]
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Embed texts into unit-length float32 rows (all-zero for texts with no known terms)."""
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        term_ids = self.term_ids
+        for row, text in enumerate(texts):
+            counts = Counter(t for t in tokenize(text) if t in term_ids)
+            if not counts:
+                continue
+            ids = np.fromiter((term_ids[t] for t in counts), dtype=np.intp, count=len(counts))
+            tfs = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+            np.add.at(out[row], self.buckets[ids], (1.0 + np.log(tfs)) * self.idf[ids] * self.signs[ids])
+            out[row] /= max(float(np.linalg.norm(out[row])), 1e-12)
+        return out
+
+
+def score_matrix(matrix: np.ndarray, queries: np.ndarray, scales: np.ndarray | None = None) -> np.ndarray:
+    """Inner products of every matrix row with every query row: float32[num_docs, num_queries].
+
+    float32 matrices go straight to BLAS (gemv/gemm). Quantized matrices are
+    widened to float32 block by block first, so no full-size copy is made.
+    """
+    if matrix.dtype == np.float32:
+        scores = matrix @ queries.T
+    else:
+        scores = np.empty((matrix.shape[0], queries.shape[0]), dtype=np.float32)
+        for start in range(0, matrix.shape[0], SCORE_BLOCK_ROWS):
+            end = start + SCORE_BLOCK_ROWS
+            scores[start:end] = matrix[start:end].astype(np.float32) @ queries.T
+    if scales is not None:
+        scores *= scales[:, None]
+    return scores
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Positions of the top_k scores, best first, via argpartition.
+
+    Ties are broken by position so rankings are reproducible.
+    """
+    top_k = min(top_k, scores.shape[0])
+    if top_k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if top_k < scores.shape[0]:
+        # argpartition picks arbitrarily among scores tied with the k-th, so
+        # keep every document at or above it and let the sort decide
+        threshold = scores[np.argpartition(-scores, top_k - 1)[top_k - 1]]
+        candidates = np.flatnonzero(scores >= threshold)
+    else:
+        candidates = np.arange(scores.shape[0])
+    return candidates[np.lexsort((candidates, -scores[candidates]))][:top_k]
+
+
+class DenseBaseline(SearchEngine):
+    """Cosine search over hashed TF-IDF embeddings of embedding.qa_text.
+
+    Texts follow the BM25 baseline (embedding.qa_text, falling back to
+    content.full_text). The index is built on first use and saved to
+    index_dir; later runs memory-map it, unless the corpus fingerprint stored
+    in it no longer matches the corpus.
+
+    quantization="float16" or "int8" searches a quantized copy of the matrix
+    instead (half or a quarter of the float32 memory) at a small cost in
+    score precision. search_batch scores a whole batch with one matrix
+    product, so pass --batch-size to the scorer.
+
+    ann="ivf" scores only the nprobe nearest of nlist IVF lists per query
+    (nlist defaults to about 4 * sqrt(num_docs)); raise nprobe for recall,
+    lower it for speed. Exact scoring (ann="exact") is the default.
+
+    Supports scorer snapshots, and with_params shares the loaded index
+    across quantization/ann/nlist/nprobe settings in a sweep.
+    """
+
+    def __init__(
+        self,
+        data_dir: str = "data/extracted",
+        index_dir: str = DEFAULT_INDEX_DIR,
+        store_path: str = DEFAULT_STORE_PATH,
+        dim: int = DEFAULT_DIM,
+        quantization: str = QUANTIZATIONS[0],
+        ann: str = ANN_METHODS[0],
+        nlist: int | None = None,
+        nprobe: int = DEFAULT_NPROBE,
+    ):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{quantization}' (expected one of {QUANTIZATIONS})")
+        if ann not in ANN_METHODS:
+            raise ValueError(f"Unknown ann method '{ann}' (expected one of {ANN_METHODS})")
+        self.index = None
+        corpus = corpus_fingerprint(data_dir, store_path)
+        if os.path.isfile(os.path.join(index_dir, META_FILE)):
+            try:
+                self.index = DenseIndex.load(index_dir)
+            except ValueError:
+                print(f"Warning: '{index_dir}' is stale or not a dense index — rebuilding")
+            if self.index is not None and self.index.dim != dim:
+                print(f"Warning: '{index_dir}' has dim={self.index.dim}, not {dim} — rebuilding")
+                self.index = None
+            # Without a corpus to compare against (or rebuild from), keep the index
+            if self.index is not None and corpus is not None and self.index.corpus != corpus:
+                print(f"Warning: '{index_dir}' was built from a different corpus — rebuilding")
+                self.index = None
+        if self.index is None:
+            # Quantized copies and IVF lists derived from the old matrix
+            derived = {name for names in QUANTIZED_FILES.values() for name in names}
+            for name in os.listdir(index_dir) if os.path.isdir(index_dir) else ():
+                if name in derived or name.startswith("ivf"):
+                    os.remove(os.path.join(index_dir, name))
+            documents = iter_opinion_texts(data_dir, store_path)
+            first = next(documents, None)
+            if first is None:
+                raise RuntimeError(f"No opinions found to index in '{data_dir}'")
+            self.index = DenseIndex.build(index_dir, chain([first], documents), dim=dim, corpus=corpus)
+        self._configure(quantization, ann, nlist, nprobe)
+
+    def _configure(self, quantization: str, ann: str, nlist: int | None, nprobe: int):
+        """Select which copy of self.index's matrix to search, and how."""
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{quantization}' (expected one of {QUANTIZATIONS})")
+        if ann not in ANN_METHODS:
+            raise ValueError(f"Unknown ann method '{ann}' (expected one of {ANN_METHODS})")
+        if nprobe < 1:
+            raise ValueError(f"nprobe must be >= 1, got {nprobe}")
+        self.quantization = quantization
+        self.ann = ann
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self._matrix, self._scales = self.index.quantized(quantization)
+        self.ivf = self.index.ivf(nlist) if ann == "ivf" else None
+
+    def with_params(self, **params) -> "DenseBaseline":
+        """Share this engine's index with another quantization/ann/nlist/nprobe setting.
+
+        Parameters that select the index (data_dir, index_dir, store_path,
+        dim) fall back to full construction.
+        """
+        if params.keys() & {"data_dir", "index_dir", "store_path", "dim"}:
+            return super().with_params(**params)
+        unknown = params.keys() - {"quantization", "ann", "nlist", "nprobe"}
+        if unknown:
+            raise TypeError(f"DenseBaseline got unexpected parameters {sorted(unknown)}")
+        engine = type(self).__new__(type(self))
+        engine.index = self.index
+        engine._configure(
+            params.get("quantization", QUANTIZATIONS[0]),
+            params.get("ann", ANN_METHODS[0]),
+            params.get("nlist"),
+            params.get("nprobe", DEFAULT_NPROBE),
+        )
+        return engine
+
+    def save_state(self, path: str):
+        quantizations = () if self.quantization == "none" else (self.quantization,)
+        nlists = () if self.ivf is None else (self.ivf.nlist,)
+        self.index.save(os.path.join(path, SNAPSHOT_INDEX), quantizations, nlists)
+        with open(os.path.join(path, SNAPSHOT_PARAMS), "w") as f:
+            json.dump({
+                "quantization": self.quantization,
+                "ann": self.ann,
+                "nlist": self.nlist,
+                "nprobe": self.nprobe,
+            }, f)
+
+    @classmethod
+    def load_state(cls, path: str) -> "DenseBaseline":
+        with open(os.path.join(path, SNAPSHOT_PARAMS), "r") as f:
+            params = json.load(f)
+        engine = cls.__new__(cls)
+        engine.index = DenseIndex.load(os.path.join(path, SNAPSHOT_INDEX))
+        engine._configure(params["quantization"], params["ann"], params["nlist"], params["nprobe"])
+        return engine
+
+    def score_all(self, queries: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Embed queries and score them against every document.
+
+        Returns:
+            (scores float32[num_docs, num_queries], mask of queries with any known term)
+        """
+        embedded = self.index.embed(queries)
+        return score_matrix(self._matrix, embedded, self._scales), embedded.any(axis=1)
+
+    def score_candidates(self, query: str, positions: np.ndarray) -> np.ndarray | None:
+        """Score one query against the documents at the given positions only.
+
+        Returns:
+            float32[len(positions)] scores, or None if the query has no known term
+        """
+        embedded = self.index.embed([query])
+        if not embedded.any():
+            return None
+        scales = None if self._scales is None else self._scales[positions]
+        return score_matrix(self._matrix[positions], embedded, scales)[:, 0]
+
+    def rank(self, queries: list[str], top_k: int = 20) -> list[list[tuple[int, float]]]:
+        """Return the top_k (doc position, score) pairs for each query.
+
+        Exact search scores every document with one matrix product; IVF
+        search scores only each query's probed candidates. Either way ties
+        are broken by doc position, so IVF with nprobe == nlist returns
+        exactly the exact ranking.
+        """
+        embedded = self.index.embed(queries)
+        known = embedded.any(axis=1)
+        if self.ivf is None:
+            scores = score_matrix(self._matrix, embedded, self._scales)
+            columns = [(None, scores[:, i]) for i in range(len(queries))]
+        else:
+            columns = []
+            for i, candidates in enumerate(self.ivf.probe(embedded, self.nprobe)):
+                scales = None if self._scales is None else self._scales[candidates]
+                scores = score_matrix(self._matrix[candidates], embedded[i:i + 1], scales)
+                columns.append((candidates, scores[:, 0]))
+        ranked = []
+        for (candidates, column), has_terms in zip(columns, known):
+            if not has_terms:
+                ranked.append([])
+                continue
+            best = top_k_indices(column, top_k)
+            docs = best if candidates is None else candidates[best]
+            ranked.append([(int(doc), float(score)) for doc, score in zip(docs, column[best])])
+        return ranked
+
+    def top_k(self, query: str, top_k: int = 20) -> list[tuple[int, float]]:
+        """Return the top_k (doc position, score) pairs for a query."""
+        return self.rank([query], top_k)[0]
+
+    def search(self, query: str, top_k: int = 20) -> list[str]:
+        return [self.index.doc_ids[doc] for doc, _ in self.top_k(query, top_k)]
+
+    def search_scored(self, query: str, top_k: int = 20) -> list[tuple[str, float]]:
+        return [(self.index.doc_ids[doc], score) for doc, score in self.top_k(query, top_k)]
+
+    def search_batch(self, queries: list[str], top_k: int = 20) -> list[list[str]]:
+        doc_ids = self.index.doc_ids
+        return [[doc_ids[doc] for doc, _ in ranked] for ranked in self.rank(queries, top_k)]
+
+    def name(self) -> str:
+        return "DenseBaseline"
+
+
+class DenseReranker(Reranker):
+    """Reorders candidates by exact cosine similarity in a DenseBaseline index.
+
+    A cheap second stage for src/pipeline.py; params go to DenseBaseline.
+    Candidates missing from the index keep their order after the rest.
+    """
+
+    def __init__(self, **params):
+        self.engine = DenseBaseline(**params)
+        self._positions = {oid: doc for doc, oid in enumerate(self.engine.index.doc_ids)}
+
+    def rerank(self, query: str, candidates: list[str]) -> list[str]:
+        known = [oid for oid in candidates if oid in self._positions]
+        if not known:
+            return list(candidates)
+        scores = self.engine.score_candidates(query, np.array([self._positions[oid] for oid in known]))
+        if scores is None:
+            return list(candidates)
+        # Equal scores keep the first stage's order
+        reranked = [known[i] for i in np.lexsort((np.arange(len(known)), -scores))]
+        return reranked + [oid for oid in candidates if oid not in self._positions]
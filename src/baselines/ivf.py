@@ -0,0 +1,140 @@
+"""IVF-flat approximate nearest-neighbor index for unit-length vectors.
+
+Requires NumPy. Spherical k-means splits the document vectors into `nlist`
+clusters (inverted lists). A query scores only the `nprobe` lists whose
+centroids are closest to it, so it touches about nprobe / nlist of the
+matrix instead of all of it. The lists hold doc positions only; the
+vectors themselves stay in the (memory-mapped, possibly quantized) matrix
+they were clustered from, and candidates are scored exactly.
+
+With nprobe == nlist every document is scored and the results equal exact
+search. Recall against exact search as nprobe grows is measured by
+src/benchmarks/ann_benchmark.py.
+
+On disk an index with nlist lists is three .npy files:
+
+    ivf<nlist>.centroids.npy  float32[nlist, dim], unit-length
+    ivf<nlist>.offsets.npy    int64[nlist + 1], start of each list in docs
+    ivf<nlist>.docs.npy       int64[num_docs], doc positions grouped by list,
+                              ascending within each list
+"""
+
+import math
+import os
+
+import numpy as np
+
+
+DEFAULT_NPROBE = 8
+KMEANS_ITERATIONS = 20
+# Training sample per list (the faiss rule of thumb is 30-256)
+TRAIN_POINTS_PER_LIST = 64
+ASSIGN_BLOCK_ROWS = 16384
+IVF_PARTS = ("centroids", "offsets", "docs")
+
+
+def default_nlist(num_docs: int) -> int:
+    """About 4 * sqrt(num_docs) lists, the usual starting point for IVF."""
+    return max(1, min(num_docs, int(round(4 * math.sqrt(num_docs)))))
+
+
+def ivf_files(nlist: int) -> tuple[str, ...]:
+    """File names of an IVF index with nlist lists."""
+    return tuple(f"ivf{nlist}.{part}.npy" for part in IVF_PARTS)
+
+
+def _normalize(rows: np.ndarray) -> np.ndarray:
+    return rows / np.maximum(np.linalg.norm(rows, axis=1, keepdims=True), 1e-12)
+
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the highest inner-product centroid for each row, in blocks."""
+    assign = np.empty(vectors.shape[0], dtype=np.int64)
+    for start in range(0, vectors.shape[0], ASSIGN_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+        assign[start:start + ASSIGN_BLOCK_ROWS] = np.argmax(block @ centroids.T, axis=1)
+    return assign
+
+
+def train_centroids(vectors: np.ndarray, nlist: int, seed: int = 0, iterations: int = KMEANS_ITERATIONS) -> np.ndarray:
+    """Spherical k-means on a random sample of vectors (Lloyd iterations).
+
+    Clusters that end up empty are re-seeded from random sample points.
+    """
+    rng = np.random.default_rng(seed)
+    num_docs = vectors.shape[0]
+    sample_size = min(num_docs, nlist * TRAIN_POINTS_PER_LIST)
+    sample = np.asarray(vectors[np.sort(rng.choice(num_docs, sample_size, replace=False))], dtype=np.float32)
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=nlist)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts[filled])[:-1]))
+        sums = np.zeros_like(centroids)
+        sums[filled] = np.add.reduceat(sample[order], starts, axis=0)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()), replace=False)]
+        centroids = _normalize(sums).astype(np.float32)
+    return centroids
+
+
+class IVFIndex:
+    """Coarse centroids plus one inverted list of doc positions per centroid."""
+
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray, docs: np.ndarray):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.docs = docs
+        self.nlist = centroids.shape[0]
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, nlist: int, seed: int = 0) -> "IVFIndex":
+        """Cluster vectors (float32[num_docs, dim], unit-length rows) into nlist lists."""
+        nlist = max(1, min(nlist, vectors.shape[0]))
+        centroids = train_centroids(vectors, nlist, seed)
+        assign = nearest_centroids(vectors, centroids)
+        docs = np.argsort(assign, kind="stable").astype(np.int64)
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(assign, minlength=nlist)))).astype(np.int64)
+        return cls(centroids, offsets, docs)
+
+    def save(self, directory: str):
+        """Write the three .npy files into directory (each replaced atomically)."""
+        for name, values in zip(ivf_files(self.nlist), (self.centroids, self.offsets, self.docs)):
+            path = os.path.join(directory, name)
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, values)
+            os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, directory: str, nlist: int) -> "IVFIndex":
+        """Memory-map an index written by save().
+
+        Raises:
+            ValueError: If the files are missing or inconsistent.
+        """
+        try:
+            centroids, offsets, docs = (
+                np.load(os.path.join(directory, name), mmap_mode="r") for name in ivf_files(nlist)
+            )
+        except OSError as e:
+            raise ValueError(f"No IVF index with nlist={nlist} in '{directory}': {e}") from e
+        if centroids.shape[0] != nlist or offsets.shape[0] != nlist + 1 or offsets[-1] != docs.shape[0]:
+            raise ValueError(f"IVF index with nlist={nlist} in '{directory}' is inconsistent; rebuild it")
+        return cls(centroids, offsets, docs)
+
+    def probe(self, queries: np.ndarray, nprobe: int) -> list[np.ndarray]:
+        """Candidate doc positions (ascending) in the nprobe lists nearest each query row."""
+        nprobe = max(1, min(nprobe, self.nlist))
+        similarities = queries @ self.centroids.T
+        if nprobe < self.nlist:
+            nearest = np.argpartition(-similarities, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            nearest = np.broadcast_to(np.arange(self.nlist), similarities.shape)
+        offsets = self.offsets
+        return [
+            np.sort(np.concatenate([self.docs[offsets[l]:offsets[l + 1]] for l in lists]))
+            for lists in nearest
+        ]
@@ -3,23 +3,31 @@
 import os
 import random
 
+from src.corpus import DEFAULT_STORE_PATH, CorpusStore, iter_opinion_files, prefer_store
 from src.interface import SearchEngine
 
 
 class RandomBaseline(SearchEngine):
-    """Returns random opinion IDs. Useful as a lower-bound baseline."""
+    """Returns random opinion IDs. Useful as a lower-bound baseline.
 
-    def __init__(self, data_dir: str = "data/extracted", seed: int | None = None):
+    Reads the opinion ID table from the compiled corpus store when it was
+    built from data_dir (see corpus.prefer_store), falling back to walking
+    data_dir.
+    """
+
+    def __init__(
+        self,
+        data_dir: str = "data/extracted",
+        seed: int | None = None,
+        store_path: str = DEFAULT_STORE_PATH,
+    ):
         self._rng = random.Random(seed)
         self._opinion_ids = []
-        if os.path.isdir(data_dir):
-            for year_dir in os.listdir(data_dir):
-                year_path = os.path.join(data_dir, year_dir)
-                if not os.path.isdir(year_path):
-                    continue
-                for fname in os.listdir(year_path):
-                    if fname.endswith(".json"):
-                        self._opinion_ids.append(fname[:-5])
+        if prefer_store(data_dir, store_path):
+            with CorpusStore(store_path) as store:
+                self._opinion_ids = list(store.ids)
+        elif os.path.isdir(data_dir):
+            self._opinion_ids = [opinion_id for opinion_id, _, _ in iter_opinion_files(data_dir)]
         if not self._opinion_ids:
             raise RuntimeError(
                 f"No opinion files found in '{data_dir}'. "
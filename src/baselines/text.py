@@ -0,0 +1,68 @@
+"""Text helpers shared by the lexical and dense baselines."""
+
+import json
+import os
+import re
+
+from src.corpus import DEFAULT_STORE_PATH, CorpusStore, get_field, iter_opinion_files, prefer_store
+
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Short English stopword list. Kept deliberately small: legal phrasing such
+# as "may", "shall", and "not" carries meaning in FPPC questions.
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "their there these this to was were which with".split()
+)
+
+# Fields tried in order when picking the text to index for an opinion.
+TEXT_FIELDS = ("embedding.qa_text", "content.full_text")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase text and split it into alphanumeric tokens, dropping stopwords.
+
+    Statute numbers survive as single tokens ("87103(a)" -> ["87103", "a"]).
+    """
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def opinion_text(record: dict) -> str:
+    """Return the preferred indexable text of a parsed opinion JSON record.
+
+    Uses embedding.qa_text, falling back to content.full_text; "" if neither is present.
+    """
+    for field in TEXT_FIELDS:
+        value = get_field(record, field)
+        if value:
+            return value
+    return ""
+
+
+def iter_opinion_texts(data_dir: str = "data/extracted", store_path: str = DEFAULT_STORE_PATH):
+    """Yield (opinion_id, text) for every opinion in the corpus.
+
+    Reads from the compiled corpus store when prefer_store() allows it,
+    otherwise parses data_dir/{year}/*.json directly. Text selection follows opinion_text().
+
+    Raises:
+        RuntimeError: If neither the store nor data_dir is available.
+    """
+    if prefer_store(data_dir, store_path):
+        with CorpusStore(store_path) as store:
+            for doc, opinion_id in enumerate(store.ids):
+                text = ""
+                for field in TEXT_FIELDS:
+                    text = store.get_by_index(doc, field)
+                    if text:
+                        break
+                yield opinion_id, text or ""
+    elif os.path.isdir(data_dir):
+        for opinion_id, _, path in iter_opinion_files(data_dir):
+            with open(path, "r") as f:
+                yield opinion_id, opinion_text(json.load(f))
+    else:
+        raise RuntimeError(
+            f"No corpus found: neither store '{store_path}' nor data directory '{data_dir}' exists."
+        )
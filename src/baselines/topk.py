@@ -0,0 +1,183 @@
+"""Dynamic-pruning top-k query processing for BM25-style additive scorers.
+
+Implements the term-at-a-time form of MaxScore (Turtle & Flood, 1995).
+Query terms are processed in descending order of their score upper bound,
+so rare, high-IDF terms come first. Once the summed bounds of the remaining
+terms fall below the current k-th best partial score, no unseen document can
+reach the top-k: from then on the long postings lists of common terms are
+never scanned. Instead each surviving candidate is probed by binary search,
+and candidates whose partial score plus remaining bound cannot reach the
+threshold are dropped.
+
+The result is identical to exhaustive scoring, including tie order:
+documents with equal scores rank by ascending doc ID, and the final scores of
+the surviving candidates are re-summed in query-term order exactly as the
+exhaustive path sums them.
+"""
+
+import heapq
+from bisect import bisect_left
+
+
+# Relative slack applied to bounds and thresholds, so that float rounding
+# (partial sums accumulate in a different order than the final re-sum) can
+# never prune a document that would tie or beat the true k-th score.
+_SLACK = 1e-9
+
+
+class TermPostings:
+    """One query term's decoded postings plus its scoring constants."""
+
+    __slots__ = ("docs", "tfs", "idf", "upper_bound")
+
+    def __init__(self, docs: list[int], tfs, idf: float, upper_bound: float):
+        self.docs = docs
+        self.tfs = tfs
+        self.idf = idf
+        self.upper_bound = upper_bound
+
+
+class PruningStats:
+    """Counts how much work a query did, for benchmarking.
+
+    postings_scored counts postings read while finding the top-k candidates;
+    postings_rescored counts the probes that re-sum the final candidates' exact
+    scores, which revisit postings already counted in postings_scored.
+    """
+
+    __slots__ = ("postings_total", "postings_scored", "postings_rescored")
+
+    def __init__(self):
+        self.postings_total = 0
+        self.postings_scored = 0
+        self.postings_rescored = 0
+
+
+def _ranked(scores: dict[int, float], top_k: int) -> list[tuple[int, float]]:
+    return heapq.nsmallest(top_k, scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def exhaustive_top_k(
+    terms: list[TermPostings],
+    norms,
+    k1: float,
+    top_k: int,
+    stats: PruningStats | None = None,
+) -> list[tuple[int, float]]:
+    """Score every posting of every term (term-at-a-time). Reference for maxscore_top_k.
+
+    Returns up to top_k (doc, score) pairs ordered by descending score, then doc.
+    """
+    scores = {}
+    k1_plus_1 = k1 + 1.0
+    for term in terms:
+        idf = term.idf
+        for doc, tf in zip(term.docs, term.tfs):
+            scores[doc] = scores.get(doc, 0.0) + idf * tf * k1_plus_1 / (tf + norms[doc])
+    if stats is not None:
+        total = sum(len(term.docs) for term in terms)
+        stats.postings_total += total
+        stats.postings_scored += total
+    return _ranked(scores, top_k)
+
+
+def maxscore_top_k(
+    terms: list[TermPostings],
+    norms,
+    k1: float,
+    top_k: int,
+    stats: PruningStats | None = None,
+) -> list[tuple[int, float]]:
+    """MaxScore top-k over BM25 postings.
+
+    Args:
+        terms: Query terms in query order (the order exhaustive scoring sums in).
+        norms: Per-document length normalization, k1 * (1 - b + b * dl / avgdl).
+        k1: BM25 k1 parameter.
+        top_k: Number of results to return.
+        stats: Optional counters updated in place.
+
+    Returns:
+        Up to top_k (doc, score) pairs ordered by descending score, then doc,
+        identical to exhaustive_top_k.
+    """
+    if top_k <= 0 or not terms:
+        return []
+
+    k1_plus_1 = k1 + 1.0
+    order = sorted(range(len(terms)), key=lambda i: -terms[i].upper_bound)
+    # remaining[n] bounds what terms order[n:] can still add to any document
+    remaining = [0.0] * (len(order) + 1)
+    for n in range(len(order) - 1, -1, -1):
+        remaining[n] = remaining[n + 1] + terms[order[n]].upper_bound * (1.0 + _SLACK)
+
+    partial = {}
+    scored = 0
+    n = 0
+
+    # Phase 1: exhaustive accumulation while unseen documents can still qualify.
+    # Computing the threshold costs O(candidates), so it is only checked when
+    # the next postings list is long enough that skipping it would pay off.
+    while n < len(order):
+        term = terms[order[n]]
+        if len(partial) >= top_k and len(term.docs) * 4 >= len(partial):
+            threshold = heapq.nlargest(top_k, partial.values())[-1]
+            if remaining[n] < threshold * (1.0 - _SLACK):
+                break
+        idf = term.idf
+        for doc, tf in zip(term.docs, term.tfs):
+            partial[doc] = partial.get(doc, 0.0) + idf * tf * k1_plus_1 / (tf + norms[doc])
+        scored += len(term.docs)
+        n += 1
+
+    # Phase 2: only existing candidates can qualify. Drop those that cannot
+    # reach the threshold, then look the rest up in each remaining term.
+    while n < len(order) and len(partial) > top_k:
+        threshold = heapq.nlargest(top_k, partial.values())[-1] * (1.0 - _SLACK)
+        bound = remaining[n]
+        partial = {doc: score for doc, score in partial.items() if score + bound >= threshold}
+        if len(partial) <= top_k:
+            break
+        term = terms[order[n]]
+        docs, tfs, idf = term.docs, term.tfs, term.idf
+        if len(partial) * 8 < len(docs):
+            # Few candidates, long list: binary-search each candidate
+            num_postings = len(docs)
+            for doc in partial:
+                p = bisect_left(docs, doc)
+                if p < num_postings and docs[p] == doc:
+                    tf = tfs[p]
+                    partial[doc] += idf * tf * k1_plus_1 / (tf + norms[doc])
+                    scored += 1
+        else:
+            # Many candidates: a membership-filtered scan is cheaper than probing
+            for doc, tf in zip(docs, tfs):
+                if doc in partial:
+                    partial[doc] += idf * tf * k1_plus_1 / (tf + norms[doc])
+                    scored += 1
+        n += 1
+
+    # Exact scores for the survivors, summed in query order like exhaustive_top_k
+    if len(partial) > top_k:
+        threshold = heapq.nlargest(top_k, partial.values())[-1] * (1.0 - _SLACK)
+        survivors = sorted(doc for doc, score in partial.items() if score >= threshold)
+    else:
+        survivors = sorted(partial)
+    exact = {}
+    rescored = 0
+    for term in terms:
+        docs, tfs, idf = term.docs, term.tfs, term.idf
+        num_postings = len(docs)
+        for doc in survivors:
+            p = bisect_left(docs, doc)
+            if p < num_postings and docs[p] == doc:
+                tf = tfs[p]
+                exact[doc] = exact.get(doc, 0.0) + idf * tf * k1_plus_1 / (tf + norms[doc])
+                rescored += 1
+
+    if stats is not None:
+        stats.postings_total += sum(len(term.docs) for term in terms)
+        stats.postings_scored += scored
+        stats.postings_rescored += rescored
+
+    return _ranked(exact, top_k)
@@ -0,0 +1,172 @@
+"""
+Recall-vs-latency report for IVF search in the dense baseline.
+
+Runs the dataset's queries through DenseBaseline with exact search and with
+IVF search at each --nprobe, and reports for every setting:
+
+    mean/p50/p95 ms   per-query latency over --repeat passes
+    scanned           fraction of the corpus scored per query
+    recall@k          overlap of the top-k with the exact top-k (1.0 = same set)
+    ndcg@10           quality against the dataset's relevance judgments
+
+The IVF lists are trained and saved next to the dense index on first use.
+
+Usage:
+    python -m src.benchmarks.ann_benchmark --dataset eval/dataset.json \
+        [--index-dir data/dense] [--nlist 480] [--nprobe 1,2,4,8,16,32] \
+        [--quantization int8] [--top-k 20] [--repeat 3] [--output ann.json]
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from src.baselines.dense_baseline import DEFAULT_DIM, DEFAULT_INDEX_DIR, QUANTIZATIONS, DenseBaseline
+from src.baselines.ivf import default_nlist
+from src.corpus import DEFAULT_STORE_PATH
+from src.scorer import compute_ndcg, load_dataset, percentile
+
+
+def run_config(engine: DenseBaseline, queries: list[str], top_k: int, repeat: int) -> dict:
+    """Time every query `repeat` times through engine.top_k.
+
+    Returns latency percentiles (ms, per query) and the rankings (doc
+    positions) from the final repetition.
+    """
+    latencies = []
+    rankings = []
+    for _ in range(repeat):
+        rankings = []
+        for query in queries:
+            start = time.perf_counter()
+            ranking = engine.top_k(query, top_k)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            rankings.append([doc for doc, _ in ranking])
+    return {
+        "mean_ms": sum(latencies) / len(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "rankings": rankings,
+    }
+
+
+def recall_against(rankings: list[list[int]], exact: list[list[int]]) -> float:
+    """Mean fraction of each exact top-k found by the approximate top-k (queries with results only)."""
+    recalls = [len(set(a) & set(e)) / len(e) for a, e in zip(rankings, exact) if e]
+    return sum(recalls) / len(recalls) if recalls else 1.0
+
+
+def scanned_fraction(engine: DenseBaseline, queries: list[str]) -> float:
+    """Mean fraction of the corpus an engine scores per query."""
+    if engine.ivf is None:
+        return 1.0
+    candidates = engine.ivf.probe(engine.index.embed(queries), engine.nprobe)
+    return sum(len(c) for c in candidates) / (len(queries) * engine.index.num_docs)
+
+
+def mean_ndcg(engine: DenseBaseline, rankings: list[list[int]], judgments: list[dict[str, int]]) -> float:
+    doc_ids = engine.index.doc_ids
+    scores = [compute_ndcg([doc_ids[d] for d in r], j, 10) for r, j in zip(rankings, judgments)]
+    return sum(scores) / len(scores)
+
+
+def _nprobe_list(value: str) -> list[int]:
+    """argparse type for --nprobe: comma-separated positive integers."""
+    try:
+        values = [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated integers, got '{value}'")
+    if not values or min(values) < 1:
+        raise argparse.ArgumentTypeError("nprobe values must be >= 1")
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs latency of IVF against exact dense search")
+    parser.add_argument("--dataset", required=True, help="Path to the eval dataset JSON file")
+    parser.add_argument("--index-dir", default=DEFAULT_INDEX_DIR, help="Dense index directory (built if missing)")
+    parser.add_argument("--data-dir", default="data/extracted", help="Corpus used to build a missing index")
+    parser.add_argument("--store-path", default=DEFAULT_STORE_PATH, help="Corpus store used to build a missing index")
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM, help=f"Embedding dimensions (default: {DEFAULT_DIM})")
+    parser.add_argument("--quantization", choices=QUANTIZATIONS, default=QUANTIZATIONS[0], help="Matrix to search")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF lists (default: about 4 * sqrt(num_docs))")
+    parser.add_argument(
+        "--nprobe",
+        type=_nprobe_list,
+        default=[1, 2, 4, 8, 16, 32],
+        help="Lists probed per query, comma-separated (default: 1,2,4,8,16,32)",
+    )
+    parser.add_argument("--query-type", default="all", help="Only use queries of this type (default: all)")
+    parser.add_argument("--top-k", type=int, default=20, help="Results per query (default: 20)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per setting (default: 3)")
+    parser.add_argument("--output", default=None, help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.dataset)
+    selected = [q for q in dataset["queries"] if args.query_type == "all" or q.get("type") == args.query_type]
+    if not selected:
+        print(f"No '{args.query_type}' queries in {args.dataset}")
+        sys.exit(1)
+    queries = [q["text"] for q in selected]
+    judgments = [{j["opinion_id"]: j["score"] for j in q["relevance_judgments"]} for q in selected]
+
+    exact_engine = DenseBaseline(
+        data_dir=args.data_dir,
+        index_dir=args.index_dir,
+        store_path=args.store_path,
+        dim=args.dim,
+        quantization=args.quantization,
+    )
+    nlist = min(args.nlist or default_nlist(exact_engine.index.num_docs), exact_engine.index.num_docs)
+    engines = {"exact": exact_engine}
+    for nprobe in args.nprobe:
+        if nprobe <= nlist:
+            engines[f"nprobe={nprobe}"] = exact_engine.with_params(
+                quantization=args.quantization, ann="ivf", nlist=nlist, nprobe=nprobe,
+            )
+    # Warm the page cache before timing
+    for engine in engines.values():
+        for query in queries:
+            engine.top_k(query, args.top_k)
+
+    results = {label: run_config(engine, queries, args.top_k, args.repeat) for label, engine in engines.items()}
+    exact = results["exact"]["rankings"]
+    rows = []
+    for label, engine in engines.items():
+        r = results.pop(label)
+        rows.append({
+            "setting": label,
+            "nprobe": engine.nprobe if engine.ivf is not None else None,
+            "mean_ms": r["mean_ms"],
+            "p50_ms": r["p50_ms"],
+            "p95_ms": r["p95_ms"],
+            "scanned": scanned_fraction(engine, queries),
+            "recall": recall_against(r["rankings"], exact),
+            "ndcg@10": mean_ndcg(engine, r["rankings"], judgments),
+        })
+
+    print(f"{len(queries)} queries, top-{args.top_k}, {args.repeat} passes, "
+          f"{exact_engine.index.num_docs} docs, nlist={nlist}, quantization={args.quantization}")
+    print(f"{'setting':>12s}  {'mean ms':>9s}  {'p50 ms':>9s}  {'p95 ms':>9s}  {'scanned':>8s}  "
+          f"{'recall@' + str(args.top_k):>9s}  {'nDCG@10':>8s}")
+    for row in rows:
+        print(f"{row['setting']:>12s}  {row['mean_ms']:>9.3f}  {row['p50_ms']:>9.3f}  {row['p95_ms']:>9.3f}  "
+              f"{row['scanned']:>7.1%}  {row['recall']:>9.3f}  {row['ndcg@10']:>8.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "dataset": args.dataset,
+                "queries": len(queries),
+                "docs": exact_engine.index.num_docs,
+                "nlist": nlist,
+                "quantization": args.quantization,
+                "top_k": args.top_k,
+                "rows": rows,
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+Performance regression suite for search engines and the scoring harness.
+
+Generates a synthetic corpus shaped like data/extracted (see
+src/benchmarks/synthetic.py) and runs the real eval queries against each
+engine. Every run happens in a fresh subprocess, so each one measures:
+
+    cold_start_ms   import + construction of the engine (load_engine)
+    mean/p50/p95/p99_ms
+                    per-query engine.search latency, as recorded by
+                    evaluate_query, over --repeat passes after a warm-up pass
+    overhead_us     scorer time per query outside engine.search (metric
+                    computation and result assembly in evaluate_query)
+    peak_rss_mb     peak resident set size of the process
+
+The default targets are the two baselines plus "harness" (NullEngine below,
+which returns a fixed ranking), so the scorer's own overhead is tracked too.
+The median over --runs processes is compared with a stored baseline. A
+metric regresses when it is more than --threshold (relative) worse *and*
+worse by more than its absolute noise floor; any regression exits 1.
+
+Usage:
+    python -m src.benchmarks.regression --dataset eval/dataset.json [--docs 5000] \
+        [--engine src.baselines.bm25_baseline ...] [--runs 3] [--repeat 3] \
+        [--baseline data/benchmark_baseline.json] [--threshold 0.25] \
+        [--metric-threshold peak_rss_mb=0.1] [--update-baseline] [--output bench.json]
+"""
+
+import argparse
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from src.benchmarks.synthetic import write_synthetic_corpus
+from src.corpus import build_corpus_store
+from src.interface import SearchEngine
+from src.scorer import (
+    PROJECT_ROOT,
+    evaluate_query,
+    find_engine_class,
+    load_dataset,
+    load_engine,
+    percentile,
+)
+
+
+DEFAULT_BASELINE_PATH = "data/benchmark_baseline.json"
+DEFAULT_WORK_DIR = "data/benchmarks"
+DEFAULT_ENGINES = ("src.benchmarks.regression", "src.baselines.random_baseline", "src.baselines.bm25_baseline")
+DEFAULT_THRESHOLD = 0.25
+
+# Lower is better for every metric. A change smaller than the floor is noise.
+NOISE_FLOORS = {
+    "cold_start_ms": 5.0,
+    "mean_ms": 0.05,
+    "p50_ms": 0.05,
+    "p95_ms": 0.1,
+    "p99_ms": 0.2,
+    "overhead_us": 5.0,
+    "peak_rss_mb": 2.0,
+}
+
+
+class NullEngine(SearchEngine):
+    """Returns a fixed ranking instantly, so its numbers are the harness's own cost."""
+
+    def __init__(self):
+        self._ids = [f"null-{i}" for i in range(100)]
+
+    def search(self, query: str, top_k: int = 20) -> list[str]:
+        return self._ids[:top_k]
+
+    def name(self) -> str:
+        return "harness"
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process in MiB (None where unavailable)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def measure_engine(module_path: str, params: dict, queries: list[dict], repeat: int = 3) -> dict:
+    """Construct an engine and time the queries through evaluate_query.
+
+    Meant to run in a fresh process (see run_isolated), where cold_start_ms
+    includes importing the engine module and peak_rss_mb is the engine's own.
+    """
+    start = time.perf_counter()
+    engine = load_engine(module_path, params=params)
+    cold_start_ms = (time.perf_counter() - start) * 1000.0
+
+    for query in queries:
+        evaluate_query(query, engine)
+
+    latencies = []
+    overheads = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            result = evaluate_query(query, engine)
+            total_ms = (time.perf_counter() - start) * 1000.0
+            latencies.append(result["latency_ms"])
+            overheads.append(total_ms - result["latency_ms"])
+
+    return {
+        "engine": engine.name(),
+        "cold_start_ms": cold_start_ms,
+        "mean_ms": sum(latencies) / len(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "overhead_us": sum(overheads) / len(overheads) * 1000.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_isolated(module_path: str, params: dict, dataset_path: str, repeat: int) -> dict:
+    """Run measure_engine in a fresh Python process and return its measurements.
+
+    The process runs from PROJECT_ROOT, so a relative dataset_path is
+    resolved against the caller's working directory first; paths in params
+    must already be absolute.
+
+    Raises:
+        RuntimeError: If the subprocess fails.
+    """
+    dataset_path = os.path.abspath(dataset_path)
+    command = [
+        sys.executable, "-m", "src.benchmarks.regression",
+        "--measure", module_path,
+        "--params", json.dumps(params),
+        "--dataset", dataset_path,
+        "--repeat", str(repeat),
+    ]
+    proc = subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Benchmark of {module_path} failed:\n{proc.stderr[-2000:]}")
+    # Engines may print while loading; the measurements are the last line
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def prepare_corpus(work_dir: str, dataset: dict, num_docs: int, seed: int = 0) -> dict:
+    """Generate (once) a synthetic corpus and its store under work_dir.
+
+    Returns the paths engines are pointed at: data_dir, store_path, and the
+    BM25 index_path and dense index_dir.
+    """
+    root = os.path.join(work_dir, f"synthetic-{num_docs}-{seed}")
+    paths = {
+        "data_dir": os.path.join(root, "extracted"),
+        "store_path": os.path.join(root, "corpus.store"),
+        "index_path": os.path.join(root, "bm25.idx"),
+        "index_dir": os.path.join(root, "dense"),
+    }
+    marker = os.path.join(root, "corpus.json")
+    if not os.path.isfile(marker):
+        print(f"Generating a {num_docs}-opinion synthetic corpus in {root}...")
+        count = write_synthetic_corpus(paths["data_dir"], dataset, num_docs, seed)
+        build_corpus_store(paths["data_dir"], paths["store_path"])
+        with open(marker, "w") as f:
+            json.dump({"docs": count, "seed": seed}, f)
+    return paths
+
+
+def corpus_params(module_path: str, paths: dict) -> dict:
+    """The subset of corpus paths that the module's engine constructor accepts."""
+    accepted = inspect.signature(find_engine_class(module_path)).parameters
+    return {name: path for name, path in paths.items() if name in accepted}
+
+
+def median_measurements(runs: list[dict]) -> dict:
+    """Per-metric median over several runs of measure_engine."""
+    merged = {"engine": runs[0]["engine"]}
+    for metric in NOISE_FLOORS:
+        values = [run[metric] for run in runs if run.get(metric) is not None]
+        merged[metric] = statistics.median(values) if values else None
+    return merged
+
+
+def compare_to_baseline(current: dict, baseline: dict, thresholds: dict) -> list[dict]:
+    """Compare {target: measurements} against a baseline of the same shape.
+
+    Returns one row per (target, metric) with 'status' one of 'ok',
+    'improved', 'regressed' or 'new' (no baseline value).
+    """
+    rows = []
+    for target, measurements in current.items():
+        for metric, floor in NOISE_FLOORS.items():
+            value = measurements.get(metric)
+            if value is None:
+                continue
+            base = baseline.get(target, {}).get(metric)
+            row = {"target": target, "metric": metric, "baseline": base, "current": value, "change": None}
+            if base is None:
+                row["status"] = "new"
+            else:
+                delta = value - base
+                row["change"] = delta / base if base else 0.0
+                limit = thresholds.get(metric, DEFAULT_THRESHOLD)
+                if delta > floor and delta > limit * base:
+                    row["status"] = "regressed"
+                elif -delta > floor and -delta > limit * base:
+                    row["status"] = "improved"
+                else:
+                    row["status"] = "ok"
+            rows.append(row)
+    return rows
+
+
+def print_comparison(rows: list[dict]):
+    print(f"{'target':>32s}  {'metric':>13s}  {'baseline':>10s}  {'current':>10s}  {'change':>8s}  status")
+    print("-" * 88)
+    for row in rows:
+        base = f"{row['baseline']:>10.3f}" if row["baseline"] is not None else f"{'-':>10s}"
+        change = f"{row['change']:>+8.1%}" if row["change"] is not None else f"{'-':>8s}"
+        print(f"{row['target'][-32:]:>32s}  {row['metric']:>13s}  {base}  {row['current']:>10.3f}  {change}  {row['status']}")
+
+
+def _threshold_arg(value: str) -> tuple[str, float]:
+    """argparse type for --metric-threshold: 'metric=fraction'."""
+    name, _, fraction = value.partition("=")
+    if name not in NOISE_FLOORS:
+        raise argparse.ArgumentTypeError(f"unknown metric '{name}' (expected one of {', '.join(NOISE_FLOORS)})")
+    try:
+        return name, float(fraction)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected {name}=<fraction>, got '{value}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Performance regression suite for engines and the scorer")
+    parser.add_argument("--dataset", required=True, help="Path to the eval dataset JSON file (queries)")
+    parser.add_argument(
+        "--engine",
+        action="append",
+        default=None,
+        help="Engine module to benchmark (repeatable; default: harness, random and BM25 baselines)",
+    )
+    parser.add_argument("--docs", type=int, default=5000, help="Synthetic corpus size (default: 5000)")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic corpus seed (default: 0)")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help=f"Corpus and index cache (default: {DEFAULT_WORK_DIR})")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per engine; medians are compared (default: 3)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the queries per process (default: 3)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help=f"Baseline file (default: {DEFAULT_BASELINE_PATH})")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Relative slowdown that counts as a regression (default: {DEFAULT_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--metric-threshold",
+        type=_threshold_arg,
+        action="append",
+        default=[],
+        metavar="METRIC=FRACTION",
+        help="Per-metric threshold override, e.g. peak_rss_mb=0.1 (repeatable)",
+    )
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--output", default=None, help="Write measurements and comparison to this JSON file")
+    # Internal: measure one engine in this process and print the results as JSON
+    parser.add_argument("--measure", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--params", default="{}", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.runs < 1 or args.repeat < 1:
+        parser.error("--runs and --repeat must be >= 1")
+    # Engines are measured in subprocesses that run from PROJECT_ROOT, so
+    # paths given relative to this directory are resolved here
+    dataset_arg = args.dataset
+    args.dataset, args.work_dir, args.baseline = (
+        os.path.abspath(path) for path in (args.dataset, args.work_dir, args.baseline)
+    )
+    if args.output:
+        args.output = os.path.abspath(args.output)
+
+    queries = load_dataset(args.dataset)["queries"]
+    if args.measure:
+        print(json.dumps(measure_engine(args.measure, json.loads(args.params), queries, args.repeat)))
+        return
+
+    with open(args.dataset, "r") as f:
+        dataset = json.load(f)
+    paths = prepare_corpus(args.work_dir, dataset, args.docs, args.seed)
+
+    current = {}
+    for module_path in args.engine or DEFAULT_ENGINES:
+        params = corpus_params(module_path, paths)
+        # Untimed warm-up: builds on-disk indexes and warms the page cache
+        run_isolated(module_path, params, args.dataset, 1)
+        runs = [run_isolated(module_path, params, args.dataset, args.repeat) for _ in range(args.runs)]
+        current[module_path] = median_measurements(runs)
+        m = current[module_path]
+        print(f"{module_path}: cold start {m['cold_start_ms']:.1f} ms, p50 {m['p50_ms']:.3f} ms, "
+              f"p95 {m['p95_ms']:.3f} ms, overhead {m['overhead_us']:.1f} us/query")
+
+    config = {
+        # As given, so a baseline stays comparable from another checkout
+        "dataset": dataset_arg,
+        "queries": len(queries),
+        "docs": args.docs,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+    baseline = None
+    if os.path.isfile(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print(f"Warning: baseline was recorded with a different setup: {baseline.get('config')}")
+
+    rows = []
+    if baseline is not None:
+        thresholds = {metric: args.threshold for metric in NOISE_FLOORS}
+        thresholds.update(dict(args.metric_threshold))
+        rows = compare_to_baseline(current, baseline["engines"], thresholds)
+        print()
+        print_comparison(rows)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": config, "engines": current, "comparison": rows}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.update_baseline or baseline is None:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(
+                {"created_at": datetime.now(timezone.utc).isoformat(), "config": config, "engines": current}, f, indent=2,
+            )
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    regressed = [row for row in rows if row["status"] == "regressed"]
+    if regressed:
+        print(f"FAIL: {len(regressed)} metric(s) regressed beyond the threshold")
+        sys.exit(1)
+    print("OK: no regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,449 @@
+"""
+Synthetic opinion corpora shaped like data/extracted, for benchmarks and load tests.
+
+Writes data_dir/{year}/{id}.json files carrying the fields engines read
+(embedding.qa_text, sections.*, citations.*, parsed.date,
+classification.topic_primary, content.full_text), with opinion IDs in every
+format of the real corpus (see ID_FORMATS). Text is drawn from a
+Zipf-weighted vocabulary: the eval dataset's own words first, then a tail of
+pseudo-words, so real queries hit realistic posting lists. Output is
+deterministic for a given seed.
+
+Two entry points:
+
+- write_synthetic_corpus: the corpus alone, including every opinion ID the
+  dataset judges, so the real eval queries can be run against it (used by
+  src/benchmarks/regression.py).
+- generate: a scaled corpus plus synthetic queries and qrels in the
+  eval/dataset.json schema. Judged documents are seeded with their query's
+  key terms (many for score 2, a few for score 1, one for score 0), so
+  engines get meaningful metrics at any scale.
+
+Both stream: opinions are written as they are generated and memory is
+bounded by the query set, not the corpus size.
+
+Usage:
+    python -m src.benchmarks.synthetic --output-dir data/synthetic-10x --scale 10 \
+        [--queries 650] [--seed 0] [--dataset eval/dataset.json] [--dataset-format jsonl]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import string
+import time
+from collections import deque
+from datetime import datetime, timezone
+from itertools import accumulate, chain, product
+
+
+# Number of opinions in the real data/extracted tree; --scale multiplies it
+REAL_CORPUS_SIZE = 14_100
+
+# Words per field: (min, max)
+FIELD_LENGTHS = {
+    "embedding.qa_text": (40, 90),
+    "embedding.summary": (20, 40),
+    "sections.question": (15, 40),
+    "sections.conclusion": (15, 40),
+    "sections.facts": (60, 160),
+    "sections.analysis": (120, 320),
+    "content.full_text": (300, 900),
+}
+
+# Opinion ID formats (see the ID table in SEARCH_ENGINE_TESTING_GUIDE.md):
+# name -> (template, first year, last year, share of generated opinions, variants).
+# Serials run 001-999 per year and variant; a full year moves on to the next
+# variant (another letter, another companion section), so large corpora keep
+# every ID in its documented shape.
+ID_FORMATS = {
+    "five_digit": ("{yy:02d}{serial:03d}", 1975, 1983, 0.14, ("",)),                     # 76188
+    "letter_number": ("{yy:02d}{variant}{serial:03d}", 1982, 1985, 0.05, tuple(string.ascii_uppercase)),  # 82A155
+    "year_dash": ("{yy:02d}-{serial:03d}", 1984, 2003, 0.40, ("",)),                      # 90-162
+    "advice_letter": ("A-{yy:02d}-{serial:03d}", 2004, 2025, 0.26, ("",)),                # A-24-003
+    "informal": ("I-{yy:02d}-{serial:03d}", 2004, 2025, 0.12, ("",)),                     # I-19-145
+    "companion": (                                                                        # 16-073-1090
+        "{yy:02d}-{serial:03d}-{variant}", 2014, 2016, 0.03,
+        tuple(str(section) for section in chain([1090], range(1000, 1090), range(1091, 10000))),
+    ),
+}
+MAX_SERIAL = 999
+
+# Query text length in words, per query type (as in eval/dataset.json)
+QUERY_TYPES = {"keyword": (4, 9), "natural_language": (12, 25), "fact_pattern": (40, 80)}
+
+# Share of judgments per score in the real qrels (2: 40%, 1: 57%, 0: 4%)
+SCORE_WEIGHTS = {2: 0.40, 1: 0.56, 0: 0.04}
+JUDGMENTS_PER_QUERY = (10, 17)
+
+# Dataset vocabulary is padded with pseudo-words up to this size
+VOCABULARY_SIZE = 20_000
+
+_WORD_RE = re.compile(r"[a-z][a-z'-]+")
+_SYLLABLES = (
+    "ba", "co", "de", "fi", "gu", "ha", "je", "ki", "lo", "mu", "na", "pe", "qui", "ro", "su",
+    "ta", "ve", "wi", "xo", "yu", "za", "bre", "cla", "dro", "fle", "gri", "plo", "sta", "tri", "vor",
+)
+
+
+def year_for_id(opinion_id: str) -> str:
+    """Infer the {year} directory of an opinion ID from its first two digits.
+
+    'A-24-003' -> '2024', '76188' -> '1976', 'UNK-91-10483' -> '1991'.
+    """
+    match = re.search(r"\d\d", opinion_id)
+    if match is None:
+        raise ValueError(f"Cannot infer a year from opinion ID '{opinion_id}'")
+    yy = int(match.group())
+    return str(1900 + yy if yy >= 75 else 2000 + yy)
+
+
+def build_vocabulary(dataset: dict, size: int = VOCABULARY_SIZE) -> list[str]:
+    """Words from the dataset's queries and taxonomy, most frequent first,
+    padded with pseudo-words to `size` entries."""
+    counts = {}
+    texts = [q["text"] for q in dataset.get("queries", [])]
+    for topic in dataset.get("taxonomy", {}).values():
+        texts.append(topic.get("description", ""))
+        texts.extend(issue.get("description", "") for issue in topic.get("issues", []))
+    for text in texts:
+        for word in _WORD_RE.findall(text.lower()):
+            counts[word] = counts.get(word, 0) + 1
+    words = sorted(counts, key=lambda w: (-counts[w], w))
+    seen = set(words)
+    for parts in product(_SYLLABLES, repeat=3):
+        if len(words) >= size:
+            break
+        word = "".join(parts)
+        if word not in seen:
+            words.append(word)
+    return words
+
+
+def iter_opinion_ids(rng: random.Random, count: int, reserved=frozenset()):
+    """Yield `count` unique (opinion_id, year) pairs in the ID_FORMATS mix.
+
+    Serials count up per format, year and variant, so IDs never repeat; IDs
+    in `reserved` are skipped. Years whose variants are all used up drop out,
+    then formats whose years are, so the mix holds at 1x but shifts toward
+    letter-number and companion IDs from about 10x (most IDs at 100x).
+
+    Raises:
+        ValueError: If ID_FORMATS cannot supply `count` unique IDs.
+    """
+    names = list(ID_FORMATS)
+    weights = [ID_FORMATS[name][3] for name in names]
+    cum_weights = list(accumulate(weights))
+    open_years = {name: list(range(first, last + 1)) for name, (_, first, last, _, _) in ID_FORMATS.items()}
+    # (name, year) -> (variant position, next serial)
+    positions = {}
+    produced = 0
+    while produced < count:
+        if not names:
+            raise ValueError(f"ID_FORMATS cannot supply {count} unique opinion IDs")
+        name = rng.choices(names, cum_weights=cum_weights)[0]
+        template, _, _, _, variants = ID_FORMATS[name]
+        years = open_years[name]
+        year = years[rng.randrange(len(years))]
+        variant, serial = positions.get((name, year), (0, 1))
+        opinion_id = template.format(yy=year % 100, serial=serial, variant=variants[variant])
+        if serial < MAX_SERIAL:
+            positions[(name, year)] = (variant, serial + 1)
+        elif variant + 1 < len(variants):
+            positions[(name, year)] = (variant + 1, 1)
+        else:
+            years.remove(year)
+            if not years:
+                del weights[names.index(name)]
+                names.remove(name)
+                cum_weights = list(accumulate(weights))
+        if opinion_id in reserved:
+            continue
+        produced += 1
+        yield opinion_id, str(year)
+
+
+class OpinionFactory:
+    """Builds synthetic opinion records from a dataset's vocabulary and statutes."""
+
+    def __init__(self, dataset: dict, seed: int = 0, vocabulary_size: int = VOCABULARY_SIZE):
+        self.rng = random.Random(seed)
+        self.vocabulary = build_vocabulary(dataset, vocabulary_size)
+        # Zipf-like weights, as in natural text
+        self._cum_weights = list(accumulate(1.0 / (rank + 1) for rank in range(len(self.vocabulary))))
+        taxonomy = dataset.get("taxonomy", {})
+        self.topics = sorted(taxonomy) or ["other"]
+        # (topic, issue) pairs; queries cycle through them so every issue is covered
+        self.issues = [
+            (topic, issue["id"]) for topic in self.topics
+            for issue in taxonomy.get(topic, {}).get("issues", []) if "id" in issue
+        ] or [(topic, topic) for topic in self.topics]
+        self.statutes = sorted({
+            statute
+            for topic in taxonomy.values()
+            for issue in topic.get("issues", [])
+            for statute in issue.get("key_statutes", [])
+        }) or ["87100"]
+
+    def words(self, count: int) -> list[str]:
+        return self.rng.choices(self.vocabulary, cum_weights=self._cum_weights, k=count)
+
+    def text(self, field: str, terms: list[str] = ()) -> str:
+        low, high = FIELD_LENGTHS[field]
+        words = self.words(self.rng.randint(low, high))
+        for term in terms:
+            words.insert(self.rng.randrange(len(words) + 1), term)
+        return " ".join(words)
+
+    def key_terms(self, count: int) -> list[str]:
+        """Distinct mid-frequency words: rare enough to discriminate, common enough to look real."""
+        band = self.vocabulary[len(self.vocabulary) // 200:len(self.vocabulary) // 20]
+        return self.rng.sample(band, min(count, len(band)))
+
+    def opinion(self, opinion_id: str, year: str, prior_ids, relevant_to=()) -> dict:
+        """Build one opinion record.
+
+        Args:
+            prior_ids: Recently generated IDs to draw citations.prior_opinions from.
+            relevant_to: (key_terms, score) pairs for the queries judging this
+                opinion; their terms are mixed into the text by score.
+        """
+        rng = self.rng
+        strong, weak = [], []
+        for terms, score in relevant_to:
+            if score == 2:
+                strong.extend(terms * 2)
+                weak.extend(terms)
+            elif score == 1:
+                weak.extend(terms[:max(1, len(terms) // 2)])
+            else:
+                weak.append(terms[0])
+        record = {
+            "embedding": {"summary": self.text("embedding.summary")},
+            "sections": {
+                "question": self.text("sections.question", strong[:len(strong) // 2]),
+                "conclusion": self.text("sections.conclusion"),
+                "facts": self.text("sections.facts"),
+                "analysis": self.text("sections.analysis", weak),
+            },
+            "citations": {
+                "government_code": rng.sample(self.statutes, min(len(self.statutes), rng.randint(0, 6))),
+                "prior_opinions": rng.sample(list(prior_ids), min(len(prior_ids), rng.randint(0, 3))),
+            },
+            "parsed": {"date": f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"},
+            "classification": {"topic_primary": rng.choice(self.topics)},
+            "content": {"full_text": self.text("content.full_text", strong + weak)},
+        }
+        # ~97% of real opinions have qa_text; judged ones always do
+        if relevant_to or rng.random() < 0.97:
+            record["embedding"]["qa_text"] = self.text("embedding.qa_text", strong)
+        return record
+
+    def query(self, query_id: str, key_terms: list[str], issue: tuple[str, str]) -> dict:
+        """A query on (topic, issue) in the eval/dataset.json schema, without judgments yet."""
+        rng = self.rng
+        query_type = rng.choice(list(QUERY_TYPES))
+        low, high = QUERY_TYPES[query_type]
+        words = self.words(max(0, rng.randint(low, high) - len(key_terms)))
+        for term in key_terms:
+            words.insert(rng.randrange(len(words) + 1), term)
+        topic, issue = issue
+        return {
+            "id": query_id,
+            "text": " ".join(words),
+            "type": query_type,
+            "topic": topic,
+            "issue": issue,
+            "notes": f"Synthetic {query_type} query; key terms: {', '.join(key_terms)}.",
+            "relevance_judgments": [],
+        }
+
+
+class _OpinionWriter:
+    """Writes opinion records to data_dir/{year}/{id}.json, creating year directories once."""
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self.count = 0
+        self._years = set()
+
+    def write(self, opinion_id: str, year: str, record: dict):
+        year_dir = os.path.join(self.data_dir, year)
+        if year not in self._years:
+            os.makedirs(year_dir, exist_ok=True)
+            self._years.add(year)
+        with open(os.path.join(year_dir, f"{opinion_id}.json"), "w") as f:
+            json.dump(record, f)
+        self.count += 1
+
+
+def write_synthetic_corpus(data_dir: str, dataset: dict, num_docs: int, seed: int = 0) -> int:
+    """Write a synthetic corpus of at least num_docs opinions into data_dir.
+
+    The dataset's judged opinion IDs come first; the rest get generated IDs
+    in the ID_FORMATS mix. Returns the number of opinions written.
+    """
+    factory = OpinionFactory(dataset, seed)
+    judged = sorted({j["opinion_id"] for q in dataset.get("queries", []) for j in q["relevance_judgments"]})
+    writer = _OpinionWriter(data_dir)
+    recent = deque(maxlen=200)
+    ids = [(opinion_id, year_for_id(opinion_id)) for opinion_id in judged]
+    generated = iter_opinion_ids(factory.rng, max(0, num_docs - len(ids)), reserved=set(judged))
+    for opinion_id, year in chain(ids, generated):
+        writer.write(opinion_id, year, factory.opinion(opinion_id, year, recent))
+        recent.append(opinion_id)
+    return writer.count
+
+
+def plan_queries(factory: OpinionFactory, num_queries: int, num_docs: int) -> tuple[list[dict], dict]:
+    """Pick each query's key terms and judged documents before the corpus is written.
+
+    Returns (queries, judged), where judged maps a document's position in
+    the generated corpus to [(query index, key terms, score), ...]. The
+    queries' relevance_judgments are filled in as those documents are written.
+    """
+    rng = factory.rng
+    scores = list(SCORE_WEIGHTS)
+    weights = [SCORE_WEIGHTS[s] for s in scores]
+    queries = []
+    judged = {}
+    for q in range(num_queries):
+        key_terms = factory.key_terms(rng.randint(2, 4))
+        queries.append(factory.query(f"s{q + 1:06d}", key_terms, factory.issues[q % len(factory.issues)]))
+        count = min(num_docs, rng.randint(*JUDGMENTS_PER_QUERY))
+        for position, doc in enumerate(rng.sample(range(num_docs), count)):
+            # At least three highly relevant opinions per query, as validate_dataset recommends
+            score = 2 if position < 3 else rng.choices(scores, weights)[0]
+            judged.setdefault(doc, []).append((q, key_terms, score))
+    return queries, judged
+
+
+def synthetic_taxonomy(taxonomy: dict, queries: list[dict], per_issue: int = 5) -> dict:
+    """Copy of taxonomy whose example_opinion_ids point at synthetic score-2 opinions of each issue."""
+    examples = {}
+    for query in queries:
+        ids = examples.setdefault((query["topic"], query["issue"]), [])
+        ids.extend(j["opinion_id"] for j in query["relevance_judgments"] if j["score"] == 2)
+    copied = {}
+    for topic_id, topic in taxonomy.items():
+        issues = [
+            dict(issue, example_opinion_ids=examples.get((topic_id, issue.get("id")), [])[:per_issue])
+            for issue in topic.get("issues", [])
+        ]
+        copied[topic_id] = dict(topic, issues=issues)
+    return copied
+
+
+def write_dataset(path: str, queries, taxonomy: dict, description: str):
+    """Stream queries to disk in the eval/dataset.json schema (.json) or one per line (.jsonl)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for query in queries:
+                f.write(json.dumps(query, ensure_ascii=False) + "\n")
+            return
+        header = {
+            "version": "1.0",
+            "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "description": description,
+            "taxonomy": taxonomy,
+        }
+        # Write the header, then the queries one at a time inside its "queries" array
+        f.write(json.dumps(header, ensure_ascii=False, indent=2)[:-2] + ',\n  "queries": [\n')
+        for i, query in enumerate(queries):
+            f.write((",\n" if i else "") + "    " + json.dumps(query, ensure_ascii=False))
+        f.write("\n  ]\n}\n")
+
+
+def generate(
+    output_dir: str,
+    num_docs: int,
+    num_queries: int,
+    dataset: dict,
+    seed: int = 0,
+    dataset_format: str = "json",
+    progress_every: int = 0,
+) -> dict:
+    """Write output_dir/extracted/{year}/{id}.json plus output_dir/dataset.{json,jsonl}.
+
+    Returns {"docs", "queries", "judgments", "data_dir", "dataset"}.
+    """
+    factory = OpinionFactory(dataset, seed)
+    queries, judged = plan_queries(factory, num_queries, num_docs)
+    data_dir = os.path.join(output_dir, "extracted")
+    writer = _OpinionWriter(data_dir)
+    recent = deque(maxlen=200)
+    judgments = 0
+    for position, (opinion_id, year) in enumerate(iter_opinion_ids(factory.rng, num_docs)):
+        relevant_to = judged.pop(position, ())
+        record = factory.opinion(opinion_id, year, recent, [(terms, score) for _, terms, score in relevant_to])
+        writer.write(opinion_id, year, record)
+        recent.append(opinion_id)
+        for q, terms, score in relevant_to:
+            queries[q]["relevance_judgments"].append({
+                "opinion_id": opinion_id,
+                "score": score,
+                "rationale": f"Synthetic: seeded with key terms at relevance {score}.",
+            })
+            judgments += 1
+        if progress_every and (position + 1) % progress_every == 0:
+            print(f"  {position + 1}/{num_docs} opinions")
+
+    dataset_path = os.path.join(output_dir, f"dataset.{dataset_format}")
+    write_dataset(
+        dataset_path, queries, synthetic_taxonomy(dataset.get("taxonomy", {}), queries),
+        f"Synthetic load-test dataset: {num_docs} opinions, {num_queries} queries (seed {seed})",
+    )
+    return {
+        "docs": writer.count,
+        "queries": len(queries),
+        "judgments": judgments,
+        "data_dir": data_dir,
+        "dataset": dataset_path,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic opinion corpus with queries and qrels")
+    parser.add_argument("--output-dir", required=True, help="Writes extracted/{year}/{id}.json and dataset.json here")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--scale", type=float, default=1.0, help=f"Multiple of the real corpus size ({REAL_CORPUS_SIZE})")
+    size.add_argument("--docs", type=int, default=None, help="Exact number of opinions (overrides --scale)")
+    parser.add_argument("--queries", type=int, default=65, help="Number of synthetic queries (default: 65)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument(
+        "--dataset",
+        default="eval/dataset.json",
+        help="Dataset supplying the vocabulary and taxonomy (default: eval/dataset.json)",
+    )
+    parser.add_argument(
+        "--dataset-format",
+        choices=("json", "jsonl"),
+        default="json",
+        help="json: the eval/dataset.json schema; jsonl: one query per line, streamed by the scorer",
+    )
+    args = parser.parse_args()
+
+    num_docs = args.docs if args.docs is not None else round(REAL_CORPUS_SIZE * args.scale)
+    if num_docs < 1 or args.queries < 0:
+        parser.error("the corpus needs at least one opinion and --queries must be >= 0")
+    if os.path.isdir(os.path.join(args.output_dir, "extracted")):
+        parser.error(f"{args.output_dir}/extracted already exists; choose a new --output-dir")
+
+    with open(args.dataset, "r") as f:
+        dataset = json.load(f)
+    print(f"Generating {num_docs} opinions and {args.queries} queries in {args.output_dir}...")
+    start = time.perf_counter()
+    stats = generate(
+        args.output_dir, num_docs, args.queries, dataset,
+        seed=args.seed, dataset_format=args.dataset_format, progress_every=max(num_docs // 20, 1000),
+    )
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {stats['docs']} opinions to {stats['data_dir']} in {elapsed:.1f}s")
+    print(f"Wrote {stats['queries']} queries ({stats['judgments']} judgments) to {stats['dataset']}")
+
+
+if __name__ == "__main__":
+    main()
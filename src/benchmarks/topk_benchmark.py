@@ -0,0 +1,102 @@
+"""
+Benchmark MaxScore dynamic pruning against exhaustive BM25 scoring.
+
+Runs the dataset's queries (fact_pattern by default — the long, slow ones)
+through BM25Baseline with both top-k strategies, checks that the rankings
+are identical, and reports latency and the fraction of postings scored.
+Exits 1 if any ranking differs.
+
+Usage:
+    python -m src.benchmarks.topk_benchmark --dataset eval/dataset.json \
+        [--index-path data/bm25.idx] [--query-type fact_pattern] [--repeat 3]
+"""
+
+import argparse
+import sys
+import time
+
+from src.baselines.bm25_baseline import DEFAULT_INDEX_PATH, PRUNING_STRATEGIES, BM25Baseline
+from src.baselines.topk import PruningStats
+from src.corpus import DEFAULT_STORE_PATH
+from src.scorer import load_dataset, percentile
+
+
+def run_strategy(engine: BM25Baseline, queries: list[str], strategy: str, top_k: int, repeat: int) -> dict:
+    """Time every query `repeat` times under one strategy.
+
+    Returns latency percentiles (ms, per query), the scored-postings fraction,
+    the exact re-sum probes per query, and the rankings from the final repetition.
+    """
+    latencies = []
+    stats = PruningStats()
+    rankings = []
+    for rep in range(repeat):
+        rankings = []
+        for query in queries:
+            start = time.perf_counter()
+            ranking = engine.top_k(query, top_k, pruning=strategy, stats=stats if rep == 0 else None)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            rankings.append(ranking)
+    return {
+        "mean_ms": sum(latencies) / len(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "scored_fraction": stats.postings_scored / stats.postings_total if stats.postings_total else 0.0,
+        "postings_per_query": stats.postings_total / len(queries),
+        "rescored_per_query": stats.postings_rescored / len(queries),
+        "rankings": rankings,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MaxScore vs exhaustive BM25 top-k")
+    parser.add_argument("--dataset", required=True, help="Path to the eval dataset JSON file")
+    parser.add_argument("--index-path", default=DEFAULT_INDEX_PATH, help="BM25 index (built if missing)")
+    parser.add_argument("--data-dir", default="data/extracted", help="Corpus used to build a missing index")
+    parser.add_argument("--store-path", default=DEFAULT_STORE_PATH, help="Corpus store used to build a missing index")
+    parser.add_argument(
+        "--query-type",
+        default="fact_pattern",
+        help="Only benchmark queries of this type ('all' for every query; default: fact_pattern)",
+    )
+    parser.add_argument("--top-k", type=int, default=20, help="Results per query (default: 20)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per strategy (default: 3)")
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.dataset)
+    queries = [
+        q["text"] for q in dataset["queries"]
+        if args.query_type == "all" or q.get("type") == args.query_type
+    ]
+    if not queries:
+        print(f"No '{args.query_type}' queries in {args.dataset}")
+        sys.exit(1)
+
+    engine = BM25Baseline(data_dir=args.data_dir, index_path=args.index_path, store_path=args.store_path)
+    # Warm the page cache and lazily computed bounds before timing
+    for query in queries:
+        engine.top_k(query, args.top_k)
+
+    results = {s: run_strategy(engine, queries, s, args.top_k, args.repeat) for s in PRUNING_STRATEGIES}
+
+    print(f"{len(queries)} {args.query_type} queries, top-{args.top_k}, {args.repeat} passes, "
+          f"{engine.index.num_docs} docs")
+    print(f"{'strategy':>12s}  {'mean ms':>9s}  {'p50 ms':>9s}  {'p95 ms':>9s}  {'scored':>7s}  {'postings/q':>10s}  {'rescored/q':>10s}")
+    for strategy, r in results.items():
+        print(f"{strategy:>12s}  {r['mean_ms']:>9.2f}  {r['p50_ms']:>9.2f}  {r['p95_ms']:>9.2f}  "
+              f"{r['scored_fraction']:>6.1%}  {r['postings_per_query']:>10.0f}  {r['rescored_per_query']:>10.0f}")
+
+    exhaustive, maxscore = results["exhaustive"], results["maxscore"]
+    print(f"Speedup: {exhaustive['mean_ms'] / maxscore['mean_ms']:.2f}x")
+
+    mismatches = [
+        i for i, (a, b) in enumerate(zip(exhaustive["rankings"], maxscore["rankings"])) if a != b
+    ]
+    if mismatches:
+        print(f"FAIL: {len(mismatches)} queries returned different top-{args.top_k} rankings")
+        sys.exit(1)
+    print(f"OK: all {len(queries)} rankings identical")
+
+
+if __name__ == "__main__":
+    main()
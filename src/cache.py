@@ -0,0 +1,222 @@
+"""
+On-disk cache of engine rankings for the scoring harness.
+
+Rankings are stored in a SQLite database keyed by an engine fingerprint
+(engine name plus a user-supplied version or config hash), the query text,
+and top_k. Re-scoring after a metric or aggregation change then reuses the
+cached rankings and calls the engine only for cache misses. The cache is
+bounded by entry count with least-recently-used eviction.
+
+Usage:
+    python src/cache.py --cache-dir .cache/runs stats
+    python src/cache.py --cache-dir .cache/runs invalidate [--fingerprint "BM25Baseline@v2"]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import deque
+
+
+CACHE_FILENAME = "runs.sqlite3"
+DEFAULT_MAX_ENTRIES = 100_000
+
+# Writes are committed in groups of this many operations (and on close)
+_COMMIT_EVERY = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rankings (
+    key         TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    query       TEXT NOT NULL,
+    top_k       INTEGER NOT NULL,
+    results     TEXT NOT NULL,
+    last_used   INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rankings_last_used ON rankings (last_used);
+CREATE INDEX IF NOT EXISTS rankings_fingerprint ON rankings (fingerprint);
+"""
+
+
+def engine_fingerprint(engine_name: str, version: str | None = None, params: dict | None = None) -> str:
+    """Combine an engine name, a user-supplied version/config string and constructor params into a cache namespace."""
+    fingerprint = f"{engine_name}@{version}" if version else engine_name
+    if params:
+        fingerprint += "?" + ",".join(f"{k}={json.dumps(v)}" for k, v in sorted(params.items()))
+    return fingerprint
+
+
+def _cache_key(fingerprint: str, query: str, top_k: int) -> str:
+    payload = json.dumps([fingerprint, query, top_k], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RunCache:
+    """SQLite-backed ranking cache with size-bounded LRU eviction.
+
+    Not safe to share across threads or processes; the scorer only touches
+    it from the main thread.
+    """
+
+    def __init__(self, cache_dir: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be >= 1, got {max_entries}")
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, CACHE_FILENAME)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(self.path)
+        self._conn.executescript(_SCHEMA)
+        self._pending_writes = 0
+        # LRU stamps: wall-clock nanoseconds, bumped so they strictly increase
+        (latest,) = self._conn.execute("SELECT MAX(last_used) FROM rankings").fetchone()
+        self._clock = max(time.time_ns(), (latest or 0) + 1)
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def get(self, fingerprint: str, query: str, top_k: int) -> list[str] | None:
+        """Return the cached ranking, or None on a miss. Hits refresh the entry's LRU stamp."""
+        key = _cache_key(fingerprint, query, top_k)
+        row = self._conn.execute("SELECT results FROM rankings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._conn.execute("UPDATE rankings SET last_used = ? WHERE key = ?", (self._tick(), key))
+        self._wrote()
+        return json.loads(row[0])
+
+    def put(self, fingerprint: str, query: str, top_k: int, results: list[str]):
+        """Store a ranking, replacing any existing entry for the same key."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO rankings (key, fingerprint, query, top_k, results, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (_cache_key(fingerprint, query, top_k), fingerprint, query, top_k,
+             json.dumps(results), self._tick()),
+        )
+        self._wrote()
+
+    def _wrote(self):
+        self._pending_writes += 1
+        if self._pending_writes >= _COMMIT_EVERY:
+            self.flush()
+
+    def flush(self):
+        """Commit pending writes and evict least-recently-used entries over the size bound."""
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM rankings").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM rankings WHERE key IN "
+                "(SELECT key FROM rankings ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+        self._conn.commit()
+        self._pending_writes = 0
+
+    def invalidate(self, fingerprint: str | None = None) -> int:
+        """Delete every entry (or only one fingerprint's entries). Returns the number removed."""
+        if fingerprint is None:
+            cursor = self._conn.execute("DELETE FROM rankings")
+        else:
+            cursor = self._conn.execute("DELETE FROM rankings WHERE fingerprint = ?", (fingerprint,))
+        self._conn.commit()
+        return cursor.rowcount
+
+    def stats(self) -> dict[str, int]:
+        """Return {fingerprint: entry count} for everything in the cache."""
+        rows = self._conn.execute(
+            "SELECT fingerprint, COUNT(*) FROM rankings GROUP BY fingerprint ORDER BY fingerprint"
+        )
+        return dict(rows.fetchall())
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_cached_evaluations(queries, cache: RunCache, fingerprint: str, evaluate, score, top_k: int = 20):
+    """Serve queries from the cache and evaluate only the misses, preserving dataset order.
+
+    Args:
+        queries: Iterable of query dicts.
+        cache: An open RunCache.
+        fingerprint: Engine fingerprint (see engine_fingerprint).
+        evaluate: Callable taking an iterable of query dicts and yielding
+            per-query result dicts in the same order (e.g. a partial of
+            scorer.iter_evaluations). Only cache misses are passed to it.
+        score: Callable(query, results) -> per-query result dict, used for hits.
+        top_k: Ranking depth the engine is asked for (part of the cache key).
+
+    Yields per-query result dicts with an added boolean 'cached' field.
+    """
+    pending = deque()  # (query, cached ranking or None), in dataset order
+
+    def misses():
+        for query in queries:
+            cached = cache.get(fingerprint, query["text"], top_k)
+            pending.append((query, cached))
+            if cached is None:
+                yield query
+
+    for result in evaluate(misses()):
+        # Everything ahead of this miss in dataset order is a hit
+        while pending[0][1] is not None:
+            query, cached = pending.popleft()
+            yield {**score(query, cached), "cached": True}
+        query, _ = pending.popleft()
+        cache.put(fingerprint, query["text"], top_k, result["results"])
+        yield {**result, "cached": False}
+
+    while pending:
+        query, cached = pending.popleft()
+        yield {**score(query, cached), "cached": True}
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the scorer's ranking cache")
+    parser.add_argument("--cache-dir", required=True, help="Cache directory passed to scorer --cache-dir")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Show entry counts per engine fingerprint")
+    invalidate = subparsers.add_parser("invalidate", help="Delete cached rankings")
+    invalidate.add_argument(
+        "--fingerprint",
+        default=None,
+        help="Only delete this engine fingerprint's entries (e.g. 'BM25Baseline@v2'); default: all",
+    )
+    args = parser.parse_args()
+
+    if not os.path.isfile(os.path.join(args.cache_dir, CACHE_FILENAME)):
+        print(f"No cache found in '{args.cache_dir}'")
+        sys.exit(1)
+
+    with RunCache(args.cache_dir) as cache:
+        if args.command == "stats":
+            counts = cache.stats()
+            for fingerprint, count in counts.items():
+                print(f"  {count:>8d}  {fingerprint}")
+            print(f"{sum(counts.values())} cached rankings")
+        else:
+            removed = cache.invalidate(args.fingerprint)
+            target = f"for '{args.fingerprint}'" if args.fingerprint else "in total"
+            print(f"Removed {removed} cached rankings {target}")
+
+
+if __name__ == "__main__":
+    main()
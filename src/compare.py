@@ -0,0 +1,328 @@
+"""
+Paired significance testing for comparing scorer result files.
+
+Compares two or more JSON files written by `scorer.py --output` (with or
+without --stream) against a baseline (the first file). For each metric and each slice of the query set
+(overall, per query type, per topic) it reports the mean difference with a
+paired bootstrap confidence interval, a two-sided paired randomization
+(sign-flip) test, and Holm-corrected p-values across the runs compared in
+that metric/slice.
+
+Resampling is vectorized: a bootstrap draw is a row of multinomial counts
+over the queries and a randomization draw a row of random signs, so every
+run's resampled means come out of one matrix product per slice and metric.
+
+Usage:
+    python src/compare.py results/bm25.json results/semantic.json [results/hybrid.json ...]
+        [--metrics ndcg@10,mrr] [--slices overall,type,topic] [--samples 10000] [--seed 0]
+        [--output comparison.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.stream import iter_stream
+
+
+SLICE_KINDS = ("overall", "type", "topic")
+DEFAULT_SAMPLES = 10_000
+
+
+# ---------------------------------------------------------------------------
+# Statistics
+# ---------------------------------------------------------------------------
+
+def bootstrap_counts(n: int, samples: int, rng: np.random.Generator) -> np.ndarray:
+    """(samples, n) multinomial counts: how often each query appears in each bootstrap resample."""
+    return rng.multinomial(n, np.full(n, 1.0 / n), size=samples).astype(np.float64)
+
+
+def sign_flips(n: int, samples: int, rng: np.random.Generator) -> np.ndarray:
+    """(samples, n) random +/-1 signs, one row per randomization permutation."""
+    return rng.integers(0, 2, size=(samples, n)).astype(np.float64) * 2.0 - 1.0
+
+
+def paired_bootstrap(diffs: np.ndarray, counts: np.ndarray, confidence: float = 0.95):
+    """Percentile bootstrap confidence intervals for mean paired differences.
+
+    Args:
+        diffs: (runs, queries) per-query metric differences against the baseline.
+        counts: Resamples from bootstrap_counts.
+        confidence: Two-sided coverage of the interval.
+
+    Returns:
+        (low, high) arrays of shape (runs,).
+    """
+    means = diffs @ counts.T / diffs.shape[1]
+    tail = (1.0 - confidence) / 2.0 * 100.0
+    low, high = np.percentile(means, [tail, 100.0 - tail], axis=1)
+    return low, high
+
+
+def randomization_test(diffs: np.ndarray, signs: np.ndarray) -> np.ndarray:
+    """Two-sided paired randomization test of mean difference = 0.
+
+    Under the null the sign of each query's difference is exchangeable, so
+    each permutation (a row of sign_flips) flips every query's sign with
+    probability 1/2.
+
+    Returns:
+        p-values of shape (runs,), computed as (1 + #extreme) / (1 + permutations).
+    """
+    observed = np.abs(diffs.mean(axis=1))
+    permuted = np.abs(diffs @ signs.T / diffs.shape[1])
+    # Tolerance so permutations equal to the observed mean count as extreme
+    extreme = (permuted >= observed[:, None] - 1e-12).sum(axis=1)
+    return (1.0 + extreme) / (1.0 + len(signs))
+
+
+def holm_adjust(pvalues) -> np.ndarray:
+    """Holm-Bonferroni step-down adjusted p-values (same order as the input)."""
+    pvalues = np.asarray(pvalues, dtype=np.float64)
+    m = len(pvalues)
+    order = np.argsort(pvalues, kind="stable")
+    stepped = np.minimum(1.0, (m - np.arange(m)) * pvalues[order])
+    adjusted = np.empty(m)
+    adjusted[order] = np.maximum.accumulate(stepped)
+    return adjusted
+
+
+# ---------------------------------------------------------------------------
+# Comparison
+# ---------------------------------------------------------------------------
+
+def read_run(path: str) -> tuple[str | None, list[dict]]:
+    """Read (engine name, per-query results) from a scorer results file.
+
+    Accepts a results JSON with an inline per_query list, one written with
+    --stream (per_query_stream names the JSONL file; a relative path is
+    tried from the working directory, then next to the results file), or
+    the .jsonl stream itself, which has no engine name.
+
+    Raises:
+        ValueError: If the file has neither per_query nor per_query_stream.
+    """
+    if path.endswith(".jsonl"):
+        return None, list(iter_stream(path))
+    with open(path, "r") as f:
+        data = json.load(f)
+    if isinstance(data.get("per_query"), list):
+        return data.get("engine"), data["per_query"]
+    stream_path = data.get("per_query_stream")
+    if not isinstance(stream_path, str):
+        raise ValueError(f"'{path}' is not a scorer results file (no per_query list or per_query_stream)")
+    if not os.path.isabs(stream_path) and not os.path.exists(stream_path):
+        stream_path = os.path.join(os.path.dirname(path), stream_path)
+    return data.get("engine"), list(iter_stream(stream_path))
+
+
+def load_runs(paths: list[str]) -> list[dict]:
+    """Load scorer result files (see read_run), keeping only queries present in every run.
+
+    Returns:
+        One dict per run: {"name", "path", "per_query": {query_id: query result}}.
+
+    Raises:
+        ValueError: If a file is not a scorer results file or no query is shared.
+    """
+    runs = []
+    for path in paths:
+        engine, per_query = read_run(path)
+        runs.append({
+            "name": engine or path,
+            "path": path,
+            "per_query": {qr["query_id"]: qr for qr in per_query},
+        })
+
+    names = [run["name"] for run in runs]
+    for run in runs:
+        if names.count(run["name"]) > 1:
+            run["name"] = run["path"]
+
+    shared = set(runs[0]["per_query"])
+    for run in runs[1:]:
+        shared &= set(run["per_query"])
+    for run in runs:
+        dropped = len(run["per_query"]) - len(shared)
+        if dropped:
+            print(f"Warning: ignoring {dropped} queries of {run['path']} missing from other runs")
+    if not shared:
+        raise ValueError("The runs have no queries in common")
+    order = [qid for qid in runs[0]["per_query"] if qid in shared]
+    for run in runs:
+        run["per_query"] = {qid: run["per_query"][qid] for qid in order}
+    return runs
+
+
+def query_slices(per_query: dict[str, dict], kinds=SLICE_KINDS) -> dict[str, np.ndarray]:
+    """Map slice labels ('overall', 'type:keyword', 'topic:gifts', ...) to query column indices."""
+    slices = {}
+    results = list(per_query.values())
+    if "overall" in kinds:
+        slices["overall"] = np.arange(len(results))
+    for kind in ("type", "topic"):
+        if kind not in kinds:
+            continue
+        groups = {}
+        for i, qr in enumerate(results):
+            groups.setdefault(qr.get(f"query_{kind}", "unknown"), []).append(i)
+        for value in sorted(groups):
+            slices[f"{kind}:{value}"] = np.array(groups[value])
+    return slices
+
+
+def compare_runs(
+    runs: list[dict],
+    metrics: list[str],
+    slice_kinds=SLICE_KINDS,
+    samples: int = DEFAULT_SAMPLES,
+    confidence: float = 0.95,
+    seed: int = 0,
+) -> list[dict]:
+    """Compare every run after the first against runs[0] (the baseline).
+
+    Returns one row per (metric, slice, run) with the baseline and run means,
+    the mean difference, its bootstrap CI, and raw and Holm-adjusted p-values.
+    Holm's correction is applied within each (metric, slice) family.
+    """
+    rng = np.random.default_rng(seed)
+    baseline, others = runs[0], runs[1:]
+    # (runs, queries) score matrix per metric
+    matrices = {
+        metric: np.array([[qr["metrics"][metric] for qr in run["per_query"].values()] for run in runs])
+        for metric in metrics
+    }
+    rows = []
+    for label, columns in query_slices(baseline["per_query"], slice_kinds).items():
+        n = len(columns)
+        # One resample set per slice, shared by every metric and run (paired design)
+        counts = bootstrap_counts(n, samples, rng)
+        signs = sign_flips(n, samples, rng)
+        for metric in metrics:
+            scores = matrices[metric][:, columns]
+            diffs = scores[1:] - scores[:1]
+            observed = diffs.mean(axis=1)
+            low, high = paired_bootstrap(diffs, counts, confidence)
+            pvalues = randomization_test(diffs, signs)
+            adjusted = holm_adjust(pvalues)
+
+            for i, run in enumerate(others):
+                rows.append({
+                    "metric": metric,
+                    "slice": label,
+                    "num_queries": n,
+                    "baseline": baseline["name"],
+                    "run": run["name"],
+                    "baseline_mean": float(scores[0].mean()),
+                    "run_mean": float(scores[i + 1].mean()),
+                    "diff": float(observed[i]),
+                    "ci_low": float(low[i]),
+                    "ci_high": float(high[i]),
+                    "p_value": float(pvalues[i]),
+                    "p_holm": float(adjusted[i]),
+                })
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------------
+
+def print_comparison(rows: list[dict], confidence: float, alpha: float):
+    """Print one block per (metric, slice); '*' marks Holm-adjusted p < alpha."""
+    thin_sep = "-" * 80
+    ci_label = f"{confidence * 100:g}% CI"
+    block = None
+    for row in rows:
+        if (row["metric"], row["slice"]) != block:
+            block = (row["metric"], row["slice"])
+            print()
+            print(f"  {row['metric']} — {row['slice']} ({row['num_queries']} queries), "
+                  f"baseline {row['baseline']} = {row['baseline_mean']:.3f}")
+            print(f"{'Run':>20s}  {'mean':>6s}  {'diff':>7s}  {ci_label:>17s}  {'p':>6s}  {'p(Holm)':>7s}")
+            print(thin_sep)
+        marker = " *" if row["p_holm"] < alpha else ""
+        print(
+            f"{row['run'][:20]:>20s}  {row['run_mean']:>6.3f}  {row['diff']:>+7.3f}  "
+            f"[{row['ci_low']:>+6.3f}, {row['ci_high']:>+6.3f}]  {row['p_value']:>6.4f}  "
+            f"{row['p_holm']:>7.4f}{marker}"
+        )
+    print()
+    print(f"  * Holm-adjusted p < {alpha:g}")
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Paired significance tests between scorer result files")
+    parser.add_argument("results", nargs="+", help="Scorer --output JSON files; the first is the baseline")
+    parser.add_argument(
+        "--metrics",
+        default=None,
+        help="Comma-separated metrics to compare (default: every metric in the baseline file)",
+    )
+    parser.add_argument(
+        "--slices",
+        default=",".join(SLICE_KINDS),
+        help=f"Comma-separated slices to report, from {', '.join(SLICE_KINDS)} (default: all)",
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=DEFAULT_SAMPLES,
+        help=f"Bootstrap resamples and randomization permutations (default: {DEFAULT_SAMPLES})",
+    )
+    parser.add_argument("--confidence", type=float, default=0.95, help="Confidence interval coverage (default: 0.95)")
+    parser.add_argument("--alpha", type=float, default=0.05, help="Significance level for the * marker (default: 0.05)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--output", default=None, help="Optional path to write the comparison rows as JSON")
+    args = parser.parse_args()
+
+    if len(args.results) < 2:
+        parser.error("need at least two result files to compare")
+    if args.samples < 1:
+        parser.error("--samples must be >= 1")
+    if not 0.0 < args.confidence < 1.0:
+        parser.error("--confidence must be between 0 and 1")
+    slice_kinds = [s.strip() for s in args.slices.split(",") if s.strip()]
+    unknown = set(slice_kinds) - set(SLICE_KINDS)
+    if unknown:
+        parser.error(f"unknown slices: {', '.join(sorted(unknown))}")
+
+    try:
+        runs = load_runs(args.results)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    first = next(iter(runs[0]["per_query"].values()))
+    metrics = [m.strip() for m in args.metrics.split(",")] if args.metrics else list(first["metrics"])
+    for run in runs:
+        missing = [m for m in metrics if m not in next(iter(run["per_query"].values()))["metrics"]]
+        if missing:
+            print(f"Error: {run['path']} has no {', '.join(missing)} metric")
+            sys.exit(1)
+
+    rows = compare_runs(
+        runs, metrics, slice_kinds, samples=args.samples, confidence=args.confidence, seed=args.seed,
+    )
+    print(f"Baseline: {runs[0]['name']} ({runs[0]['path']}); {args.samples} resamples, seed {args.seed}")
+    print_comparison(rows, args.confidence, args.alpha)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"samples": args.samples, "confidence": args.confidence, "seed": args.seed, "rows": rows}, f, indent=2)
+        print(f"Comparison written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,474 @@
+"""
+Compact, memory-mapped corpus store for the extracted FPPC opinions.
+
+Compiles data/extracted/{year}/*.json once into a single binary file holding
+an ID table, an offset table, and the commonly used opinion fields. Engines
+open the store with mmap and decode individual fields lazily by opinion ID,
+so startup no longer pays for walking and parsing ~14,100 JSON files.
+
+File layout (little-endian):
+    header    magic, format version, num_docs, num_fields, offsets/meta positions
+    data      field-major blob: every document's value for field 0, then field 1, ...
+              Each value is UTF-8 JSON; a zero-length slot means the field is missing.
+    offsets   uint64[num_fields * num_docs + 1] start positions into the data blob
+    meta      UTF-8 JSON: {"fields": [...], "ids": [...], "years": [...], "source": {...}}
+
+"source" records the tree the store was compiled from (absolute data_dir,
+file count, latest file mtime). Corpus readers only read the store in place
+of a data_dir that still matches it (see prefer_store).
+
+Usage:
+    python src/corpus.py --data-dir data/extracted --output data/corpus.store
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+
+STORE_MAGIC = b"FPPCCORP"
+STORE_VERSION = 1
+DEFAULT_STORE_PATH = "data/corpus.store"
+
+# magic, version, num_docs, num_fields, data_offset, offsets_offset, meta_offset, meta_length
+_HEADER = struct.Struct("<8sIIIxxxxQQQQ")
+
+STORE_FIELDS = (
+    "embedding.qa_text",
+    "embedding.summary",
+    "sections.question",
+    "sections.question_synthetic",
+    "sections.conclusion",
+    "sections.conclusion_synthetic",
+    "sections.facts",
+    "sections.analysis",
+    "citations.government_code",
+    "citations.prior_opinions",
+    "parsed.date",
+    "classification.topic_primary",
+    "content.full_text",
+)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def iter_opinion_files(data_dir: str):
+    """Yield (opinion_id, year, path) for data_dir/{year}/*.json in sorted order."""
+    for year_dir in sorted(os.listdir(data_dir)):
+        year_path = os.path.join(data_dir, year_dir)
+        if not os.path.isdir(year_path):
+            continue
+        for fname in sorted(os.listdir(year_path)):
+            if fname.endswith(".json"):
+                yield fname[:-5], year_dir, os.path.join(year_path, fname)
+
+
+def tree_fingerprint(data_dir: str) -> dict:
+    """{"files": count, "mtime_ns": latest file mtime} for data_dir/{year}/*.json."""
+    files = 0
+    latest = 0
+    for _, _, path in iter_opinion_files(data_dir):
+        files += 1
+        latest = max(latest, os.stat(path).st_mtime_ns)
+    return {"files": files, "mtime_ns": latest}
+
+
+def get_field(record: dict, path: str):
+    """Look up a dotted field path (e.g. 'embedding.qa_text') in an opinion dict.
+
+    Returns None if any component is missing.
+    """
+    value = record
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+        if value is None:
+            return None
+    return value
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def build_corpus_store(
+    data_dir: str,
+    output_path: str,
+    fields: tuple[str, ...] = STORE_FIELDS,
+) -> int:
+    """Compile the extracted opinion tree into a store file.
+
+    Each opinion is parsed once per build. Values are spooled to one
+    temporary file per field, then concatenated, so memory use is bounded by
+    the ID and offset tables rather than the corpus size.
+
+    Args:
+        data_dir: Directory containing {year}/*.json opinion files.
+        output_path: Where to write the store (replaced atomically).
+        fields: Dotted field paths to include.
+
+    Returns:
+        The number of opinions written.
+
+    Raises:
+        RuntimeError: If data_dir contains no opinion files.
+    """
+    ids = []
+    years = []
+    latest = 0
+    lengths = [array("Q") for _ in fields]
+    spool_paths = [f"{output_path}.field{i}.tmp" for i in range(len(fields))]
+    try:
+        spools = [open(p, "wb") for p in spool_paths]
+        try:
+            for opinion_id, year, path in iter_opinion_files(data_dir):
+                with open(path, "r") as f:
+                    record = json.load(f)
+                ids.append(opinion_id)
+                years.append(year)
+                latest = max(latest, os.stat(path).st_mtime_ns)
+                for i, field in enumerate(fields):
+                    value = get_field(record, field)
+                    encoded = b"" if value is None else json.dumps(value).encode("utf-8")
+                    spools[i].write(encoded)
+                    lengths[i].append(len(encoded))
+        finally:
+            for spool in spools:
+                spool.close()
+
+        if not ids:
+            raise RuntimeError(
+                f"No opinion files found in '{data_dir}'. "
+                "Ensure it contains year subdirectories with .json files."
+            )
+
+        offsets = array("Q", [0])
+        for field_lengths in lengths:
+            for n in field_lengths:
+                offsets.append(offsets[-1] + n)
+
+        source = {"data_dir": os.path.abspath(data_dir), "files": len(ids), "mtime_ns": latest}
+        meta = json.dumps({"fields": list(fields), "ids": ids, "years": years, "source": source}).encode("utf-8")
+        data_offset = _HEADER.size
+        offsets_offset = _align8(data_offset + offsets[-1])
+        meta_offset = offsets_offset + len(offsets) * offsets.itemsize
+
+        tmp_path = output_path + ".tmp"
+        with open(tmp_path, "wb") as out:
+            out.write(_HEADER.pack(
+                STORE_MAGIC, STORE_VERSION, len(ids), len(fields),
+                data_offset, offsets_offset, meta_offset, len(meta),
+            ))
+            for spool_path in spool_paths:
+                with open(spool_path, "rb") as spool:
+                    while chunk := spool.read(1 << 20):
+                        out.write(chunk)
+            out.write(b"\0" * (offsets_offset - out.tell()))
+            if sys.byteorder == "big":
+                offsets.byteswap()
+            offsets.tofile(out)
+            out.write(meta)
+        os.replace(tmp_path, output_path)
+    finally:
+        for spool_path in spool_paths:
+            if os.path.exists(spool_path):
+                os.remove(spool_path)
+
+    return len(ids)
+
+
+def _align8(n: int) -> int:
+    return (n + 7) & ~7
+
+
+# ---------------------------------------------------------------------------
+# Read
+# ---------------------------------------------------------------------------
+
+class CorpusStore:
+    """Read-only, memory-mapped view of a compiled corpus store.
+
+    Opening a store reads only the header and the ID table; field values are
+    decoded on access. The mapping is shared between processes by the OS page
+    cache, so forked scorer workers do not duplicate it.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, num_docs, num_fields, data_offset,
+         offsets_offset, meta_offset, meta_length) = _HEADER.unpack_from(self._mm, 0)
+        if magic != STORE_MAGIC:
+            self.close()
+            raise ValueError(f"'{path}' is not a corpus store")
+        if version != STORE_VERSION:
+            self.close()
+            raise ValueError(
+                f"Corpus store '{path}' has format version {version}, expected {STORE_VERSION}. "
+                "Rebuild it with src/corpus.py."
+            )
+
+        meta = json.loads(self._mm[meta_offset:meta_offset + meta_length])
+        self.fields = tuple(meta["fields"])
+        self.ids = meta["ids"]
+        self.years = meta["years"]
+        # Stores built before the source was recorded have None
+        self.source = meta.get("source")
+        self._num_docs = num_docs
+        self._data_offset = data_offset
+        self._field_index = {field: i for i, field in enumerate(self.fields)}
+        self._doc_index = {opinion_id: i for i, opinion_id in enumerate(self.ids)}
+        self._offsets = memoryview(self._mm)[
+            offsets_offset:offsets_offset + (num_fields * num_docs + 1) * 8
+        ].cast("Q")
+        if sys.byteorder == "big":
+            # The table is little-endian on disk; read a byte-swapped copy
+            view, self._offsets = self._offsets, array("Q", self._offsets)
+            view.release()
+            self._offsets.byteswap()
+
+    def __len__(self) -> int:
+        return self._num_docs
+
+    def __contains__(self, opinion_id: str) -> bool:
+        return opinion_id in self._doc_index
+
+    def doc_index(self, opinion_id: str) -> int:
+        """Return the integer position of opinion_id (stable for a given store file)."""
+        return self._doc_index[opinion_id]
+
+    def get(self, opinion_id: str, field: str):
+        """Return one field of one opinion, or None if the opinion lacks it.
+
+        Raises:
+            KeyError: If the opinion ID or field is not in the store.
+        """
+        if field not in self._field_index:
+            raise KeyError(f"Field '{field}' is not in corpus store (available: {list(self.fields)})")
+        return self.get_by_index(self._doc_index[opinion_id], field)
+
+    def get_by_index(self, doc: int, field: str):
+        """Like get(), but addressed by integer document position."""
+        slot = self._field_index[field] * self._num_docs + doc
+        start = self._offsets[slot]
+        end = self._offsets[slot + 1]
+        if start == end:
+            return None
+        base = self._data_offset
+        return json.loads(self._mm[base + start:base + end])
+
+    def record(self, opinion_id: str) -> dict:
+        """Return every stored field of one opinion as a flat {field: value} dict."""
+        doc = self._doc_index[opinion_id]
+        return {field: self.get_by_index(doc, field) for field in self.fields}
+
+    def iter_field(self, field: str):
+        """Yield (opinion_id, value) for every opinion, in store order."""
+        for doc, opinion_id in enumerate(self.ids):
+            yield opinion_id, self.get_by_index(doc, field)
+
+    def close(self):
+        """Release the mapping. Field access is invalid afterwards."""
+        if isinstance(getattr(self, "_offsets", None), memoryview):
+            self._offsets.release()
+        self._offsets = None
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# (store_path, data_dir) pairs already warned about by prefer_store
+_warned_stores = set()
+
+
+def prefer_store(data_dir: str = "data/extracted", store_path: str = DEFAULT_STORE_PATH) -> bool:
+    """Whether corpus readers should read store_path instead of data_dir.
+
+    True when the store exists and either data_dir does not, or the store
+    was compiled from data_dir as it is now (same absolute path, file count
+    and latest file mtime). A store that no longer matches data_dir is
+    ignored, with a one-time warning, so engines never read a stale or
+    unrelated store.
+    """
+    if not os.path.isfile(store_path):
+        return False
+    if not os.path.isdir(data_dir):
+        return True
+    try:
+        with CorpusStore(store_path) as store:
+            source = store.source
+    except ValueError:
+        source = None
+    if source == {"data_dir": os.path.abspath(data_dir), **tree_fingerprint(data_dir)}:
+        return True
+    if (store_path, data_dir) not in _warned_stores:
+        _warned_stores.add((store_path, data_dir))
+        print(
+            f"Warning: '{store_path}' was not compiled from '{data_dir}' as it is now — reading "
+            f"'{data_dir}' instead. Rebuild the store with src/corpus.py."
+        )
+    return False
+
+
+def corpus_fingerprint(data_dir: str = "data/extracted", store_path: str = DEFAULT_STORE_PATH) -> dict | None:
+    """Identify the corpus an index would be built from, for detecting stale indexes.
+
+    Mirrors the source choice of the corpus readers (see prefer_store): the
+    store ({"store": num_docs, "size", "mtime_ns"}, from its header and
+    stat), otherwise data_dir (tree_fingerprint). Returns None when neither
+    exists.
+    """
+    if prefer_store(data_dir, store_path):
+        stat = os.stat(store_path)
+        with open(store_path, "rb") as f:
+            header = f.read(_HEADER.size)
+        num_docs = _HEADER.unpack(header)[2] if len(header) == _HEADER.size else 0
+        return {"store": num_docs, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if os.path.isdir(data_dir):
+        return tree_fingerprint(data_dir)
+    return None
+
+
+def iter_citations(data_dir: str = "data/extracted", store_path: str = DEFAULT_STORE_PATH):
+    """Yield (opinion_id, prior_opinions, government_code) for every opinion in the corpus.
+
+    Reads the corpus store when prefer_store() allows it, otherwise
+    data_dir/{year}/*.json. Missing fields come back as empty lists.
+
+    Raises:
+        RuntimeError: If neither the store nor data_dir is available.
+    """
+    if prefer_store(data_dir, store_path):
+        with CorpusStore(store_path) as store:
+            for doc, opinion_id in enumerate(store.ids):
+                yield (
+                    opinion_id,
+                    store.get_by_index(doc, "citations.prior_opinions") or [],
+                    store.get_by_index(doc, "citations.government_code") or [],
+                )
+    elif os.path.isdir(data_dir):
+        for opinion_id, _, path in iter_opinion_files(data_dir):
+            with open(path, "r") as f:
+                record = json.load(f)
+            yield (
+                opinion_id,
+                get_field(record, "citations.prior_opinions") or [],
+                get_field(record, "citations.government_code") or [],
+            )
+    else:
+        raise RuntimeError(
+            f"No corpus found: neither store '{store_path}' nor data directory '{data_dir}' exists."
+        )
+
+
+# ---------------------------------------------------------------------------
+# Typed-array index files
+# ---------------------------------------------------------------------------
+
+# magic, version, meta_offset, meta_length
+_SECTIONS_HEADER = struct.Struct("<8sIxxxxQQ")
+
+
+def save_sections(path: str, magic: bytes, version: int, sections: dict, meta: dict):
+    """Write named typed arrays plus JSON meta to path (replaced atomically).
+
+    Layout: a header (magic, version, meta position), each array
+    little-endian at an 8-byte aligned offset, then UTF-8 JSON meta with a
+    "sections" entry of [offset, typecode, length] per array. Arrays may be
+    array.array or the memoryviews load_sections returns.
+    """
+    tmp_path = path + ".tmp"
+    positions = {}
+    with open(tmp_path, "wb") as out:
+        out.write(b"\0" * _SECTIONS_HEADER.size)
+        for name, values in sections.items():
+            out.write(b"\0" * (-out.tell() % 8))
+            # Memory-mapped sections are memoryviews, which name their typecode 'format'
+            typecode = values.typecode if isinstance(values, array) else values.format
+            positions[name] = [out.tell(), typecode, len(values)]
+            if sys.byteorder == "big":
+                values = array(typecode, values)
+                values.byteswap()
+            out.write(values.tobytes())
+        encoded = json.dumps({"sections": positions, **meta}).encode("utf-8")
+        meta_offset = out.tell()
+        out.write(encoded)
+        out.seek(0)
+        out.write(_SECTIONS_HEADER.pack(magic, version, meta_offset, len(encoded)))
+    os.replace(tmp_path, path)
+
+
+def load_sections(path: str, magic: bytes, version: int, kind: str) -> tuple[mmap.mmap, dict, dict]:
+    """Memory-map a file written by save_sections.
+
+    Returns (mapping, {name: array view}, meta without "sections"). The
+    caller keeps the mapping open for as long as it uses the arrays.
+
+    Raises:
+        ValueError: If the file is not a `kind` of this magic and version.
+    """
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    found_magic, found_version, meta_offset, meta_length = _SECTIONS_HEADER.unpack_from(mm, 0)
+    if found_magic != magic or found_version != version:
+        mm.close()
+        raise ValueError(f"'{path}' is not a version {version} {kind}; rebuild it")
+    meta = json.loads(mm[meta_offset:meta_offset + meta_length])
+    view = memoryview(mm)
+    arrays = {}
+    for name, (offset, typecode, length) in meta.pop("sections").items():
+        values = view[offset:offset + length * array(typecode).itemsize].cast(typecode)
+        if sys.byteorder == "big":
+            # Sections are little-endian on disk; read a byte-swapped copy
+            values = array(typecode, values)
+            values.byteswap()
+        arrays[name] = values
+    return mm, arrays, meta
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compile data/extracted into a memory-mapped corpus store"
+    )
+    parser.add_argument(
+        "--data-dir",
+        default="data/extracted",
+        help="Path to extracted opinion data (default: data/extracted)",
+    )
+    parser.add_argument(
+        "--output",
+        default=DEFAULT_STORE_PATH,
+        help=f"Path to write the store (default: {DEFAULT_STORE_PATH})",
+    )
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.data_dir):
+        print(f"Data directory not found: '{args.data_dir}'")
+        sys.exit(1)
+
+    print(f"Compiling {args.data_dir} into {args.output}...")
+    count = build_corpus_store(args.data_dir, args.output)
+    size_mb = os.path.getsize(args.output) / (1024 * 1024)
+    print(f"Wrote {count} opinions ({size_mb:.1f} MB) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,143 @@ class SearchEngine(ABC):
         """
         pass
 
+    def search_batch(self, queries: list[str], top_k: int = 20) -> list[list[str]]:
+        """
+        Search for several queries at once.
+
+        Engines that embed queries or score them against a matrix should
+        override this to amortize per-call overhead (e.g. one matrix multiply
+        for the whole batch). The default simply loops over search().
+
+        Args:
+            queries: The query strings to search for.
+            top_k: Maximum number of results to return per query.
+
+        Returns:
+            One ranked list of opinion IDs per query, in the same order as
+            `queries`.
+        """
+        return [self.search(query, top_k=top_k) for query in queries]
+
+    def search_scored(self, query: str, top_k: int = 20) -> list[tuple[str, float]]:
+        """
+        Optional: search() with each result's score.
+
+        Score-based fusion (src/pipeline.py, fusion="weighted") uses these
+        scores when an engine overrides this method, and falls back to the
+        rank positions of search() when it does not.
+
+        Returns:
+            (opinion ID, score) pairs, best first, in the order search() returns them.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} does not report scores")
+
+    def stage_timings(self) -> dict[str, list[float]]:
+        """
+        Optional: per-stage latencies (ms) of the searches made so far.
+
+        Multi-stage engines (retrieve, fuse, rerank) can record how long
+        each stage took per query; the scorer summarizes the lists in a
+        "By Stage" block of the latency report. The default reports none.
+        """
+        return {}
+
+    def with_params(self, **params) -> "SearchEngine":
+        """
+        Return an engine built with constructor kwargs `params`, reusing
+        whatever this engine has already loaded.
+
+        The sweep runner (src/sweep.py) builds the first configuration with
+        the constructor and derives the others from it with this method.
+        Engines whose parameters only affect scoring (BM25 k1/b, fusion
+        weights) should override it to share their corpus, index or model
+        instead of loading them again. The default constructs a new engine
+        from scratch.
+
+        Args:
+            params: The full set of constructor kwargs for the new engine
+                (not a delta against this one).
+        """
+        return type(self)(**params)
+
+    def save_state(self, path: str):
+        """
+        Optional warm-start hook: persist what __init__ built to disk.
+
+        Engines whose constructor loads a model or builds an index can
+        override this together with load_state. When the scorer runs with
+        --snapshot-dir, it constructs the engine once, calls save_state, and
+        restores later runs with load_state instead of calling __init__.
+
+        Prefer formats load_state can memory-map rather than parse (raw
+        typed arrays, NumPy .npy files), so restoring costs little more than
+        opening the files.
+
+        Args:
+            path: An existing, empty directory to write the state into.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} does not support snapshots")
+
+    @classmethod
+    def load_state(cls, path: str) -> "SearchEngine":
+        """
+        Optional warm-start hook: rebuild an engine from a save_state directory.
+
+        Must not run the expensive parts of __init__; the returned engine
+        has to rank exactly as the one that was saved.
+
+        Args:
+            path: A directory written by save_state.
+
+        Returns:
+            A ready-to-search instance of cls.
+        """
+        raise NotImplementedError(f"{cls.__name__} does not support snapshots")
+
+    def name(self) -> str:
+        """Human-readable name for this search engine (used in reports)."""
+        return self.__class__.__name__
+
+
+class Reranker(ABC):
+    """Second-stage model that reorders a short candidate list (see src/pipeline.py)."""
+
+    @abstractmethod
+    def rerank(self, query: str, candidates: list[str]) -> list[str]:
+        """
+        Reorder first-stage candidates for the query.
+
+        Args:
+            query: The search query string.
+            candidates: Opinion IDs from the first stage, best first.
+
+        Returns:
+            The candidates (or a subset of them), most relevant first.
+        """
+        pass
+
+    def name(self) -> str:
+        """Human-readable name for this reranker (used in reports)."""
+        return self.__class__.__name__
+
+
+class AsyncSearchEngine(ABC):
+    """Interface for I/O-bound search backends (embedding servers, HTTP search
+    services, database FTS) that can serve many queries concurrently.
+
+    The scoring harness detects subclasses of this ABC and drives them with
+    asyncio under a concurrency limit instead of calling search() serially.
+    """
+
+    @abstractmethod
+    async def search(self, query: str, top_k: int = 20) -> list[str]:
+        """
+        Search for opinions relevant to the given query.
+
+        Same contract as SearchEngine.search, but awaitable.
+        """
+        pass
+
     def name(self) -> str:
         """Human-readable name for this search engine (used in reports)."""
         return self.__class__.__name__
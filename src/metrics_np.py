@@ -0,0 +1,188 @@
+"""
+Vectorized NumPy metric backend for scoring many runs against many queries.
+
+Relevance judgments are encoded once as a dense query x judged-document gain
+matrix, and each run as an int32 array of judged-document columns (R runs x
+Q queries x depth). Every metric at every cutoff then comes out of a few
+cumulative sums over the whole (R, Q, depth) block, with the ideal DCG
+computed once per query.
+
+Results are identical to the per-query functions in src/scorer.py, not just
+close: gains, discounts and summation order match compute_ndcg and
+compute_average_precision exactly (discounts come from math.log2, and
+np.cumsum adds left to right). Metric names are parsed by the scorer's
+registry, so every metric --metrics accepts is supported here.
+
+Requires NumPy; the scorer only imports this module for --metrics-backend numpy.
+"""
+
+import math
+
+import numpy as np
+
+from src.scorer import DEFAULT_METRICS, parse_metric
+
+
+def _discounts(n: int) -> np.ndarray:
+    # math.log2, not np.log2, so each term is bit-identical to compute_ndcg's
+    return np.array([math.log2(i + 2) for i in range(n)], dtype=np.float64)
+
+
+class QrelsMatrix:
+    """Dense gain matrix for a query set.
+
+    Column 0 stands for every unjudged document (gain 0); judged opinion IDs
+    get columns 1..D. Judgments are read exactly as score_query reads them,
+    so a repeated opinion_id keeps its last score.
+    """
+
+    def __init__(self, queries: list[dict]):
+        self.query_ids = [q["id"] for q in queries]
+        judgments = [
+            {j["opinion_id"]: j["score"] for j in q["relevance_judgments"]} for q in queries
+        ]
+        self.doc_index = {}
+        for query_judgments in judgments:
+            for opinion_id in query_judgments:
+                self.doc_index.setdefault(opinion_id, len(self.doc_index) + 1)
+
+        self.gains = np.zeros((len(queries), len(self.doc_index) + 1), dtype=np.int8)
+        # Columns are shared across queries, so judged-ness is tracked per query
+        self.judged = np.zeros(self.gains.shape, dtype=bool)
+        for row, query_judgments in enumerate(judgments):
+            for opinion_id, score in query_judgments.items():
+                self.gains[row, self.doc_index[opinion_id]] = score
+                self.judged[row, self.doc_index[opinion_id]] = True
+        self.num_relevant = (self.gains >= 1).sum(axis=1)
+
+        # Judged scores per query, best first, for the ideal DCG
+        width = max((len(j) for j in judgments), default=0)
+        self._ideal = np.zeros((len(queries), width), dtype=np.int8)
+        for row, query_judgments in enumerate(judgments):
+            scores = sorted(query_judgments.values(), reverse=True)
+            self._ideal[row, :len(scores)] = scores
+        self._ideal_dcg = {}
+
+    def __len__(self) -> int:
+        return len(self.query_ids)
+
+    def ideal_dcg(self, k: int) -> np.ndarray:
+        """IDCG@k for every query (computed once per cutoff)."""
+        if k not in self._ideal_dcg:
+            n = min(k, self._ideal.shape[1])
+            if n == 0:
+                self._ideal_dcg[k] = np.zeros(len(self), dtype=np.float64)
+            else:
+                terms = self._ideal[:, :n] / _discounts(n)
+                self._ideal_dcg[k] = np.cumsum(terms, axis=1)[:, -1]
+        return self._ideal_dcg[k]
+
+    def encode(self, rankings: dict[str, list[str]], depth: int) -> np.ndarray:
+        """Encode one run as an int32 (Q, depth) array of gain-matrix columns.
+
+        Rankings are deduplicated (first occurrence kept) and truncated to
+        depth. Unjudged documents, missing queries and padding all map to
+        column 0.
+        """
+        encoded = np.zeros((len(self), depth), dtype=np.int32)
+        doc_index = self.doc_index
+        for row, qid in enumerate(self.query_ids):
+            ranking = list(dict.fromkeys(rankings.get(qid, ())))[:depth]
+            encoded[row, :len(ranking)] = [doc_index.get(doc_id, 0) for doc_id in ranking]
+        return encoded
+
+
+def required_depth(metrics=DEFAULT_METRICS) -> int:
+    """Smallest ranking depth that computes all metrics exactly (0 means unbounded, for mrr and map)."""
+    depth = 0
+    for name in metrics:
+        _, cutoff = parse_metric(name)
+        if cutoff is None:
+            return 0
+        depth = max(depth, cutoff)
+    return depth
+
+
+def evaluate_runs(qrels: QrelsMatrix, runs: np.ndarray, metrics=DEFAULT_METRICS) -> dict[str, np.ndarray]:
+    """Compute metrics for a stack of encoded runs in one batched pass.
+
+    Args:
+        qrels: The query set's QrelsMatrix.
+        runs: int32 array of shape (R, Q, depth) from QrelsMatrix.encode.
+            Depth must cover the largest cutoff that should see real results;
+            mrr and map without a cutoff look at the full encoded depth.
+        metrics: Metric names (see scorer.parse_metric).
+
+    Returns:
+        {metric name: float64 array of shape (R, Q)}.
+    """
+    runs = np.asarray(runs)
+    if runs.ndim != 3 or runs.shape[1] != len(qrels):
+        raise ValueError(f"runs must have shape (R, {len(qrels)}, depth), got {runs.shape}")
+    num_runs, num_queries, depth = runs.shape
+    parsed = [(name, *parse_metric(name)) for name in metrics]
+
+    # Per-position gains and judged flags for every run and query: (R, Q, depth)
+    if depth == 0:
+        runs = np.zeros((num_runs, num_queries, 1), dtype=np.int32)
+        depth = 1
+    rows = np.arange(num_queries)[None, :, None]
+    gains = qrels.gains[rows, runs]
+    relevant = gains >= 1
+    found = np.cumsum(relevant, axis=2)
+    dcg = np.cumsum(gains / _discounts(depth), axis=2)
+    num_relevant = np.broadcast_to(qrels.num_relevant[None, :], (num_runs, num_queries))
+    kinds = {kind for _, kind, _ in parsed}
+    if "map" in kinds:
+        # Precision at each relevant rank; adding 0.0 elsewhere leaves the running sum unchanged
+        ap_sum = np.cumsum(np.where(relevant, found / np.arange(1, depth + 1), 0.0), axis=2)
+    if "judged" in kinds:
+        judged_found = np.cumsum(qrels.judged[rows, runs], axis=2)
+
+    out = {}
+    for name, kind, k in parsed:
+        if kind == "mrr":
+            highly = gains == 2
+            first = highly.argmax(axis=2)
+            out[name] = np.where(highly.any(axis=2), 1.0 / (first + 1), 0.0)
+            continue
+        at = depth - 1 if k is None else min(k, depth) - 1
+        if kind == "map":
+            out[name] = np.divide(ap_sum[:, :, at], num_relevant, out=np.zeros((num_runs, num_queries)), where=num_relevant != 0)
+        elif kind == "ndcg":
+            idcg = np.broadcast_to(qrels.ideal_dcg(k)[None, :], (num_runs, num_queries))
+            out[name] = np.divide(dcg[:, :, at], idcg, out=np.zeros((num_runs, num_queries)), where=idcg != 0.0)
+        elif kind == "precision":
+            out[name] = found[:, :, at] / k
+        elif kind == "recall":
+            out[name] = np.divide(found[:, :, at], num_relevant, out=np.zeros((num_runs, num_queries)), where=num_relevant != 0)
+        else:
+            out[name] = judged_found[:, :, at] / k
+    return out
+
+
+def score_rankings(
+    queries: list[dict],
+    runs: list[dict[str, list[str]]],
+    metrics=DEFAULT_METRICS,
+) -> list[list[dict[str, float]]]:
+    """Score several runs ({query_id: ranked opinion IDs}) against a query set.
+
+    Returns one list per run of per-query metric dicts, in query order, equal
+    to the 'metrics' field score_query would produce.
+    """
+    qrels = QrelsMatrix(queries)
+    depth = required_depth(metrics)
+    if depth == 0:
+        # mrr and uncut map scan the whole ranking
+        depth = max((len(r) for run in runs for r in run.values()), default=0)
+    encoded = np.zeros((len(runs), len(qrels), depth), dtype=np.int32)
+    for r, run in enumerate(runs):
+        encoded[r] = qrels.encode(run, depth)
+    values = evaluate_runs(qrels, encoded, metrics)
+    names = list(values)
+    columns = [values[name].tolist() for name in names]
+    return [
+        [{name: columns[m][r][q] for m, name in enumerate(names)} for q in range(len(qrels))]
+        for r in range(len(runs))
+    ]
@@ -0,0 +1,309 @@
+"""
+Hybrid retrieval pipeline: concurrent child engines, rank fusion, reranking.
+
+PipelineEngine is a SearchEngine made of three stages:
+
+    retrieve   every child engine searches for `depth` candidates; the
+               children run concurrently on a thread pool (in the calling
+               thread with workers=1, e.g. while profiling with cProfile)
+    fuse       the child rankings are merged with reciprocal rank fusion
+               (fusion="rrf", weights scale each child's 1 / (rrf_k + rank))
+               or weighted score fusion (fusion="weighted": each child's
+               scores are min-max normalized, then summed with weights;
+               children without search_scored are scored by rank)
+    rerank     optionally, a Reranker reorders the fused top `rerank_depth`;
+               the rest of the fused list follows unchanged
+
+Each stage's time per query (one retrieve stage per child, named after
+it, then "fuse" and "rerank") is recorded and reported through
+stage_timings(), which the scorer prints as the "By Stage" latency block.
+
+Engines are module paths (as for --search-module) or SearchEngine
+instances; the reranker is a module path (its first Reranker subclass is
+constructed with no arguments) or a Reranker instance. On the command
+line, join several values with "+":
+
+    python src/scorer.py --search-module src.pipeline --dataset eval/dataset.json \\
+        --param engines=src.baselines.bm25_baseline+src.baselines.dense_baseline \\
+        --param fusion=weighted --param weights=1+0.5 \\
+        --param reranker=src.baselines.dense_baseline --param rerank_depth=30
+
+To give child engines constructor parameters, subclass PipelineEngine in
+your own module and pass engine instances.
+"""
+
+import importlib
+import inspect
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.interface import Reranker, SearchEngine
+from src.scorer import load_engine
+
+
+FUSION_METHODS = ("rrf", "weighted")
+DEFAULT_ENGINES = ("src.baselines.bm25_baseline", "src.baselines.dense_baseline")
+DEFAULT_RRF_K = 60
+DEFAULT_DEPTH = 100
+DEFAULT_RERANK_DEPTH = 20
+
+
+def _split(value) -> list:
+    """A '+'-joined --param string, a single number, or a sequence, as a list."""
+    if isinstance(value, str):
+        return [part.strip() for part in value.split("+") if part.strip()]
+    if isinstance(value, (int, float)):
+        return [value]
+    return list(value)
+
+
+def load_reranker(module_path: str) -> Reranker:
+    """Import a module and construct its first Reranker subclass with no arguments.
+
+    Raises:
+        ImportError: If the module cannot be imported.
+        RuntimeError: If no Reranker subclass is found in the module.
+    """
+    try:
+        module = importlib.import_module(module_path)
+    except ImportError as e:
+        raise ImportError(f"Could not import module '{module_path}': {e}") from e
+    for _name, obj in inspect.getmembers(module, inspect.isclass):
+        if issubclass(obj, Reranker) and obj is not Reranker:
+            return obj()
+    raise RuntimeError(f"No Reranker subclass found in module '{module_path}'")
+
+
+def supports_scores(engine) -> bool:
+    """Return True if engine overrides SearchEngine.search_scored."""
+    return type(engine).search_scored is not SearchEngine.search_scored
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], weights: list[float], k: int = DEFAULT_RRF_K) -> list[str]:
+    """Fuse rankings by sum of weight / (k + rank), rank starting at 1.
+
+    Ties keep the order in which documents were first seen (child order, then rank).
+    """
+    fused = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, oid in enumerate(ranking, start=1):
+            fused[oid] = fused.get(oid, 0.0) + weight / (k + rank)
+    return sorted(fused, key=fused.get, reverse=True)
+
+
+def normalized_scores(results: list[tuple[str, float | None]]) -> dict[str, float]:
+    """Min-max normalize one child's scores into [0, 1].
+
+    Results without scores (None) are scored by rank: 1.0 for the first,
+    falling linearly to 0.0 for the last. Equal scores all normalize to 1.0.
+    """
+    if not results:
+        return {}
+    if any(score is None for _, score in results):
+        last = max(len(results) - 1, 1)
+        return {oid: 1.0 - rank / last for rank, (oid, _) in enumerate(results)}
+    low = min(score for _, score in results)
+    span = max(score for _, score in results) - low
+    return {oid: (score - low) / span if span > 0 else 1.0 for oid, score in results}
+
+
+def weighted_score_fusion(results: list[list[tuple[str, float | None]]], weights: list[float]) -> list[str]:
+    """Fuse scored rankings by weighted sum of per-child normalized scores.
+
+    Ties keep the order in which documents were first seen.
+    """
+    fused = {}
+    for child, weight in zip(results, weights):
+        for oid, score in normalized_scores(child).items():
+            fused[oid] = fused.get(oid, 0.0) + weight * score
+    return sorted(fused, key=fused.get, reverse=True)
+
+
+class _ThreadPools:
+    """Thread pools by size, shared by a pipeline and its with_params copies."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools = {}
+
+    def get(self, workers: int) -> ThreadPoolExecutor:
+        with self._lock:
+            pool, pid = self._pools.get(workers, (None, None))
+            # Threads do not survive fork, so a forked scorer worker starts its own pool
+            if pool is None or pid != os.getpid():
+                pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline")
+                self._pools[workers] = (pool, os.getpid())
+            return pool
+
+    def shutdown(self):
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool, pid in pools.values():
+            if pid == os.getpid():
+                pool.shutdown()
+
+
+class PipelineEngine(SearchEngine):
+    """Runs child engines concurrently, fuses their rankings, and optionally reranks.
+
+    The worker threads are started on first use and live until close(), or
+    the end of a `with` block; with_params copies share them.
+    """
+
+    def __init__(
+        self,
+        engines=DEFAULT_ENGINES,
+        fusion: str = FUSION_METHODS[0],
+        weights=None,
+        rrf_k: float = DEFAULT_RRF_K,
+        depth: int = DEFAULT_DEPTH,
+        reranker=None,
+        rerank_depth: int = DEFAULT_RERANK_DEPTH,
+        workers: int | None = None,
+    ):
+        children = [load_engine(e) if isinstance(e, str) else e for e in _split(engines)]
+        if not children:
+            raise ValueError("PipelineEngine needs at least one child engine")
+        if isinstance(reranker, str):
+            reranker = load_reranker(reranker)
+        self._pools = _ThreadPools()
+        self._configure(children, fusion, weights, rrf_k, depth, reranker, rerank_depth, workers)
+
+    def _configure(self, children, fusion, weights, rrf_k, depth, reranker, rerank_depth, workers):
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method '{fusion}' (expected one of {FUSION_METHODS})")
+        weights = [float(w) for w in _split(weights)] if weights is not None else [1.0] * len(children)
+        if len(weights) != len(children):
+            raise ValueError(f"Got {len(weights)} weights for {len(children)} engines")
+        if depth < 1 or rerank_depth < 1:
+            raise ValueError("depth and rerank_depth must be >= 1")
+        self.engines = children
+        self.fusion = fusion
+        self.weights = weights
+        self.rrf_k = rrf_k
+        self.depth = depth
+        self.reranker = reranker
+        self.rerank_depth = rerank_depth
+        self.workers = workers or len(children)
+        self._scored = [fusion == "weighted" and supports_scores(e) for e in children]
+        # One retrieve stage per child, named after it ("#2"... for repeated names)
+        self._stage_names = []
+        for engine in children:
+            count = sum(1 for name in self._stage_names if name.split("#")[0] == engine.name())
+            self._stage_names.append(f"{engine.name()}#{count + 1}" if count else engine.name())
+        stages = self._stage_names + ["fuse"] + (["rerank"] if reranker is not None else [])
+        self._timings = {stage: [] for stage in stages}
+        self._lock = threading.Lock()
+
+    def with_params(self, **params) -> "PipelineEngine":
+        """Share the loaded child engines (and reranker) with other fusion/rerank settings.
+
+        The copy also shares this engine's thread pools, so a sweep starts one
+        pool per distinct `workers` rather than one per configuration. A
+        different `engines` falls back to full construction.
+        """
+        if "engines" in params:
+            return super().with_params(**params)
+        accepted = set(inspect.signature(type(self).__init__).parameters) - {"self", "engines"}
+        unknown = params.keys() - accepted
+        if unknown:
+            raise TypeError(f"PipelineEngine got unexpected parameters {sorted(unknown)}")
+        reranker = params.get("reranker")
+        if isinstance(reranker, str):
+            reranker = load_reranker(reranker)
+        engine = type(self).__new__(type(self))
+        engine._pools = self._pools
+        engine._configure(
+            self.engines,
+            params.get("fusion", FUSION_METHODS[0]),
+            params.get("weights"),
+            params.get("rrf_k", DEFAULT_RRF_K),
+            params.get("depth", DEFAULT_DEPTH),
+            reranker,
+            params.get("rerank_depth", DEFAULT_RERANK_DEPTH),
+            params.get("workers"),
+        )
+        return engine
+
+    def _executor(self) -> ThreadPoolExecutor:
+        return self._pools.get(self.workers)
+
+    def close(self):
+        """Shut down the worker threads, including those shared with with_params copies.
+
+        A later search starts new ones.
+        """
+        self._pools.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _record(self, stage: str, elapsed_ms: float, count: int = 1):
+        """Charge elapsed_ms to stage, split evenly over count queries."""
+        with self._lock:
+            self._timings[stage].extend([elapsed_ms / count] * count)
+
+    def _retrieve(self, index: int, queries: list[str], depth: int) -> list[list]:
+        """Run one child over the queries: (opinion ID, score or None) lists per query."""
+        engine = self.engines[index]
+        start = time.perf_counter()
+        if self._scored[index]:
+            results = [engine.search_scored(q, top_k=depth) for q in queries]
+        else:
+            rankings = engine.search_batch(queries, top_k=depth) if len(queries) > 1 else [
+                engine.search(queries[0], top_k=depth)
+            ]
+            results = [[(oid, None) for oid in ranking] for ranking in rankings]
+        self._record(self._stage_names[index], (time.perf_counter() - start) * 1000.0, len(queries))
+        return results
+
+    def rank(self, queries: list[str], top_k: int = 20) -> list[list[str]]:
+        """Retrieve, fuse and rerank a batch of queries."""
+        depth = max(self.depth, top_k)
+        if len(self.engines) == 1 or self.workers == 1:
+            per_child = [self._retrieve(i, queries, depth) for i in range(len(self.engines))]
+        else:
+            futures = [
+                self._executor().submit(self._retrieve, i, queries, depth) for i in range(len(self.engines))
+            ]
+            per_child = [future.result() for future in futures]
+
+        rankings = []
+        for q, query in enumerate(queries):
+            start = time.perf_counter()
+            if self.fusion == "rrf":
+                fused = reciprocal_rank_fusion(
+                    [[oid for oid, _ in child[q]] for child in per_child], self.weights, self.rrf_k,
+                )
+            else:
+                fused = weighted_score_fusion([child[q] for child in per_child], self.weights)
+            self._record("fuse", (time.perf_counter() - start) * 1000.0)
+
+            if self.reranker is not None:
+                start = time.perf_counter()
+                head = self.reranker.rerank(query, fused[:self.rerank_depth])
+                fused = list(dict.fromkeys(head)) + fused[self.rerank_depth:]
+                self._record("rerank", (time.perf_counter() - start) * 1000.0)
+            rankings.append(fused[:top_k])
+        return rankings
+
+    def search(self, query: str, top_k: int = 20) -> list[str]:
+        return self.rank([query], top_k)[0]
+
+    def search_batch(self, queries: list[str], top_k: int = 20) -> list[list[str]]:
+        return self.rank(queries, top_k) if queries else []
+
+    def stage_timings(self) -> dict[str, list[float]]:
+        with self._lock:
+            return {stage: list(values) for stage, values in self._timings.items() if values}
+
+    def name(self) -> str:
+        label = "+".join(engine.name() for engine in self.engines) + f", {self.fusion}"
+        if self.reranker is not None:
+            label += f", rerank={self.reranker.name()}@{self.rerank_depth}"
+        return f"Pipeline({label})"
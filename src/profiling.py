@@ -0,0 +1,273 @@
+"""
+Profiling hooks for engine construction and search.
+
+With `scorer.py --profile cprofile` or `--profile tracemalloc`, only two
+phases are profiled: "construct" (load_engine, including snapshot restores)
+and "search" (every engine.search / search_batch call made by
+evaluate_query and evaluate_batch). Metric computation, dataset loading and
+result output stay out of the numbers.
+
+Each phase is written to --profile-dir:
+
+    <module>.<phase>.pstats       cProfile stats; load with pstats.Stats, or
+                                  render a flame graph with snakeviz/flameprof
+    <module>.<phase>.tracemalloc  tracemalloc snapshot; load with
+                                  tracemalloc.Snapshot.load
+
+and the scorecard gets a short summary: the top-N functions by own time, or
+each phase's peak allocation and its top allocation sites.
+
+Profiling runs in-process, so the scorer only allows it with --workers 1.
+cProfile also sees only the thread that enters a phase: an engine that
+searches on its own threads (src.pipeline runs its children on a thread
+pool) shows those searches as time spent waiting. Pass --param workers=1
+to a pipeline while profiling, which runs its children in the calling
+thread.
+"""
+
+import cProfile
+import os
+import pstats
+import re
+import time
+import tracemalloc
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from src.interface import SearchEngine
+
+
+PROFILERS = ("cprofile", "tracemalloc")
+DEFAULT_PROFILE_DIR = "profiles"
+DEFAULT_TOP = 15
+
+_HARNESS_FILES = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in ("profiling.py", "scorer.py", "stream.py", "cache.py")
+]
+
+
+class PhaseProfiler(ABC):
+    """Accumulates wall time and call counts per phase; subclasses add the profiler."""
+
+    kind = None
+
+    def __init__(self, top: int = DEFAULT_TOP):
+        self.top = top
+        self._phases = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        """Profile the enclosed block as part of phase `name`."""
+        stats = self._phases.setdefault(name, {"calls": 0, "seconds": 0.0})
+        self._enter(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats["seconds"] += time.perf_counter() - start
+            stats["calls"] += 1
+            self._exit(name)
+
+    @abstractmethod
+    def _enter(self, name: str):
+        """Start (or resume) profiling phase `name`."""
+
+    @abstractmethod
+    def _exit(self, name: str):
+        """Stop profiling phase `name`."""
+
+    def write(self, directory: str, prefix: str) -> dict:
+        """Write one file per phase into directory and return the profile summary.
+
+        Returns:
+            {"profiler": kind, "phases": {phase: {"calls", "seconds", "file", ...}}},
+            where the other per-phase keys depend on the profiler.
+        """
+        os.makedirs(directory, exist_ok=True)
+        prefix = re.sub(r"[^\w.@=,+-]", "_", prefix)
+        phases = {}
+        for name, stats in self._phases.items():
+            phases[name] = dict(stats, **self._write_phase(name, os.path.join(directory, f"{prefix}.{name}")))
+        return {"profiler": self.kind, "phases": phases}
+
+    @abstractmethod
+    def _write_phase(self, name: str, path: str) -> dict:
+        """Write phase `name` to path plus a suffix; return its summary keys, including "file"."""
+
+
+class CProfileProfiler(PhaseProfiler):
+    """Deterministic function-level profile (cProfile), one Profile per phase."""
+
+    kind = "cprofile"
+
+    def __init__(self, top: int = DEFAULT_TOP):
+        super().__init__(top)
+        self._profiles = {}
+
+    def _enter(self, name: str):
+        self._profiles.setdefault(name, cProfile.Profile()).enable()
+
+    def _exit(self, name: str):
+        self._profiles[name].disable()
+
+    def _write_phase(self, name: str, path: str) -> dict:
+        profile = self._profiles[name]
+        path += ".pstats"
+        profile.dump_stats(path)
+        entries = pstats.Stats(profile).stats.items()
+        # (file, line, function) -> (primitive calls, calls, own time, cumulative time, callers)
+        ranked = sorted(entries, key=lambda item: item[1][2], reverse=True)[:self.top]
+        hotspots = [
+            {
+                "function": pstats.func_std_string(pstats.func_strip_path(func)),
+                "calls": calls,
+                "total_ms": own * 1000.0,
+                "cumulative_ms": cumulative * 1000.0,
+            }
+            for func, (_, calls, own, cumulative, _) in ranked
+        ]
+        return {"file": path, "hotspots": hotspots}
+
+
+class TracemallocProfiler(PhaseProfiler):
+    """Python heap allocations per phase (tracemalloc).
+
+    Tracing starts when the first phase is entered and keeps running until
+    write(), so construction allocations stay attributed to their lines.
+    For every phase this records the peak traced memory above the level at
+    entry (the largest over its calls, and the mean), and the memory still
+    held at the end of the phase, by allocation site.
+    """
+
+    kind = "tracemalloc"
+
+    def __init__(self, top: int = DEFAULT_TOP):
+        super().__init__(top)
+        self._started = False
+        self._peaks = {}
+        self._before = {}
+        self._after = {}
+        self._open = None
+        self._entry_bytes = 0
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        # Leave out the harness itself (per-query results, stream and cache buffers)
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+            + [tracemalloc.Filter(False, path) for path in _HARNESS_FILES]
+        )
+
+    def _enter(self, name: str):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        if self._open is not None and self._open != name:
+            # Search calls interleave with scoring, so a phase's retained
+            # memory is measured when the next phase starts (or at write)
+            self._after[self._open] = self._snapshot()
+        if name not in self._before:
+            self._before[name] = self._snapshot()
+        self._open = name
+        self._entry_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    def _exit(self, name: str):
+        peak = tracemalloc.get_traced_memory()[1] - self._entry_bytes
+        self._peaks.setdefault(name, []).append(peak)
+
+    def write(self, directory: str, prefix: str) -> dict:
+        if self._open is not None:
+            self._after[self._open] = self._snapshot()
+            self._open = None
+        try:
+            return super().write(directory, prefix)
+        finally:
+            if self._started:
+                tracemalloc.stop()
+                self._started = False
+
+    def _write_phase(self, name: str, path: str) -> dict:
+        after = self._after[name]
+        path += ".tracemalloc"
+        after.dump(path)
+        growth = [d for d in after.compare_to(self._before[name], "lineno") if d.size_diff > 0]
+        peaks = self._peaks[name]
+        return {
+            "file": path,
+            "peak_bytes": max(peaks),
+            "mean_peak_bytes": sum(peaks) / len(peaks),
+            "retained_bytes": sum(d.size_diff for d in growth),
+            "top_allocations": [
+                {
+                    "location": f"{d.traceback[0].filename}:{d.traceback[0].lineno}",
+                    "size_bytes": d.size_diff,
+                    "count": d.count_diff,
+                }
+                for d in growth[:self.top]
+            ],
+        }
+
+
+def make_profiler(kind: str, top: int = DEFAULT_TOP) -> PhaseProfiler:
+    """Return a profiler for one of PROFILERS."""
+    if kind == "cprofile":
+        return CProfileProfiler(top)
+    if kind == "tracemalloc":
+        return TracemallocProfiler(top)
+    raise ValueError(f"Unknown profiler '{kind}' (expected one of {PROFILERS})")
+
+
+class ProfiledEngine(SearchEngine):
+    """Wraps an engine so that every search call runs in the profiler's "search" phase."""
+
+    def __init__(self, engine: SearchEngine, profiler: PhaseProfiler):
+        self.engine = engine
+        self.profiler = profiler
+
+    def search(self, query: str, top_k: int = 20) -> list[str]:
+        with self.profiler.phase("search"):
+            return self.engine.search(query, top_k=top_k)
+
+    def search_batch(self, queries: list[str], top_k: int = 20) -> list[list[str]]:
+        with self.profiler.phase("search"):
+            return self.engine.search_batch(queries, top_k=top_k)
+
+    def stage_timings(self) -> dict[str, list[float]]:
+        return self.engine.stage_timings()
+
+    def name(self) -> str:
+        return self.engine.name()
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def print_profile_summary(profile: dict):
+    """Print the per-phase summary returned by PhaseProfiler.write."""
+    thin_sep = "-" * 80
+    print(f"  Profile ({profile['profiler']})")
+    print(thin_sep)
+    for name, phase in profile["phases"].items():
+        print(f"  {name}: {phase['calls']} call(s), {phase['seconds']:.3f}s — {phase['file']}")
+        if "hotspots" in phase:
+            print(f"  {'own ms':>10s}  {'cum ms':>10s}  {'calls':>8s}  function")
+            for spot in phase["hotspots"]:
+                print(
+                    f"  {spot['total_ms']:>10.2f}  {spot['cumulative_ms']:>10.2f}  {spot['calls']:>8d}"
+                    f"  {spot['function'][:44]}"
+                )
+        else:
+            print(
+                f"  peak {_format_bytes(phase['peak_bytes'])}"
+                f" (mean {_format_bytes(phase['mean_peak_bytes'])} per call),"
+                f" retained {_format_bytes(phase['retained_bytes'])}"
+            )
+            for site in phase["top_allocations"]:
+                print(f"  {_format_bytes(site['size_bytes']):>12s}  {site['count']:>8d}  {site['location'][-54:]}")
+        print(thin_sep)
@@ -1,21 +1,62 @@
 """
 Scoring harness for the FPPC Opinions Search Evaluation Suite.
 
-Computes IR metrics (MRR, nDCG, Precision, Recall) for search engines
-implementing the SearchEngine ABC.
+Computes IR metrics (MRR, MAP, nDCG, Precision, Recall, Judged) for search
+engines implementing the SearchEngine ABC. The metric set is configurable
+with --metrics (see parse_metric).
 
 Usage:
     python src/scorer.py --search-module <dotted.path> --dataset eval/dataset.json [--output results.json]
+        [--metrics ndcg@3,map,recall@100]
+    python src/scorer.py --from-run results.json [--trec-run run.txt ...] --dataset eval/dataset.json
+    python src/scorer.py --search-module <dotted.path> --dataset eval/dataset.json --profile cprofile
+
+--dataset also accepts a .jsonl file with one query object per line; it is
+streamed query by query instead of being loaded whole.
 """
 
 import argparse
+import asyncio
+import hashlib
 import importlib
 import inspect
 import json
 import math
+import multiprocessing
 import os
+import re
+import shutil
 import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timezone
+from functools import lru_cache, partial
+from itertools import chain, islice
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXECUTOR_KINDS = ("thread", "process")
+METRIC_BACKENDS = ("python", "numpy")
+SNAPSHOT_MANIFEST = "snapshot.json"
+
+# Metrics reported when no spec is given, in scorecard order
+DEFAULT_METRICS = ("mrr", "ndcg@5", "ndcg@10", "precision@5", "precision@10", "recall@10", "recall@20")
+
+# Ranking depth requested from engines when no metric has a cutoff (e.g. --metrics mrr,map)
+DEFAULT_TOP_K = 20
+
+# kind -> (cutoff rule, scorecard label). Cutoff rule: "none", "optional" or "required".
+METRIC_KINDS = {
+    "mrr": ("none", "MRR"),
+    "map": ("optional", "MAP"),
+    "ndcg": ("required", "nDCG"),
+    "precision": ("required", "P"),
+    "recall": ("required", "R"),
+    "judged": ("required", "J"),
+}
+
+_METRIC_RE = re.compile(r"^([a-z]+)(?:@(\d+))?$")
 
 
 # ---------------------------------------------------------------------------
@@ -91,46 +132,272 @@ def compute_recall(results: list[str], judgments: dict[str, int], k: int) -> flo
     return found / total_relevant
 
 
+def compute_average_precision(results: list[str], judgments: dict[str, int], k: int | None = None) -> float:
+    """Compute Average Precision, optionally truncated at k.
+
+    Sums precision at the rank of each relevant result (score >= 1) and
+    divides by the number of relevant opinions in judgments, so relevant
+    opinions that are never retrieved count as zero. Returns 0.0 if there
+    are no relevant documents in judgments.
+    """
+    total_relevant = sum(1 for score in judgments.values() if score >= 1)
+    if total_relevant == 0:
+        return 0.0
+    found = 0
+    total = 0.0
+    for rank, doc_id in enumerate(results[:k], start=1):
+        if judgments.get(doc_id, 0) >= 1:
+            found += 1
+            total += found / rank
+    return total / total_relevant
+
+
+def compute_judged(results: list[str], judgments: dict[str, int], k: int) -> float:
+    """Compute Judged at k: the fraction of the top-k positions holding a judged opinion.
+
+    Any judgment counts, including score 0. Divides by k even if fewer
+    results are returned. Low values mean the other metrics rest on
+    unjudged documents that are scored as irrelevant.
+    """
+    judged = 0
+    for doc_id in results[:k]:
+        if doc_id in judgments:
+            judged += 1
+    return judged / k
+
+
+# ---------------------------------------------------------------------------
+# Metric registry
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=None)
+def parse_metric(name: str) -> tuple[str, int | None]:
+    """Split a metric name like 'ndcg@10' into ('ndcg', 10); 'mrr' and 'map' have no cutoff.
+
+    Raises:
+        ValueError: For unknown metrics, or a cutoff that is missing, zero,
+            or given to a metric that does not take one.
+    """
+    match = _METRIC_RE.match(name)
+    if not match or match.group(1) not in METRIC_KINDS:
+        raise ValueError(f"Unknown metric '{name}' (known: {', '.join(METRIC_KINDS)})")
+    kind, cutoff = match.group(1), match.group(2)
+    rule = METRIC_KINDS[kind][0]
+    if cutoff is None:
+        if rule == "required":
+            raise ValueError(f"Metric '{name}' needs a cutoff >= 1 (e.g. {kind}@10)")
+        return kind, None
+    if rule == "none":
+        raise ValueError(f"{kind} does not take a cutoff")
+    if int(cutoff) < 1:
+        raise ValueError(f"Metric '{name}' needs a cutoff >= 1 (e.g. {kind}@10)")
+    return kind, int(cutoff)
+
+
+def parse_metric_spec(spec: str) -> tuple[str, ...]:
+    """Parse a comma-separated metric spec ('ndcg@3,map,recall@100') into metric names.
+
+    Names are lowercased and repeats dropped, keeping the order given.
+
+    Raises:
+        ValueError: If the spec is empty or names an invalid metric.
+    """
+    names = tuple(dict.fromkeys(part.strip().lower() for part in spec.split(",") if part.strip()))
+    if not names:
+        raise ValueError("No metrics given")
+    for name in names:
+        parse_metric(name)
+    return names
+
+
+@lru_cache(maxsize=None)
+def top_k_for(metrics=DEFAULT_METRICS) -> int:
+    """Ranking depth to request from an engine: the largest cutoff, or DEFAULT_TOP_K if none has one."""
+    cutoffs = [cutoff for _, cutoff in map(parse_metric, metrics) if cutoff is not None]
+    return max(cutoffs, default=DEFAULT_TOP_K)
+
+
+def short_label(name: str) -> str:
+    """Scorecard column label for a metric name, e.g. 'precision@5' -> 'P@5'."""
+    kind, cutoff = parse_metric(name)
+    label = METRIC_KINDS[kind][1]
+    return label if cutoff is None else f"{label}@{cutoff}"
+
+
+@lru_cache(maxsize=None)
+def _plan(metrics: tuple[str, ...]) -> tuple[tuple, tuple[int, ...], bool]:
+    """Parsed metrics, the sorted distinct cutoffs, and whether any metric reads the whole ranking."""
+    parsed = tuple((name, *parse_metric(name)) for name in metrics)
+    cutoffs = tuple(sorted({cutoff for _, _, cutoff in parsed if cutoff is not None}))
+    unbounded = any(cutoff is None for _, _, cutoff in parsed)
+    return parsed, cutoffs, unbounded
+
+
+def compute_metrics(results: list[str], judgments: dict[str, int], metrics=DEFAULT_METRICS) -> dict[str, float]:
+    """Compute every requested metric for one ranking in a single pass.
+
+    Args:
+        results: Opinion IDs, most relevant first (already deduplicated).
+        judgments: opinion_id -> relevance score (0, 1 or 2).
+        metrics: Metric names (see parse_metric).
+
+    Returns:
+        {metric name: value}, in the order requested. Each value is identical
+        to what the matching compute_* function above returns.
+    """
+    parsed, cutoffs, unbounded = _plan(tuple(metrics))
+    depth = len(results) if unbounded or not cutoffs else min(cutoffs[-1], len(results))
+    total_relevant = sum(1 for score in judgments.values() if score >= 1)
+
+    # Running sums, snapshotted as (dcg, found, judged, ap_sum) at each cutoff
+    dcg = 0.0
+    found = 0
+    judged = 0
+    ap_sum = 0.0
+    first_highly = 0
+    at_cutoff = {}
+    pending = list(cutoffs)
+    for i in range(depth):
+        doc_id = results[i]
+        score = judgments.get(doc_id, 0)
+        dcg += score / math.log2(i + 2)  # i+2 because rank starts at 1
+        if doc_id in judgments:
+            judged += 1
+        if score >= 1:
+            found += 1
+            ap_sum += found / (i + 1)
+        if score == 2 and not first_highly:
+            first_highly = i + 1
+        while pending and pending[0] == i + 1:
+            at_cutoff[pending.pop(0)] = (dcg, found, judged, ap_sum)
+    for k in pending:
+        # Cutoffs past the end of the ranking see the final sums
+        at_cutoff[k] = (dcg, found, judged, ap_sum)
+
+    ideal_dcg = {}
+    if any(kind == "ndcg" for _, kind, _ in parsed):
+        ideal_scores = sorted(judgments.values(), reverse=True)
+        total = 0.0
+        ndcg_cutoffs = [k for _, kind, k in parsed if kind == "ndcg"]
+        for i in range(min(max(ndcg_cutoffs), len(ideal_scores))):
+            total += ideal_scores[i] / math.log2(i + 2)
+            if i + 1 in ndcg_cutoffs:
+                ideal_dcg[i + 1] = total
+        for k in ndcg_cutoffs:
+            ideal_dcg.setdefault(k, total)
+
+    values = {}
+    for name, kind, k in parsed:
+        if kind == "mrr":
+            values[name] = 1.0 / first_highly if first_highly else 0.0
+            continue
+        k_dcg, k_found, k_judged, k_ap_sum = at_cutoff[k] if k is not None else (dcg, found, judged, ap_sum)
+        if kind == "map":
+            values[name] = k_ap_sum / total_relevant if total_relevant else 0.0
+        elif kind == "ndcg":
+            values[name] = k_dcg / ideal_dcg[k] if ideal_dcg[k] != 0.0 else 0.0
+        elif kind == "precision":
+            values[name] = k_found / k
+        elif kind == "recall":
+            values[name] = k_found / total_relevant if total_relevant else 0.0
+        else:
+            values[name] = k_judged / k
+    return values
+
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
-def evaluate_query(query: dict, engine) -> dict:
+def evaluate_query(query: dict, engine, metrics=DEFAULT_METRICS) -> dict:
     """Run a single query through the engine and compute all metrics.
 
     Args:
         query: A query dict from the dataset (must have 'text' and 'relevance_judgments').
         engine: A SearchEngine instance.
+        metrics: Metric names to compute. The engine is asked for as many
+            results as the largest cutoff needs (see top_k_for).
+
+    Returns:
+        A dict with the query metadata and the computed metrics.
+    """
+    start = time.perf_counter()
+    results = engine.search(query["text"], top_k=top_k_for(metrics))
+    latency_ms = (time.perf_counter() - start) * 1000.0
+    return score_query(query, results, latency_ms=latency_ms, metrics=metrics)
+
+
+def evaluate_batch(queries: list[dict], engine, metrics=DEFAULT_METRICS) -> list[dict]:
+    """Run a batch of queries through engine.search_batch and compute all metrics.
+
+    Returns one result dict per query (see evaluate_query), in input order.
+    Each query is charged an equal share of the batch's wall-clock time.
+
+    Raises:
+        RuntimeError: If the engine returns a different number of rankings
+            than queries it was given.
+    """
+    start = time.perf_counter()
+    rankings = engine.search_batch([q["text"] for q in queries], top_k=top_k_for(metrics))
+    latency_ms = (time.perf_counter() - start) * 1000.0 / max(len(queries), 1)
+    if len(rankings) != len(queries):
+        raise RuntimeError(
+            f"search_batch returned {len(rankings)} rankings for {len(queries)} queries"
+        )
+    return [
+        score_query(query, results, latency_ms=latency_ms, metrics=metrics)
+        for query, results in zip(queries, rankings)
+    ]
+
+
+async def evaluate_query_async(query: dict, engine, metrics=DEFAULT_METRICS) -> dict:
+    """Async counterpart of evaluate_query for AsyncSearchEngine instances."""
+    start = time.perf_counter()
+    results = await engine.search(query["text"], top_k=top_k_for(metrics))
+    latency_ms = (time.perf_counter() - start) * 1000.0
+    return score_query(query, results, latency_ms=latency_ms, metrics=metrics)
+
+
+def score_query(
+    query: dict,
+    results: list[str],
+    latency_ms: float | None = None,
+    metrics=DEFAULT_METRICS,
+) -> dict:
+    """Compute all metrics for an engine's ranking of a single query.
+
+    Args:
+        query: A query dict from the dataset (must have 'text' and 'relevance_judgments').
+        results: Opinion IDs returned by the engine, most relevant first.
+        latency_ms: Wall-clock time the engine spent producing `results`.
+        metrics: Metric names to compute (default: the 7 scorecard metrics).
 
     Returns:
-        A dict with the query metadata and all 7 computed metrics.
+        A dict with the query metadata and the computed metrics.
     """
-    results = engine.search(query["text"], top_k=20)
+    results = dedupe_results(query["id"], results)
+
+    # Build judgments dict: opinion_id -> score
+    judgments = {j["opinion_id"]: j["score"] for j in query["relevance_judgments"]}
+
+    return query_result(query, results, compute_metrics(results, judgments, metrics), latency_ms)
+
 
-    # Deduplicate results, preserving order
+def dedupe_results(query_id: str, results: list[str]) -> list[str]:
+    """Drop repeated opinion IDs from a ranking (keeping the first), with a warning for each."""
     seen = set()
     deduped = []
     for doc_id in results:
         if doc_id in seen:
-            print(f"  Warning: duplicate result '{doc_id}' in query '{query['id']}' — keeping first occurrence")
+            print(f"  Warning: duplicate result '{doc_id}' in query '{query_id}' — keeping first occurrence")
         else:
             seen.add(doc_id)
             deduped.append(doc_id)
-    results = deduped
-
-    # Build judgments dict: opinion_id -> score
-    judgments = {j["opinion_id"]: j["score"] for j in query["relevance_judgments"]}
+    return deduped
 
-    metrics = {
-        "mrr": compute_mrr(results, judgments),
-        "ndcg@5": compute_ndcg(results, judgments, 5),
-        "ndcg@10": compute_ndcg(results, judgments, 10),
-        "precision@5": compute_precision(results, judgments, 5),
-        "precision@10": compute_precision(results, judgments, 10),
-        "recall@10": compute_recall(results, judgments, 10),
-        "recall@20": compute_recall(results, judgments, 20),
-    }
 
+def query_result(query: dict, results: list[str], metrics: dict, latency_ms: float | None = None) -> dict:
+    """Assemble the per-query result dict written to per_query in the JSON output."""
     return {
         "query_id": query["id"],
         "query_text": query["text"],
@@ -139,6 +406,7 @@ def evaluate_query(query: dict, engine) -> dict:
         "num_results": len(results),
         "results": results,
         "metrics": metrics,
+        "latency_ms": latency_ms,
     }
 
 
@@ -154,6 +422,110 @@ def aggregate_metrics(query_results: list[dict]) -> dict:
     return aggregated
 
 
+def group_by(query_results: list[dict], key: str) -> dict[str, list[dict]]:
+    """Group per-query results by a metadata field (e.g. 'query_type')."""
+    groups = {}
+    for qr in query_results:
+        groups.setdefault(qr[key], []).append(qr)
+    return groups
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Return the pct-th percentile (0-100) of values, linearly interpolated.
+
+    Returns 0.0 for an empty list.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def aggregate_latency(query_results: list[dict]) -> dict:
+    """Summarize per-query search latency (mean, p50/p95/p99, max) in milliseconds.
+
+    Queries without a recorded latency are ignored. Returns {} if none have one.
+    """
+    return summarize_latencies([qr["latency_ms"] for qr in query_results if qr.get("latency_ms") is not None])
+
+
+def summarize_latencies(values: list[float]) -> dict:
+    """Count, mean, p50/p95/p99 and max of latencies in milliseconds ({} if there are none)."""
+    if not values:
+        return {}
+    return {
+        "count": len(values),
+        "mean_ms": sum(values) / len(values),
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": max(values),
+    }
+
+
+def latency_groups(per_query: list[dict]) -> dict:
+    """Recorded latencies as {"overall": [...], "by_type": {type: [...]}, "by_topic": {topic: [...]}}.
+
+    Every query type and topic gets an entry, even if none of its queries has a latency.
+    """
+    groups = {"overall": [], "by_type": {}, "by_topic": {}}
+    for qr in per_query:
+        by_type = groups["by_type"].setdefault(qr["query_type"], [])
+        by_topic = groups["by_topic"].setdefault(qr["query_topic"], [])
+        latency_ms = qr.get("latency_ms")
+        if latency_ms is not None:
+            groups["overall"].append(latency_ms)
+            by_type.append(latency_ms)
+            by_topic.append(latency_ms)
+    return groups
+
+
+def build_latency_report(
+    per_query: list[dict] | None,
+    load_seconds: float,
+    wall_seconds: float,
+    evaluated: int | None = None,
+    stages: dict[str, list[float]] | None = None,
+    latencies: dict | None = None,
+) -> dict:
+    """Assemble the latency/throughput block for the scorecard and JSON output.
+
+    Args:
+        per_query: Per-query results carrying 'latency_ms'. May be None
+            when `latencies` and `evaluated` are given.
+        load_seconds: Time spent constructing the engine in load_engine.
+        wall_seconds: Wall-clock time for the whole evaluation loop. QPS is
+            computed against this, so it reflects any --workers/--concurrency
+            parallelism rather than the sum of per-query latencies.
+        evaluated: Queries evaluated within wall_seconds, if not all of
+            per_query (a resumed --stream run also reports earlier sessions).
+        stages: Per-stage latencies from engine.stage_timings(), summarized
+            as 'by_stage' when the engine reports any.
+        latencies: Latencies already grouped as latency_groups() returns
+            them (e.g. by stream.ResultAggregator), used instead of per_query.
+    """
+    if latencies is None:
+        latencies = latency_groups(per_query)
+    if evaluated is None:
+        evaluated = len(per_query)
+    report = {
+        "load_seconds": load_seconds,
+        "wall_seconds": wall_seconds,
+        "qps": evaluated / wall_seconds if wall_seconds > 0 else 0.0,
+        "overall": summarize_latencies(latencies["overall"]),
+        "by_type": {k: summarize_latencies(v) for k, v in latencies["by_type"].items()},
+        "by_topic": {k: summarize_latencies(v) for k, v in latencies["by_topic"].items()},
+    }
+    if stages:
+        report["by_stage"] = {name: summarize_latencies(values) for name, values in stages.items()}
+    return report
+
+
 def load_dataset(path: str) -> dict:
     """Load the eval dataset from a JSON file.
 
@@ -173,20 +545,239 @@ def load_dataset(path: str) -> dict:
     return dataset
 
 
-def load_engine(module_path: str):
+def iter_dataset(path: str):
+    """Yield queries from a JSONL dataset (one query object per line) without loading the file.
+
+    Each line has the same fields as an entry of dataset.json's 'queries'.
+    Queries with empty relevance_judgments are skipped (with a warning), as
+    in load_dataset. Judgment maps are built per query when it is scored.
+
+    Raises:
+        ValueError: On a line that is not a JSON object.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                query = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: not a JSON query ({e})") from e
+            if not isinstance(query, dict):
+                raise ValueError(f"{path}:{line_number}: expected a JSON object")
+            if not query.get("relevance_judgments"):
+                print(f"Warning: skipping query '{query.get('id', '?')}' — empty relevance_judgments")
+                continue
+            yield query
+
+
+# ---------------------------------------------------------------------------
+# Saved runs (rescoring without an engine)
+# ---------------------------------------------------------------------------
+
+def load_run(path: str) -> tuple[str, dict[str, list[str]]]:
+    """Read the stored rankings from a results JSON written by write_results.
+
+    A .jsonl path is read as a --stream file of per-query records, named
+    after the file.
+
+    Returns:
+        (engine name, {query_id: ranked opinion IDs}).
+
+    Raises:
+        ValueError: If the file has no per_query rankings.
+    """
+    if path.endswith(".jsonl"):
+        from src.stream import iter_stream
+
+        rankings = {qr["query_id"]: qr["results"] for qr in iter_stream(path)}
+        return os.path.splitext(os.path.basename(path))[0], rankings
+    with open(path, "r") as f:
+        run = json.load(f)
+    if not isinstance(run.get("per_query"), list):
+        raise ValueError(f"'{path}' is not a scorer results file (no per_query list)")
+    rankings = {qr["query_id"]: qr["results"] for qr in run["per_query"]}
+    return run.get("engine") or os.path.basename(path), rankings
+
+
+def load_trec_run(path: str) -> tuple[str, dict[str, list[str]]]:
+    """Read a TREC run file: whitespace-separated `qid Q0 docno rank score tag` lines.
+
+    Each query's documents are ordered by descending score, ties broken by
+    the rank column. The run name is the tag of the first line.
+
+    Returns:
+        (run tag, {query_id: ranked opinion IDs}).
+
+    Raises:
+        ValueError: On a line that does not have six fields.
+    """
+    entries = {}
+    tag = None
+    with open(path, "r") as f:
+        for line_number, line in enumerate(f, start=1):
+            fields = line.split()
+            if not fields:
+                continue
+            if len(fields) != 6:
+                raise ValueError(f"{path}:{line_number}: expected 6 fields, got {len(fields)}")
+            qid, _, docno, rank, score, run_tag = fields
+            tag = tag or run_tag
+            entries.setdefault(qid, []).append((-float(score), int(rank), docno))
+    rankings = {qid: [docno for *_, docno in sorted(docs)] for qid, docs in entries.items()}
+    return tag or os.path.basename(path), rankings
+
+
+def rescore_run(queries: list[dict], rankings: dict[str, list[str]], metrics=DEFAULT_METRICS) -> list[dict]:
+    """Score stored rankings against the dataset's current judgments.
+
+    Queries absent from the run are scored as empty rankings; rankings for
+    queries no longer in the dataset are ignored. Latency is not recorded.
+    """
+    return rescore_runs(queries, [rankings], metrics=metrics)[0]
+
+
+def rescore_runs(
+    queries: list[dict],
+    runs: list[dict[str, list[str]]],
+    backend: str = "python",
+    metrics=DEFAULT_METRICS,
+) -> list[list[dict]]:
+    """rescore_run for several runs at once.
+
+    backend="numpy" computes the metrics for all runs in one vectorized pass
+    (see src/metrics_np.py); the results are identical to the default
+    per-query Python path.
+    """
+    if backend not in METRIC_BACKENDS:
+        raise ValueError(f"Unknown metrics backend '{backend}' (expected one of {METRIC_BACKENDS})")
+    for rankings in runs:
+        missing = [q["id"] for q in queries if q["id"] not in rankings]
+        if missing:
+            print(f"  Warning: {len(missing)} queries have no ranking in this run and score 0 "
+                  f"(first: {', '.join(missing[:3])})")
+    if backend == "python":
+        return [
+            [score_query(query, rankings.get(query["id"], []), metrics=metrics) for query in queries]
+            for rankings in runs
+        ]
+
+    from src.metrics_np import score_rankings
+
+    deduped = [{q["id"]: dedupe_results(q["id"], rankings.get(q["id"], [])) for q in queries} for rankings in runs]
+    scored = score_rankings(queries, deduped, metrics)
+    return [
+        [query_result(query, rankings[query["id"]], query_metrics) for query, query_metrics in zip(queries, run_metrics)]
+        for rankings, run_metrics in zip(deduped, scored)
+    ]
+
+
+def load_engine(
+    module_path: str,
+    snapshot_dir: str | None = None,
+    engine_version: str | None = None,
+    params: dict | None = None,
+):
     """Import a module and find/instantiate a SearchEngine subclass.
 
+    AsyncSearchEngine subclasses are accepted as well; callers can tell them
+    apart with is_async_engine().
+
+    With snapshot_dir, engines that implement the save_state/load_state hooks
+    are restored from a snapshot when one exists, and snapshotted right
+    after construction when not (see snapshot_path). Other engines are
+    constructed as usual.
+
     Args:
         module_path: Dotted module path (e.g., 'src.baselines.random_baseline').
+        snapshot_dir: Optional directory holding engine snapshots.
+        engine_version: Version or config hash; snapshots of other versions
+            are not reused.
+        params: Keyword arguments for the engine constructor (see
+            parse_param). Snapshots are kept per set of params.
 
     Returns:
-        An instantiated SearchEngine subclass.
+        An instantiated SearchEngine (or AsyncSearchEngine) subclass.
 
     Raises:
         ImportError: If the module cannot be imported.
         RuntimeError: If no SearchEngine subclass is found in the module.
     """
-    from src.interface import SearchEngine
+    params = params or {}
+    engine_cls = find_engine_class(module_path)
+    if snapshot_dir is None or not supports_snapshots(engine_cls):
+        return construct_engine(engine_cls, params)
+
+    path = snapshot_path(snapshot_dir, module_path, engine_cls, engine_version, params)
+    if os.path.isfile(os.path.join(path, SNAPSHOT_MANIFEST)):
+        try:
+            engine = engine_cls.load_state(path)
+            print(f"Restored engine snapshot from {path}")
+            return engine
+        except Exception as e:
+            print(f"Warning: could not restore snapshot '{path}' ({e}) — rebuilding")
+    engine = construct_engine(engine_cls, params)
+    save_snapshot(engine, path, engine_version)
+    return engine
+
+
+def construct_engine(engine_cls: type, params: dict):
+    """Call engine_cls(**params), turning a bad parameter name into a readable error.
+
+    Raises:
+        TypeError: If the constructor does not accept one of the params.
+    """
+    if params:
+        try:
+            inspect.signature(engine_cls).bind(**params)
+        except TypeError as e:
+            raise TypeError(f"{engine_cls.__name__} does not accept parameters {sorted(params)}: {e}") from e
+    return engine_cls(**params)
+
+
+def parse_param_value(text: str):
+    """Parse a --param value: JSON literals (1.2, true, null, "x") as such, anything else as a string."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+def parse_param(spec: str) -> tuple[str, list]:
+    """Split a 'name=value[,value...]' spec into (name, [parsed values]).
+
+    Raises:
+        ValueError: If the spec has no '=', an invalid name, or no values.
+    """
+    name, sep, values = spec.partition("=")
+    name = name.strip()
+    if not sep or not name.isidentifier():
+        raise ValueError(f"Expected name=value[,value...], got '{spec}'")
+    parsed = [parse_param_value(v.strip()) for v in values.split(",") if v.strip()]
+    if not parsed:
+        raise ValueError(f"No values given for parameter '{name}'")
+    return name, parsed
+
+
+def format_params(params: dict) -> str:
+    """Render constructor params as 'k1=0.9,b=0.4' (in the order given)."""
+    return ",".join(f"{k}={json.dumps(v) if isinstance(v, str) else v}" for k, v in params.items())
+
+
+def find_engine_class(module_path: str) -> type:
+    """Import a module and return its first SearchEngine (or AsyncSearchEngine) subclass.
+
+    Classes defined in the module itself win over ones it imports, so a
+    module that composes other engines (see src/pipeline.py) resolves to
+    its own class.
+
+    Raises:
+        ImportError: If the module cannot be imported.
+        RuntimeError: If no SearchEngine subclass is found in the module.
+    """
+    from src.interface import AsyncSearchEngine, SearchEngine
+
+    base_classes = (SearchEngine, AsyncSearchEngine)
 
     try:
         module = importlib.import_module(module_path)
@@ -194,9 +785,15 @@ def load_engine(module_path: str):
         raise ImportError(f"Could not import module '{module_path}': {e}") from e
 
     # Scan module for SearchEngine subclasses
-    for _name, obj in inspect.getmembers(module, inspect.isclass):
-        if issubclass(obj, SearchEngine) and obj is not SearchEngine:
-            return obj()
+    found = [
+        obj for _name, obj in inspect.getmembers(module, inspect.isclass)
+        if issubclass(obj, base_classes) and obj not in base_classes
+    ]
+    for obj in found:
+        if obj.__module__ == module.__name__:
+            return obj
+    if found:
+        return found[0]
 
     raise RuntimeError(
         f"No SearchEngine subclass found in module '{module_path}'. "
@@ -204,6 +801,273 @@ def load_engine(module_path: str):
     )
 
 
+def supports_snapshots(engine_cls: type) -> bool:
+    """Return True if engine_cls overrides both SearchEngine.save_state and load_state."""
+    from src.interface import SearchEngine
+
+    if not issubclass(engine_cls, SearchEngine):
+        return False
+    return (
+        engine_cls.save_state is not SearchEngine.save_state
+        and engine_cls.load_state.__func__ is not SearchEngine.load_state.__func__
+    )
+
+
+def snapshot_path(
+    snapshot_dir: str,
+    module_path: str,
+    engine_cls: type,
+    engine_version: str | None = None,
+    params: dict | None = None,
+) -> str:
+    """Directory for one engine build's snapshot: <snapshot_dir>/<module>.<Class>[@version][#params-hash]."""
+    name = f"{module_path}.{engine_cls.__name__}"
+    if engine_version:
+        name += f"@{engine_version}"
+    if params:
+        digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+        name += f"#{digest[:12]}"
+    return os.path.join(snapshot_dir, re.sub(r"[^\w.@=,+-]", "_", name))
+
+
+def save_snapshot(engine, path: str, engine_version: str | None = None):
+    """Write engine.save_state into path, replacing any older snapshot.
+
+    The state is written to a temporary directory that is renamed into place
+    once the manifest is written, so an interrupted save never leaves a
+    snapshot that load_engine would try to restore. Failures are reported
+    as warnings; the engine itself is unaffected.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    try:
+        engine.save_state(tmp_path)
+        with open(os.path.join(tmp_path, SNAPSHOT_MANIFEST), "w") as f:
+            json.dump({
+                "engine": f"{type(engine).__module__}.{type(engine).__qualname__}",
+                "version": engine_version,
+                "created": datetime.now(timezone.utc).isoformat(),
+            }, f, indent=2)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        print(f"Warning: could not save snapshot '{path}' ({e})")
+        return
+    print(f"Saved engine snapshot to {path}")
+
+
+def is_async_engine(engine) -> bool:
+    """Return True if engine implements AsyncSearchEngine (awaitable search)."""
+    from src.interface import AsyncSearchEngine
+
+    return isinstance(engine, AsyncSearchEngine)
+
+
+# ---------------------------------------------------------------------------
+# Parallel execution
+# ---------------------------------------------------------------------------
+
+# What process-pool workers evaluate with (an engine, or the sweep's list of
+# engines). Set in the parent before forking, or built by _init_worker when
+# the platform can only spawn fresh interpreters.
+_worker_state = None
+
+
+def worker_state():
+    """Return the state make_pool handed to this process-pool worker."""
+    return _worker_state
+
+
+def _init_worker(factory):
+    """Process-pool initializer: build the worker state once per spawned worker."""
+    global _worker_state
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+    _worker_state = factory()
+
+
+def _evaluate_in_worker(query: dict, metrics=DEFAULT_METRICS) -> dict:
+    return evaluate_query(query, _worker_state, metrics=metrics)
+
+
+def _evaluate_batch_in_worker(queries: list[dict], metrics=DEFAULT_METRICS) -> list[dict]:
+    return evaluate_batch(queries, _worker_state, metrics=metrics)
+
+
+def _engine_factory(search_module: str | None, load_options: dict | None = None):
+    """Picklable callable that loads the engine in a spawned worker (None without a module)."""
+    if search_module is None:
+        return None
+    return partial(load_engine, search_module, **(load_options or {}))
+
+
+def _chunked(items, size: int):
+    """Yield successive lists of up to `size` items. size=0 yields one list of everything."""
+    if size == 0:
+        chunk = list(items)
+        if chunk:
+            yield chunk
+        return
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def ordered_map(executor, fn, items, window: int):
+    """Like executor.map, but keeps at most `window` tasks in flight.
+
+    Results are yielded in submission order, so callers see the same
+    sequence as a serial loop regardless of which worker finishes first.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def iter_evaluations(
+    queries,
+    engine,
+    workers: int = 1,
+    executor: str = "thread",
+    search_module: str | None = None,
+    batch_size: int | None = None,
+    metrics=DEFAULT_METRICS,
+    load_options: dict | None = None,
+):
+    """Evaluate queries, yielding per-query results in dataset order.
+
+    Args:
+        queries: Iterable of query dicts from the dataset.
+        engine: A SearchEngine instance (used directly by the serial and
+            thread paths, and inherited by forked process workers).
+        workers: Number of concurrent workers. 1 runs serially in-process.
+        executor: "thread" or "process". Thread pools suit engines that
+            release the GIL (I/O, NumPy); process pools suit pure-Python
+            engines.
+        search_module: Dotted module path of the engine. Required for the
+            process executor on platforms without fork, where each worker
+            has to construct its own engine.
+        batch_size: If set, queries are sent through engine.search_batch in
+            chunks of this size (0 sends the whole query set in one call).
+            With workers > 1, chunks are distributed across the pool.
+            None calls engine.search once per query.
+        metrics: Metric names to compute for every query.
+        load_options: Keyword arguments for load_engine in spawned process
+            workers (e.g. snapshot_dir, so they restore a snapshot instead
+            of constructing the engine).
+    """
+    if executor not in EXECUTOR_KINDS:
+        raise ValueError(f"Unknown executor '{executor}' (expected one of {EXECUTOR_KINDS})")
+
+    if batch_size is not None:
+        yield from _iter_batch_evaluations(
+            queries, engine, workers, executor, search_module, batch_size, metrics, load_options,
+        )
+        return
+
+    if workers <= 1:
+        for query in queries:
+            yield evaluate_query(query, engine, metrics=metrics)
+        return
+
+    pool = make_pool(workers, executor, engine, _engine_factory(search_module, load_options))
+    if executor == "thread":
+        fn = partial(evaluate_query, engine=engine, metrics=metrics)
+    else:
+        fn = partial(_evaluate_in_worker, metrics=metrics)
+
+    with pool:
+        yield from ordered_map(pool, fn, queries, window=workers * 4)
+
+
+def iter_async_evaluations(queries, engine, concurrency: int = 8, metrics=DEFAULT_METRICS):
+    """Evaluate queries against an AsyncSearchEngine, yielding results in dataset order.
+
+    At most `concurrency` searches are in flight at once. The event loop is
+    private to this generator, so callers iterate it like iter_evaluations.
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be >= 1, got {concurrency}")
+
+    loop = asyncio.new_event_loop()
+    pending = deque()
+    try:
+        for query in queries:
+            pending.append(loop.create_task(evaluate_query_async(query, engine, metrics=metrics)))
+            if len(pending) >= concurrency:
+                yield loop.run_until_complete(pending.popleft())
+        while pending:
+            yield loop.run_until_complete(pending.popleft())
+    finally:
+        # Consumer stopped early or a search raised: cancel whatever is left
+        for task in pending:
+            task.cancel()
+        if pending:
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.close()
+
+
+def _iter_batch_evaluations(
+    queries, engine, workers, executor, search_module, batch_size, metrics=DEFAULT_METRICS, load_options=None,
+):
+    """Batched counterpart of iter_evaluations; yields flattened per-query results."""
+    chunks = _chunked(queries, batch_size)
+
+    if workers <= 1:
+        for chunk in chunks:
+            yield from evaluate_batch(chunk, engine, metrics=metrics)
+        return
+
+    pool = make_pool(workers, executor, engine, _engine_factory(search_module, load_options))
+    if executor == "thread":
+        fn = partial(evaluate_batch, engine=engine, metrics=metrics)
+    else:
+        fn = partial(_evaluate_batch_in_worker, metrics=metrics)
+
+    with pool:
+        for batch_results in ordered_map(pool, fn, chunks, window=workers * 2):
+            yield from batch_results
+
+
+def make_pool(workers: int, executor: str, state, factory=None):
+    """Create the executor used to fan out evaluation work.
+
+    Thread workers use `state` (an engine, or anything the task function
+    needs) directly; process workers read it through worker_state().
+
+    Args:
+        workers: Pool size.
+        executor: "thread" or "process".
+        state: The already-built engine(s). Forked process workers inherit
+            it, so an index is loaded once and shared copy-on-write.
+        factory: Picklable no-argument callable that builds the state in
+            each spawned worker, on platforms that cannot fork.
+
+    Raises:
+        ValueError: For a process pool on a spawn-only platform without a factory.
+    """
+    global _worker_state
+
+    if executor == "thread":
+        return ThreadPoolExecutor(max_workers=workers)
+    elif "fork" in multiprocessing.get_all_start_methods():
+        _worker_state = state
+        return ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("fork")
+        )
+    if factory is None:
+        raise ValueError(
+            "The process executor cannot fork on this platform; pass search_module so workers can load the engine"
+        )
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(factory,))
+
+
 # ---------------------------------------------------------------------------
 # Output
 # ---------------------------------------------------------------------------
@@ -214,13 +1078,18 @@ def print_scorecard(
     by_type: dict[str, dict],
     by_topic: dict[str, dict],
     num_queries: int,
+    latency: dict | None = None,
+    profile: dict | None = None,
 ):
     """Print a formatted scorecard to stdout.
 
-    80-char-wide table with metrics to 3 decimal places.
+    One column per metric in `overall` (80 chars wide for the default 7),
+    to 3 decimal places, followed by a latency/throughput table when
+    `latency` (see build_latency_report) is given and a profile summary
+    when `profile` (see profiling.PhaseProfiler.write) is.
     """
-    metric_keys = ["mrr", "ndcg@5", "ndcg@10", "precision@5", "precision@10", "recall@10", "recall@20"]
-    short_labels = ["MRR", "nDCG@5", "nDCG@10", "P@5", "P@10", "R@10", "R@20"]
+    metric_keys = list(overall) or list(DEFAULT_METRICS)
+    short_labels = [short_label(key) for key in metric_keys]
 
     sep = "=" * 80
     thin_sep = "-" * 80
@@ -268,44 +1137,195 @@ def print_scorecard(
             print(row)
         print(thin_sep)
 
+    if latency:
+        print()
+        print_latency_table(latency)
+
+    if profile:
+        from src.profiling import print_profile_summary
+
+        print()
+        print_profile_summary(profile)
+
     print()
 
 
+def print_latency_table(latency: dict):
+    """Print per-query search latency percentiles and overall throughput."""
+    stat_keys = ["mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+    short_labels = ["mean", "p50", "p95", "p99", "max"]
+
+    thin_sep = "-" * 80
+
+    header = f"{'Latency (ms)':>20s}"
+    for label in short_labels:
+        header += f"  {label:>8s}"
+    print(header)
+    print(thin_sep)
+
+    def print_row(label: str, stats: dict):
+        row = f"{label:>20s}"
+        for key in stat_keys:
+            row += f"  {stats.get(key, 0.0):>8.2f}"
+        print(row)
+
+    print_row("Overall", latency.get("overall", {}))
+    print(thin_sep)
+
+    if latency.get("by_type"):
+        print(f"{'By Query Type':>20s}")
+        for type_name in sorted(latency["by_type"].keys()):
+            print_row("  " + type_name, latency["by_type"][type_name])
+        print(thin_sep)
+
+    if latency.get("by_topic"):
+        print(f"{'By Topic':>20s}")
+        for topic_name in sorted(latency["by_topic"].keys()):
+            print_row("  " + topic_name[:18], latency["by_topic"][topic_name])
+        print(thin_sep)
+
+    if latency.get("by_stage"):
+        print(f"{'By Stage':>20s}")
+        for stage_name, stats in latency["by_stage"].items():
+            print_row("  " + stage_name[:18], stats)
+        print(thin_sep)
+
+    print(
+        f"  Engine load: {latency.get('load_seconds', 0.0):.3f}s"
+        f"    Wall clock: {latency.get('wall_seconds', 0.0):.3f}s"
+        f"    Throughput: {latency.get('qps', 0.0):.2f} queries/s"
+    )
+
+
 def write_results(
     path: str,
     engine_name: str,
     overall: dict,
     by_type: dict[str, dict],
     by_topic: dict[str, dict],
-    per_query: list[dict],
+    per_query: list[dict] | None,
+    latency: dict | None = None,
+    stream_path: str | None = None,
+    profile: dict | None = None,
 ):
-    """Write detailed evaluation results to a JSON file."""
+    """Write detailed evaluation results to a JSON file.
+
+    With per_query=None, only the aggregates are written. For a --stream
+    run the per-query records stay in the JSONL file, and the output points
+    to it as 'per_query_stream'.
+    """
     output = {
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "engine": engine_name,
         "overall": overall,
         "by_type": by_type,
         "by_topic": by_topic,
-        "per_query": per_query,
     }
+    if per_query is not None:
+        output["per_query"] = per_query
+    if stream_path is not None:
+        output["per_query_stream"] = stream_path
+    if latency is not None:
+        output["latency"] = latency
+    if profile is not None:
+        output["profile"] = profile
     with open(path, "w") as f:
         json.dump(output, f, indent=2)
     print(f"Results written to {path}")
 
 
+def report(
+    engine_name: str,
+    per_query: list[dict],
+    output: str | None = None,
+    latency: dict | None = None,
+    profile: dict | None = None,
+):
+    """Aggregate per-query results, print the scorecard and optionally write the JSON results."""
+    # Aggregate overall
+    overall = aggregate_metrics(per_query)
+
+    # Aggregate by query type and by topic
+    by_type = {k: aggregate_metrics(v) for k, v in group_by(per_query, "query_type").items()}
+    by_topic = {k: aggregate_metrics(v) for k, v in group_by(per_query, "query_topic").items()}
+
+    print_scorecard(engine_name, overall, by_type, by_topic, len(per_query), latency=latency, profile=profile)
+
+    if output:
+        write_results(output, engine_name, overall, by_type, by_topic, per_query, latency=latency, profile=profile)
+
+
 # ---------------------------------------------------------------------------
 # Main / CLI
 # ---------------------------------------------------------------------------
 
+def _batch_size_arg(value: str) -> int:
+    """argparse type for --batch-size: a positive integer or 'all' (stored as 0)."""
+    if value == "all":
+        return 0
+    try:
+        size = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a positive integer or 'all', got '{value}'")
+    if size < 1:
+        raise argparse.ArgumentTypeError(f"batch size must be >= 1, got {size}")
+    return size
+
+
+def _metrics_arg(value: str) -> tuple[str, ...]:
+    """argparse type for --metrics: a comma-separated metric spec."""
+    try:
+        return parse_metric_spec(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
 def main():
+    # Add project root to sys.path so module imports work
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+
+    from src.cache import DEFAULT_MAX_ENTRIES, RunCache, engine_fingerprint, iter_cached_evaluations
+    from src.profiling import DEFAULT_PROFILE_DIR, DEFAULT_TOP, PROFILERS, ProfiledEngine, make_profiler
+
     parser = argparse.ArgumentParser(
         description="FPPC Opinions Search Evaluation Scoring Harness"
     )
     parser.add_argument(
         "--search-module",
-        required=True,
+        default=None,
         help="Dotted module path to a SearchEngine implementation (e.g., src.baselines.random_baseline)",
     )
+    parser.add_argument(
+        "--from-run",
+        action="append",
+        default=[],
+        metavar="RESULTS_JSON",
+        help="Rescore the rankings stored in a previous --output file instead of "
+             "running an engine (repeatable)",
+    )
+    parser.add_argument(
+        "--trec-run",
+        action="append",
+        default=[],
+        metavar="RUN_FILE",
+        help="Rescore a TREC-format run file instead of running an engine (repeatable)",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=_metrics_arg,
+        default=DEFAULT_METRICS,
+        help="Comma-separated metrics to compute, from mrr, map[@k], ndcg@k, precision@k, "
+             "recall@k, judged@k (default: " + ",".join(DEFAULT_METRICS) + "). Engines are "
+             f"asked for as many results as the largest cutoff (or {DEFAULT_TOP_K} if none)",
+    )
+    parser.add_argument(
+        "--metrics-backend",
+        choices=METRIC_BACKENDS,
+        default="python",
+        help="How rescored runs are scored: per-query Python (default) or one vectorized "
+             "NumPy pass over all runs (faster for many runs; identical results)",
+    )
     parser.add_argument(
         "--dataset",
         required=True,
@@ -316,64 +1336,315 @@ def main():
         default=None,
         help="Optional path to write detailed JSON results",
     )
+    parser.add_argument(
+        "--stream",
+        default=None,
+        metavar="RESULTS_JSONL",
+        help="Append each per-query result to this JSONL file as soon as it is computed "
+             "(fsync'd in batches); aggregates are read back from the file at the end",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="With --stream, skip queries already in the file and append the rest",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of queries to evaluate concurrently (default: 1, serial)",
+    )
+    parser.add_argument(
+        "--executor",
+        choices=EXECUTOR_KINDS,
+        default="thread",
+        help="Pool type used when --workers > 1 (default: thread)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=_batch_size_arg,
+        default=None,
+        help="Send queries through search_batch in chunks of N, or 'all' for the "
+             "whole query set in one call (default: one search() call per query)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Maximum in-flight searches for AsyncSearchEngine implementations (default: 8)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Reuse rankings cached in this directory and search only for misses "
+             "(manage with: python src/cache.py --cache-dir DIR stats|invalidate)",
+    )
+    parser.add_argument(
+        "--engine-version",
+        default=None,
+        help="Version or config hash identifying this engine build in the cache and snapshot dir; "
+             "change it whenever the engine's rankings change",
+    )
+    parser.add_argument(
+        "--param",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Keyword argument for the engine constructor, e.g. --param k1=0.9 (repeatable; "
+             "values are parsed as JSON where possible). Use src/sweep.py to try several values",
+    )
+    parser.add_argument(
+        "--snapshot-dir",
+        default=None,
+        help="Restore engines that implement save_state/load_state from a snapshot in this "
+             "directory instead of constructing them (the first run builds and saves it)",
+    )
+    parser.add_argument(
+        "--cache-max-entries",
+        type=int,
+        default=DEFAULT_MAX_ENTRIES,
+        help=f"Evict least-recently-used cached rankings beyond this many (default: {DEFAULT_MAX_ENTRIES})",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=PROFILERS,
+        default=None,
+        help="Profile engine construction and search calls (requires --workers 1)",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        default=DEFAULT_PROFILE_DIR,
+        help=f"Directory for .pstats/.tracemalloc profile files (default: {DEFAULT_PROFILE_DIR})",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=DEFAULT_TOP,
+        help=f"Hotspots or allocation sites per phase in the profile summary (default: {DEFAULT_TOP})",
+    )
     args = parser.parse_args()
 
-    # Add project root to sys.path so module imports work
-    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    if project_root not in sys.path:
-        sys.path.insert(0, project_root)
-
-    # Load dataset
-    print(f"Loading dataset from {args.dataset}...")
-    dataset = load_dataset(args.dataset)
-    queries = dataset["queries"]
-
-    if not queries:
+    runs = [(path, load_run) for path in args.from_run] + [(path, load_trec_run) for path in args.trec_run]
+    if bool(args.search_module) == bool(runs):
+        parser.error("give either --search-module or at least one --from-run/--trec-run")
+    if args.workers < 1:
+        parser.error("--workers must be >= 1")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be >= 1")
+    if args.cache_max_entries < 1:
+        parser.error("--cache-max-entries must be >= 1")
+    params = {}
+    for spec in args.param:
+        try:
+            name, values = parse_param(spec)
+        except ValueError as e:
+            parser.error(f"--param: {e}")
+        if len(values) > 1:
+            parser.error(f"--param {name} has several values; use src/sweep.py to compare configurations")
+        params[name] = values[0]
+    if params and runs:
+        parser.error("--param applies to engine runs, not --from-run/--trec-run")
+    if args.resume and not args.stream:
+        parser.error("--resume requires --stream")
+    if args.stream and runs:
+        parser.error("--stream applies to engine runs, not --from-run/--trec-run")
+    if args.profile and runs:
+        parser.error("--profile applies to engine runs, not --from-run/--trec-run")
+    if args.profile and args.workers > 1:
+        parser.error("--profile runs in-process; use --workers 1")
+    if args.profile_top < 1:
+        parser.error("--profile-top must be >= 1")
+
+    # Load dataset; a .jsonl dataset is streamed and never held in memory
+    lazy = args.dataset.endswith(".jsonl")
+    if lazy:
+        print(f"Streaming dataset from {args.dataset}...")
+        queries = iter_dataset(args.dataset)
+        first = next(queries, None)
+        queries = chain([first], queries)
+    else:
+        print(f"Loading dataset from {args.dataset}...")
+        queries = load_dataset(args.dataset)["queries"]
+        first = queries[0] if queries else None
+
+    if first is None:
         print("No queries with relevance judgments found. Nothing to evaluate.")
         sys.exit(0)
 
+    stream_header = None
+    if args.stream:
+        from src.stream import file_sha256, header_mismatches, read_stream_header
+
+        # What produced the stream's records; --resume only appends to a matching stream
+        stream_header = {
+            "search_module": args.search_module,
+            "engine_version": args.engine_version,
+            "params": params,
+            "metrics": list(args.metrics),
+            "dataset_sha256": file_sha256(args.dataset),
+        }
+        if args.resume and os.path.isfile(args.stream) and os.path.getsize(args.stream) > 0:
+            mismatched = header_mismatches(read_stream_header(args.stream), stream_header)
+            if mismatched:
+                parser.error(
+                    f"--resume: {args.stream} was written with a different {', '.join(mismatched)}; "
+                    "start a new --stream file"
+                )
+
+    if runs:
+        # Rescoring needs the stored rankings in memory anyway
+        queries = list(queries)
+        # Rescore stored rankings; the engine is never imported
+        loaded = [loader(path) for path, loader in runs]
+        print(f"Rescoring {len(loaded)} run(s) ({args.metrics_backend} metrics backend)...")
+        rescored = rescore_runs(
+            queries, [rankings for _, rankings in loaded], backend=args.metrics_backend, metrics=args.metrics,
+        )
+        for (path, _), (run_name, _), per_query in zip(runs, loaded, rescored):
+            print(f"Rescored {run_name} from {path}")
+            output = args.output
+            if output and len(runs) > 1:
+                os.makedirs(output, exist_ok=True)
+                output = os.path.join(output, os.path.splitext(os.path.basename(path))[0] + ".json")
+            print()
+            report(run_name, per_query, output=output)
+        return
+
     # Load engine
     print(f"Loading search engine from {args.search_module}...")
-    engine = load_engine(args.search_module)
-    print(f"Engine: {engine.name()}")
+    load_start = time.perf_counter()
+    load_options = {"snapshot_dir": args.snapshot_dir, "engine_version": args.engine_version, "params": params}
+    profiler = make_profiler(args.profile, top=args.profile_top) if args.profile else None
+    if profiler is not None:
+        with profiler.phase("construct"):
+            engine = load_engine(args.search_module, **load_options)
+    else:
+        engine = load_engine(args.search_module, **load_options)
+    load_seconds = time.perf_counter() - load_start
+    print(f"Engine: {engine.name()} (loaded in {load_seconds:.3f}s)")
+    if params:
+        print(f"Parameters: {format_params(params)}")
+    print(f"Metrics: {', '.join(args.metrics)} (top_k {top_k_for(args.metrics)})")
+    if profiler is not None:
+        if is_async_engine(engine):
+            parser.error("--profile does not apply to async engines")
+        print(f"Profiling construction and search with {args.profile} (files in {args.profile_dir})")
+        engine = ProfiledEngine(engine, profiler)
     print()
 
+    stream = None
+    if args.stream:
+        from src.stream import JsonlResultWriter, aggregate_stream, completed_query_ids, repair_stream
+
+        if args.resume:
+            dropped = repair_stream(args.stream)
+            if dropped:
+                print(f"Dropped a partial record ({dropped} bytes) at the end of {args.stream}")
+            done = completed_query_ids(args.stream)
+            if lazy:
+                queries = (q for q in queries if q["id"] not in done)
+                print(f"Resuming {args.stream}: {len(done)} queries already done")
+            else:
+                queries = [q for q in queries if q["id"] not in done]
+                print(f"Resuming {args.stream}: {len(done)} queries already done, {len(queries)} to go")
+        stream = JsonlResultWriter(args.stream, append=args.resume, header=stream_header)
+
+    aggregator = None
+    if lazy and stream is None:
+        from src.stream import ResultAggregator
+
+        aggregator = ResultAggregator()
+    total = None if lazy else len(queries)
+    described = "streamed queries" if lazy else f"{total} queries"
+
     # Evaluate each query
-    print(f"Evaluating {len(queries)} queries...")
+    if is_async_engine(engine):
+        if args.workers > 1 or args.batch_size is not None:
+            parser.error("--workers and --batch-size do not apply to async engines; use --concurrency")
+        print(f"Evaluating {described} (async, concurrency {args.concurrency})...")
+        evaluate = partial(
+            iter_async_evaluations, engine=engine, concurrency=args.concurrency, metrics=args.metrics,
+        )
+    else:
+        if args.workers > 1:
+            print(f"Evaluating {described} ({args.workers} {args.executor} workers)...")
+        else:
+            print(f"Evaluating {described}...")
+        evaluate = partial(
+            iter_evaluations,
+            engine=engine,
+            workers=args.workers,
+            executor=args.executor,
+            search_module=args.search_module,
+            batch_size=args.batch_size,
+            metrics=args.metrics,
+            load_options=load_options,
+        )
+
+    cache = None
+    if args.cache_dir:
+        cache = RunCache(args.cache_dir, max_entries=args.cache_max_entries)
+        fingerprint = engine_fingerprint(engine.name(), args.engine_version, params)
+        if args.engine_version is None:
+            print("Warning: no --engine-version given; cached rankings are keyed by engine name only")
+        score = partial(score_query, metrics=args.metrics)
+        results = iter_cached_evaluations(queries, cache, fingerprint, evaluate, score, top_k=top_k_for(args.metrics))
+    else:
+        results = evaluate(queries)
     per_query = []
-    for i, query in enumerate(queries, start=1):
-        print(f"  [{i}/{len(queries)}] {query['id']}: {query['text'][:60]}...")
-        result = evaluate_query(query, engine)
-        per_query.append(result)
-
-    # Aggregate overall
-    overall = aggregate_metrics(per_query)
-
-    # Aggregate by query type
-    by_type = {}
-    for qr in per_query:
-        qtype = qr["query_type"]
-        if qtype not in by_type:
-            by_type[qtype] = []
-        by_type[qtype].append(qr)
-    by_type = {k: aggregate_metrics(v) for k, v in by_type.items()}
-
-    # Aggregate by topic
-    by_topic = {}
-    for qr in per_query:
-        topic = qr["query_topic"]
-        if topic not in by_topic:
-            by_topic[topic] = []
-        by_topic[topic].append(qr)
-    by_topic = {k: aggregate_metrics(v) for k, v in by_topic.items()}
-
-    # Print scorecard
+    evaluated = 0
+    eval_start = time.perf_counter()
+    try:
+        for i, result in enumerate(results, start=1):
+            progress = f"{i}/{total}" if total is not None else str(i)
+            print(f"  [{progress}] {result['query_id']}: {result['query_text'][:60]}...")
+            if stream is not None:
+                stream.write(result)
+            elif aggregator is not None:
+                aggregator.add(result)
+            else:
+                per_query.append(result)
+            evaluated = i
+    finally:
+        # Keep whatever was computed if the run dies part-way
+        if stream is not None:
+            stream.close()
+    wall_seconds = time.perf_counter() - eval_start
+    if cache is not None:
+        print(f"Cache: {cache.hits} hits, {cache.misses} misses ({fingerprint})")
+        cache.close()
+    profile = profiler.write(args.profile_dir, args.search_module) if profiler is not None else None
+    # Process workers keep their own engine copies, so their stage timings never reach this one
+    stages = None
+    if not is_async_engine(engine) and (args.workers == 1 or args.executor == "thread"):
+        stages = engine.stage_timings()
+
+    if stream is None and aggregator is None:
+        latency = build_latency_report(per_query, load_seconds, wall_seconds, stages=stages)
+        print()
+        report(engine.name(), per_query, output=args.output, latency=latency, profile=profile)
+        return
+
+    if stream is not None:
+        print(f"Streamed {evaluated} results to {args.stream}")
+        summary = aggregate_stream(args.stream)
+    else:
+        summary = aggregator.summary()
+        if args.output:
+            print("Note: per-query results of a streamed dataset are not kept; pass --stream to save them")
+    latency = build_latency_report(
+        None, load_seconds, wall_seconds, evaluated=evaluated, stages=stages, latencies=summary["latencies"],
+    )
     print()
-    print_scorecard(engine.name(), overall, by_type, by_topic, len(queries))
-
-    # Write results if requested
+    print_scorecard(
+        engine.name(), summary["overall"], summary["by_type"], summary["by_topic"],
+        summary["num_queries"], latency=latency, profile=profile,
+    )
     if args.output:
-        write_results(args.output, engine.name(), overall, by_type, by_topic, per_query)
+        write_results(
+            args.output, engine.name(), summary["overall"], summary["by_type"], summary["by_topic"],
+            None, latency=latency, stream_path=args.stream, profile=profile,
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,399 @@
+"""
+Government Code section index over citations.government_code.
+
+Statute citations are written many ways ("87103(a)", "87103 (a)",
+"§ 87103", "Gov. Code sec. 87103(a)(1)"), and free-text tokenizers split
+them into "87103" and "a". normalize_section() reduces a citation to one
+canonical key ("87103(a)", subsections lower-cased with no spaces), and
+StatuteIndex maps keys to the opinions citing them:
+
+    87103(a)(1)   exactly that subsection, and anything under it
+    87103(a)      the subsection and its sub-subsections
+    87103         the section and all its subsections
+    871*          every section whose number starts with 871 ("871xx" also works)
+
+Each opinion is posted under every one of those keys when it is built,
+so a lookup of any key or prefix is one dict probe plus one slice of the
+postings array: O(1) regardless of how many sections match. The index is
+one memory-mapped file (offsets and postings as uint32 arrays, keys in
+JSON meta; see corpus.save_sections).
+
+StatuteEngine wraps any engine. It finds the sections a query names
+(section_keys) and boosts candidates citing them, or keeps only those
+candidates (mode="filter"). Queries naming no indexed section pass
+through unchanged.
+
+Usage:
+    python src/statutes.py --data-dir data/extracted --output data/statutes.idx
+    python src/statutes.py --lookup 871xx
+"""
+
+import argparse
+import bisect
+import os
+import re
+import sys
+import time
+from array import array
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.corpus import DEFAULT_STORE_PATH, corpus_fingerprint, iter_citations, load_sections, save_sections
+from src.interface import SearchEngine
+
+
+DEFAULT_STATUTE_INDEX_PATH = "data/statutes.idx"
+STATUTE_MAGIC = b"FPPCSTAT"
+STATUTE_VERSION = 2
+STATUTE_MODES = ("boost", "filter")
+DEFAULT_WEIGHT = 1.0
+DEFAULT_DEPTH = 100
+
+# The Political Reform Act is Government Code sections 81000-91014; bare
+# numbers in a query only count as sections inside this range
+PRA_SECTIONS = range(81000, 92000)
+# FPPC regulations (Cal. Code Regs., tit. 2, §§ 18110-18998); a query
+# number in this range is a regulation even in a list after "Sections"
+REGULATION_SECTIONS = range(18000, 19000)
+
+_SUBSECTION = r"\(\s*[0-9a-z]{1,4}\s*\)"
+_SECTION_RE = re.compile(rf"(\d{{3,5}}(?:\.\d+)?)((?:\s*{_SUBSECTION})*)", re.IGNORECASE)
+_SUBSECTION_RE = re.compile(r"\(\s*([0-9a-z]{1,4})\s*\)", re.IGNORECASE)
+_QUERY_TOKEN_RE = re.compile(
+    rf"(?P<cue>§§?|\bsections?\b|\bsecs?\b\.?|\bgov(?:ernment|\.|t\.?)?\s*code\b)"
+    rf"|(?P<regulation>\bregulations?\b|\bregs?\b\.?|\bcal\.?\s*code\s*regs?\b\.?)"
+    rf"|(?P<section>\b\d{{3,5}}(?:\.\d+)?(?:\s*{_SUBSECTION})*)"
+    rf"|(?P<word>[a-z]+)",
+    re.IGNORECASE,
+)
+# Words that continue a list of sections after a cue ("Sections 87100 and 87103")
+_LIST_WORDS = {"and", "or", "through", "to", "et", "seq"}
+
+
+def _canonical(number: str, subsections: str) -> str:
+    return number + "".join(f"({s.lower()})" for s in _SUBSECTION_RE.findall(subsections))
+
+
+def parse_sections(text) -> list[str]:
+    """Every section number in a citations.government_code entry, normalized.
+
+    Any 3-5 digit number counts: the field only holds statute citations.
+    """
+    return [_canonical(number, subs) for number, subs in _SECTION_RE.findall(str(text))]
+
+
+def normalize_section(text) -> str | None:
+    """Canonical key for one section citation ('§ 87103 (A)' -> '87103(a)'), or None if there is none."""
+    sections = parse_sections(text)
+    return sections[0] if sections else None
+
+
+def section_keys(query: str) -> list[str]:
+    """Normalized Government Code sections named in free-text query, in order, without repeats.
+
+    A number counts when it follows a cue ("Section", "§", "Gov. Code"),
+    continues a list after one, or is a bare Political Reform Act section
+    (81000-91999). Numbers after "Regulation", and 18000-series numbers
+    anywhere, are FPPC regulations, not Government Code sections, and are
+    skipped.
+    """
+    keys = []
+    mode = None
+    for match in _QUERY_TOKEN_RE.finditer(query):
+        kind = match.lastgroup
+        if kind == "cue":
+            mode = "cue"
+        elif kind == "regulation":
+            mode = "regulation"
+        elif kind == "word":
+            if match.group().lower() not in _LIST_WORDS:
+                mode = None
+        elif mode != "regulation":
+            number, subs = _SECTION_RE.match(match.group()).groups()
+            if int(float(number)) in REGULATION_SECTIONS:
+                continue
+            if mode == "cue" or int(float(number)) in PRA_SECTIONS:
+                key = _canonical(number, subs)
+                if key not in keys:
+                    keys.append(key)
+    return keys
+
+
+def index_keys(section: str) -> list[str]:
+    """Every key a normalized section is posted under: itself, its parents, and its digit prefixes."""
+    keys = [section]
+    while section.endswith(")"):
+        section = section[:section.rindex("(")]
+        keys.append(section)
+    digits = section.split(".")[0]
+    keys.extend(f"{digits[:n]}*" for n in range(len(digits), 0, -1))
+    return list(dict.fromkeys(keys))
+
+
+def lookup_key(pattern: str) -> str | None:
+    """Index key for a lookup pattern: a section citation, or a prefix ('871xx', '871*')."""
+    pattern = pattern.strip()
+    prefix = re.fullmatch(r"(?:§\s*)?(\d+)(?:[xX]+|\*)", pattern)
+    if prefix:
+        return prefix.group(1) + "*"
+    return normalize_section(pattern)
+
+
+class StatuteIndex:
+    """Postings of opinions by normalized statute section and section prefix.
+
+    Saved indexes also record the corpus fingerprint (see
+    corpus.corpus_fingerprint) they were built from.
+    """
+
+    def __init__(self, doc_ids: list[str], keys: list[str], offsets, postings, corpus: dict | None = None):
+        self.doc_ids = doc_ids
+        self.keys = keys
+        self.key_index = {key: i for i, key in enumerate(keys)}
+        self.doc_index = {opinion_id: i for i, opinion_id in enumerate(doc_ids)}
+        self.offsets = offsets
+        self.postings = postings
+        self.corpus = corpus
+        self.num_docs = len(doc_ids)
+        self._mm = None
+
+    @classmethod
+    def build(cls, citations) -> "StatuteIndex":
+        """Build from an iterable of (opinion_id, government_code) pairs."""
+        doc_ids = []
+        lists = {}
+        for doc, (opinion_id, sections) in enumerate(citations):
+            doc_ids.append(opinion_id)
+            keys = {key for entry in sections for s in parse_sections(entry) for key in index_keys(s)}
+            for key in keys:
+                lists.setdefault(key, array("I")).append(doc)
+        keys = sorted(lists)
+        offsets = array("I", [0])
+        postings = array("I")
+        for key in keys:
+            postings.extend(lists[key])
+            offsets.append(len(postings))
+        return cls(doc_ids, keys, offsets, postings)
+
+    def lookup(self, pattern: str):
+        """Doc positions (ascending) of opinions citing a section or prefix; empty if none."""
+        key = lookup_key(pattern)
+        i = self.key_index.get(key) if key is not None else None
+        if i is None:
+            return ()
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def opinions(self, pattern: str) -> list[str]:
+        """Opinion IDs citing a section or prefix."""
+        return [self.doc_ids[doc] for doc in self.lookup(pattern)]
+
+    # -- persistence --------------------------------------------------------
+
+    def save(self, path: str):
+        """Write the index to path (replaced atomically)."""
+        save_sections(
+            path, STATUTE_MAGIC, STATUTE_VERSION,
+            {"offsets": self.offsets, "postings": self.postings},
+            {"doc_ids": self.doc_ids, "keys": self.keys, "corpus": self.corpus},
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "StatuteIndex":
+        """Memory-map an index written by save().
+
+        Raises:
+            ValueError: If the file is not a statute index of the current version.
+        """
+        mm, arrays, meta = load_sections(path, STATUTE_MAGIC, STATUTE_VERSION, "statute index")
+        index = cls(meta["doc_ids"], meta["keys"], corpus=meta.get("corpus"), **arrays)
+        index._mm = mm
+        return index
+
+
+def load_or_build_statute_index(
+    index_path: str = DEFAULT_STATUTE_INDEX_PATH,
+    data_dir: str = "data/extracted",
+    store_path: str = DEFAULT_STORE_PATH,
+) -> StatuteIndex:
+    """Memory-map index_path, building and saving it from the corpus first if needed.
+
+    A saved index is rebuilt when the corpus fingerprint stored in it no
+    longer matches the corpus.
+    """
+    corpus = corpus_fingerprint(data_dir, store_path)
+    if os.path.isfile(index_path):
+        try:
+            index = StatuteIndex.load(index_path)
+        except ValueError:
+            print(f"Warning: '{index_path}' is stale or not a statute index — rebuilding")
+        else:
+            # Without a corpus to compare against (or rebuild from), keep the index
+            if corpus is None or index.corpus == corpus:
+                return index
+            print(f"Warning: '{index_path}' was built from a different corpus — rebuilding")
+    index = StatuteIndex.build(
+        (opinion_id, sections) for opinion_id, _, sections in iter_citations(data_dir, store_path)
+    )
+    if not index.num_docs:
+        raise RuntimeError(f"No opinions found to build a statute index from in '{data_dir}'")
+    index.corpus = corpus
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    index.save(index_path)
+    return index
+
+
+def statute_rerank(
+    index: StatuteIndex,
+    query: str,
+    ranking: list[str],
+    mode: str = STATUTE_MODES[0],
+    weight: float = DEFAULT_WEIGHT,
+    rrf_k: float = 60.0,
+) -> list[str]:
+    """Boost or filter a ranking by the Government Code sections the query names.
+
+    Each candidate scores 1 / (rrf_k + rank) plus, in boost mode, weight /
+    (rrf_k + 1) times the fraction of the query's sections it cites, so
+    with weight 1.0 a candidate citing every section outranks every
+    candidate citing none. In filter mode only candidates citing at least
+    one section are kept, in their original order. Sections no opinion
+    cites are ignored; a query left with none returns the ranking as is.
+    """
+    postings = [p for p in (index.lookup(key) for key in section_keys(query)) if len(p)]
+    if not postings or not ranking:
+        return list(ranking)
+    matched = {}
+    for oid in ranking:
+        doc = index.doc_index.get(oid)
+        hits = 0
+        if doc is not None:
+            for posting in postings:
+                i = bisect.bisect_left(posting, doc)
+                hits += i < len(posting) and posting[i] == doc
+        matched[oid] = hits
+    if mode == "filter":
+        return [oid for oid in ranking if matched[oid]]
+    scale = weight / (rrf_k + 1.0) / len(postings)
+    scores = {oid: 1.0 / (rrf_k + rank) + scale * matched[oid] for rank, oid in enumerate(ranking, start=1)}
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class StatuteEngine(SearchEngine):
+    """Wraps an engine with Government Code section boosting or filtering (see statute_rerank).
+
+    The wrapped engine is a module path (as for --search-module) or an
+    instance; it is asked for `depth` candidates per query. The index is
+    built on first use and saved to index_path. stage_timings() reports the
+    wrapped engine's search as "base" and the section step as "statutes".
+    """
+
+    def __init__(
+        self,
+        engine="src.baselines.bm25_baseline",
+        index_path: str = DEFAULT_STATUTE_INDEX_PATH,
+        data_dir: str = "data/extracted",
+        store_path: str = DEFAULT_STORE_PATH,
+        mode: str = STATUTE_MODES[0],
+        weight: float = DEFAULT_WEIGHT,
+        depth: int = DEFAULT_DEPTH,
+    ):
+        from src.scorer import load_engine
+
+        base = load_engine(engine) if isinstance(engine, str) else engine
+        index = load_or_build_statute_index(index_path, data_dir, store_path)
+        self._configure(base, index, mode, weight, depth)
+
+    def _configure(self, base, index, mode, weight, depth):
+        if mode not in STATUTE_MODES:
+            raise ValueError(f"Unknown mode '{mode}' (expected one of {STATUTE_MODES})")
+        if depth < 1:
+            raise ValueError("depth must be >= 1")
+        self.engine = base
+        self.index = index
+        self.mode = mode
+        self.weight = weight
+        self.depth = depth
+        self._timings = {"base": [], "statutes": []}
+
+    def with_params(self, **params) -> "StatuteEngine":
+        """Share the wrapped engine and index with other mode/weight/depth settings.
+
+        Parameters that select the engine or index fall back to full construction.
+        """
+        if params.keys() & {"engine", "index_path", "data_dir", "store_path"}:
+            return super().with_params(**params)
+        unknown = params.keys() - {"mode", "weight", "depth"}
+        if unknown:
+            raise TypeError(f"StatuteEngine got unexpected parameters {sorted(unknown)}")
+        engine = type(self).__new__(type(self))
+        engine._configure(
+            self.engine, self.index,
+            params.get("mode", STATUTE_MODES[0]),
+            params.get("weight", DEFAULT_WEIGHT),
+            params.get("depth", DEFAULT_DEPTH),
+        )
+        return engine
+
+    def search(self, query: str, top_k: int = 20) -> list[str]:
+        start = time.perf_counter()
+        ranking = self.engine.search(query, top_k=max(self.depth, top_k))
+        middle = time.perf_counter()
+        reranked = statute_rerank(self.index, query, ranking, self.mode, self.weight)
+        end = time.perf_counter()
+        self._timings["base"].append((middle - start) * 1000.0)
+        self._timings["statutes"].append((end - middle) * 1000.0)
+        return reranked[:top_k]
+
+    def stage_timings(self) -> dict[str, list[float]]:
+        return {stage: list(values) for stage, values in self._timings.items() if values}
+
+    def name(self) -> str:
+        return f"Statutes({self.engine.name()}, {self.mode})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the Government Code section index")
+    parser.add_argument("--data-dir", default="data/extracted", help="Path to extracted opinions")
+    parser.add_argument("--store-path", default=DEFAULT_STORE_PATH, help="Corpus store (preferred when present)")
+    parser.add_argument(
+        "--output", default=DEFAULT_STATUTE_INDEX_PATH, help=f"Index file (default: {DEFAULT_STATUTE_INDEX_PATH})",
+    )
+    parser.add_argument(
+        "--lookup", action="append", default=[],
+        help="Print opinions citing a section or prefix (e.g. 87103(a), 871xx); repeatable. "
+             "Builds the index only if it is missing or stale",
+    )
+    args = parser.parse_args()
+
+    if args.lookup:
+        index = load_or_build_statute_index(args.output, args.data_dir, args.store_path)
+        for pattern in args.lookup:
+            start = time.perf_counter()
+            docs = index.lookup(pattern)
+            elapsed_us = (time.perf_counter() - start) * 1e6
+            shown = ", ".join(index.doc_ids[d] for d in docs[:10])
+            more = f", ... ({len(docs) - 10} more)" if len(docs) > 10 else ""
+            print(f"{pattern} -> {lookup_key(pattern)}: {len(docs)} opinions in {elapsed_us:.1f}us  {shown}{more}")
+        return
+
+    start = time.perf_counter()
+    index = StatuteIndex.build(
+        (opinion_id, sections) for opinion_id, _, sections in iter_citations(args.data_dir, args.store_path)
+    )
+    if not index.num_docs:
+        print("No opinions found.")
+        sys.exit(1)
+    index.corpus = corpus_fingerprint(args.data_dir, args.store_path)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    index.save(args.output)
+    sections = sum(1 for key in index.keys if not key.endswith("*"))
+    print(
+        f"Wrote {args.output}: {index.num_docs} opinions, {sections} sections and subsections, "
+        f"{len(index.keys) - sections} prefixes, {len(index.postings)} postings "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
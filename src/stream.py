@@ -0,0 +1,243 @@
+"""
+Streaming JSONL output for long evaluation runs.
+
+With `scorer.py --stream results.jsonl`, every per-query result is appended
+to a JSONL file as soon as it is computed, instead of being held in memory
+until write_results runs at the end. Writes are flushed and fsync'd in
+batches, so a crash loses at most one batch. The first line is a header
+recording what produced the records (engine module, version and params,
+metric list, dataset hash); `--resume` refuses a stream whose header does
+not match the current run, then skips the query IDs already in the file
+and appends the rest. The scorecard aggregates are then computed by
+reading the file back as a stream. The only memory that grows
+with query count is the latency arrays used for exact percentiles (three
+floats per query). ResultAggregator does the same aggregation on the fly
+for lazily loaded (.jsonl) datasets run without --stream.
+"""
+
+import hashlib
+import json
+import os
+from array import array
+
+
+# Records written between fsyncs (and on close)
+DEFAULT_FSYNC_EVERY = 100
+# The header line is {HEADER_KEY: {...}}; result records never carry this key
+HEADER_KEY = "stream_header"
+
+
+class JsonlResultWriter:
+    """Append per-query result dicts to a JSONL file, one JSON object per line.
+
+    A header dict, if given, becomes the first line of a new (or empty) file;
+    appending to a file that already has records leaves its header alone.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        append: bool = False,
+        fsync_every: int = DEFAULT_FSYNC_EVERY,
+        header: dict | None = None,
+    ):
+        if fsync_every < 1:
+            raise ValueError(f"fsync_every must be >= 1, got {fsync_every}")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.fsync_every = fsync_every
+        self.written = 0
+        fresh = not append or not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+        self._pending = 0
+        if header is not None and fresh:
+            self._file.write(json.dumps({HEADER_KEY: header}, ensure_ascii=False) + "\n")
+            self.flush()
+
+    def write(self, record: dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.written += 1
+        self._pending += 1
+        if self._pending >= self.fsync_every:
+            self.flush()
+
+    def flush(self):
+        """Flush buffered records and fsync them to disk."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def repair_stream(path: str) -> int:
+    """Drop a partial last line left by a crash mid-write, so appends start on a fresh line.
+
+    Returns the number of bytes removed (0 if the file is missing or intact).
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        # Scan backwards in blocks for the last newline
+        end = size
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            block = f.read(end - start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                keep = start + newline + 1
+                break
+            end = start
+        else:
+            keep = 0
+        if keep < size:
+            f.truncate(keep)
+        return size - keep
+
+
+def iter_stream(path: str):
+    """Yield the per-query result dicts stored in a JSONL stream, in file order (without the header).
+
+    Raises:
+        ValueError: On a line that is not valid JSON (after repair_stream,
+            only a file edited by hand should have one).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: not a JSON record ({e})") from e
+            if HEADER_KEY not in record:
+                yield record
+
+
+def read_stream_header(path: str) -> dict | None:
+    """Return the header a JsonlResultWriter wrote to path, or None if it has none."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    return None
+                return record.get(HEADER_KEY) if isinstance(record, dict) else None
+    return None
+
+
+def header_mismatches(found: dict | None, expected: dict) -> list[str]:
+    """Names of the header fields that differ between a stream and the current run.
+
+    A stream without a header (written by an older scorer) mismatches on
+    every field, since nothing says what produced its records.
+    """
+    # Compare as JSON so tuples and lists (or int and float keys) match as on disk
+    expected = json.loads(json.dumps(expected))
+    if found is None:
+        return list(expected)
+    return [key for key in expected if found.get(key) != expected[key]]
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file's bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 16):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def completed_query_ids(path: str) -> set[str]:
+    """Return the query IDs already recorded in a stream (empty if the file does not exist)."""
+    if not os.path.exists(path):
+        return set()
+    return {record["query_id"] for record in iter_stream(path)}
+
+
+class _MetricSums:
+    """Running per-metric sums; means match scorer.aggregate_metrics exactly.
+
+    Each metric is averaged over the records that have it.
+    """
+
+    def __init__(self):
+        self.sums = {}
+        self.counts = {}
+        self.count = 0
+
+    def add(self, metrics: dict):
+        for key, value in metrics.items():
+            self.sums[key] = self.sums.get(key, 0) + value
+            self.counts[key] = self.counts.get(key, 0) + 1
+        self.count += 1
+
+    def means(self) -> dict:
+        return {key: total / self.counts[key] for key, total in self.sums.items()}
+
+
+class ResultAggregator:
+    """Scorecard aggregates over per-query results fed in one at a time.
+
+    Nothing per query is kept except its latency, as one 8-byte float in
+    each of the overall, query type and query topic arrays.
+    """
+
+    def __init__(self):
+        self._overall = _MetricSums()
+        self._by_type = {}
+        self._by_topic = {}
+        self._latencies = {"overall": array("d"), "by_type": {}, "by_topic": {}}
+
+    def add(self, record: dict):
+        metrics = record["metrics"]
+        self._overall.add(metrics)
+        self._by_type.setdefault(record["query_type"], _MetricSums()).add(metrics)
+        self._by_topic.setdefault(record["query_topic"], _MetricSums()).add(metrics)
+        by_type = self._latencies["by_type"].setdefault(record["query_type"], array("d"))
+        by_topic = self._latencies["by_topic"].setdefault(record["query_topic"], array("d"))
+        latency_ms = record.get("latency_ms")
+        if latency_ms is not None:
+            self._latencies["overall"].append(latency_ms)
+            by_type.append(latency_ms)
+            by_topic.append(latency_ms)
+
+    def summary(self) -> dict:
+        """Return {"num_queries", "overall", "by_type", "by_topic", "latencies"}.
+
+        The metric blocks match scorer.aggregate_metrics, and latencies is
+        grouped as scorer.latency_groups returns it, for the `latencies`
+        argument of scorer.build_latency_report.
+        """
+        return {
+            "num_queries": self._overall.count,
+            "overall": self._overall.means() if self._overall.count else {},
+            "by_type": {k: v.means() for k, v in self._by_type.items()},
+            "by_topic": {k: v.means() for k, v in self._by_topic.items()},
+            "latencies": self._latencies,
+        }
+
+
+def aggregate_stream(path: str) -> dict:
+    """Aggregate a JSONL stream in one pass without loading its records (see ResultAggregator.summary)."""
+    aggregator = ResultAggregator()
+    for record in iter_stream(path):
+        aggregator.add(record)
+    return aggregator.summary()
@@ -0,0 +1,252 @@
+"""
+Parameter sweeps: score one engine under a grid of constructor kwargs.
+
+The first configuration is built by load_engine (restored from
+--snapshot-dir when possible) and every other configuration is derived from
+it with SearchEngine.with_params, so engines that override with_params load
+their corpus and index once per process rather than once per configuration.
+All (configuration, query) pairs then go through one worker pool, so the
+configurations are scored in parallel, and a comparison table is printed.
+
+Usage:
+    python -m src.sweep --search-module src.baselines.bm25_baseline --dataset eval/dataset.json \
+        --param k1=0.9,1.2,1.5 --param b=0.4,0.75 [--metrics ndcg@10,mrr,recall@20] \
+        [--workers 8] [--executor process] [--output-dir results/sweep]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from functools import partial
+from itertools import product
+
+from src.scorer import (
+    DEFAULT_METRICS,
+    EXECUTOR_KINDS,
+    aggregate_latency,
+    aggregate_metrics,
+    evaluate_query,
+    format_params,
+    group_by,
+    is_async_engine,
+    load_dataset,
+    load_engine,
+    make_pool,
+    ordered_map,
+    parse_metric_spec,
+    parse_param,
+    short_label,
+    worker_state,
+    write_results,
+)
+
+
+def expand_grid(params: list[tuple[str, list]]) -> list[dict]:
+    """Cartesian product of (name, values) pairs, first parameter varying slowest.
+
+    Raises:
+        ValueError: If a parameter name is given twice.
+    """
+    names = [name for name, _ in params]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Parameters given more than once: {', '.join(duplicates)}")
+    return [dict(zip(names, values)) for values in product(*(values for _, values in params))]
+
+
+def build_engines(module_path: str, configs: list[dict], **load_options) -> list:
+    """Build one engine per configuration, deriving all but the first with with_params.
+
+    Raises:
+        TypeError: If the module's engine is an AsyncSearchEngine (which has
+            no with_params), or rejects a parameter.
+    """
+    base = load_engine(module_path, params=configs[0], **load_options)
+    if is_async_engine(base):
+        raise TypeError("Sweeps need a SearchEngine; AsyncSearchEngine has no with_params")
+    return [base] + [base.with_params(**config) for config in configs[1:]]
+
+
+# ---------------------------------------------------------------------------
+# Parallel execution
+# ---------------------------------------------------------------------------
+
+def _evaluate_task(task: tuple[int, dict], engines=None, metrics=DEFAULT_METRICS) -> tuple[int, dict]:
+    config_index, query = task
+    engines = engines if engines is not None else worker_state()
+    return config_index, evaluate_query(query, engines[config_index], metrics=metrics)
+
+
+def iter_sweep_evaluations(
+    queries,
+    engines: list,
+    workers: int = 1,
+    executor: str = "thread",
+    metrics=DEFAULT_METRICS,
+    factory=None,
+):
+    """Evaluate every query under every engine, yielding (config index, result).
+
+    Tasks are issued query by query, each query for all configurations in
+    turn, and results come back in that order.
+
+    Args:
+        queries: Iterable of query dicts.
+        engines: One engine per configuration (see build_engines).
+        workers: Pool size; 1 evaluates serially in-process.
+        executor: "thread" or "process". Forked process workers inherit the
+            engines (and any index they share) copy-on-write.
+        metrics: Metric names to compute.
+        factory: Picklable callable rebuilding the engines in process
+            workers on platforms without fork (see scorer.make_pool).
+    """
+    if executor not in EXECUTOR_KINDS:
+        raise ValueError(f"Unknown executor '{executor}' (expected one of {EXECUTOR_KINDS})")
+    tasks = ((i, query) for query in queries for i in range(len(engines)))
+
+    if workers <= 1:
+        for task in tasks:
+            yield _evaluate_task(task, engines, metrics)
+        return
+
+    pool = make_pool(workers, executor, engines, factory)
+    if executor == "thread":
+        fn = partial(_evaluate_task, engines=engines, metrics=metrics)
+    else:
+        fn = partial(_evaluate_task, metrics=metrics)
+
+    with pool:
+        yield from ordered_map(pool, fn, tasks, window=workers * 4)
+
+
+# ---------------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------------
+
+def print_sweep_table(configs: list[dict], overall: list[dict], latency: list[dict]):
+    """Print one row per configuration; '*' marks the best value of each metric."""
+    metric_keys = list(overall[0]) if overall and overall[0] else list(DEFAULT_METRICS)
+    labels = [format_params(config) for config in configs]
+    width = max([len(label) for label in labels] + [len("Configuration")])
+    best = {key: max(o.get(key, 0.0) for o in overall) for key in metric_keys}
+
+    header = f"{'Configuration':<{width}s}"
+    for key in metric_keys:
+        header += f"  {short_label(key):>8s}"
+    header += f"  {'p50 ms':>8s}"
+    print(header)
+    print("-" * len(header))
+    for label, metrics, stats in zip(labels, overall, latency):
+        row = f"{label:<{width}s}"
+        for key in metric_keys:
+            marker = "*" if metrics.get(key, 0.0) == best[key] else " "
+            row += f"  {metrics.get(key, 0.0):>7.3f}{marker}"
+        row += f"  {stats.get('p50_ms', 0.0):>8.2f}"
+        print(row)
+    print()
+    print("  * best value of the metric across configurations")
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Score one engine under a grid of constructor parameters")
+    parser.add_argument("--search-module", required=True, help="Dotted module path to a SearchEngine implementation")
+    parser.add_argument("--dataset", required=True, help="Path to the eval dataset JSON file")
+    parser.add_argument(
+        "--param",
+        action="append",
+        required=True,
+        metavar="NAME=V1[,V2...]",
+        help="Constructor parameter and the values to try, e.g. --param k1=0.9,1.2 (repeatable)",
+    )
+    parser.add_argument(
+        "--metrics",
+        default=",".join(DEFAULT_METRICS),
+        help="Comma-separated metrics to compute (default: the scorecard metrics)",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="Number of concurrent evaluations (default: 1)")
+    parser.add_argument("--executor", choices=EXECUTOR_KINDS, default="thread", help="Pool type (default: thread)")
+    parser.add_argument("--snapshot-dir", default=None, help="Restore the first configuration's engine from here")
+    parser.add_argument("--engine-version", default=None, help="Engine version for snapshots")
+    parser.add_argument(
+        "--output-dir",
+        default=None,
+        help="Write each configuration's results (config-NNN.json) and a sweep.json summary here",
+    )
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers must be >= 1")
+    try:
+        metrics = parse_metric_spec(args.metrics)
+        configs = expand_grid([parse_param(spec) for spec in args.param])
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"Loading dataset from {args.dataset}...")
+    queries = load_dataset(args.dataset)["queries"]
+    if not queries:
+        print("No queries with relevance judgments found. Nothing to evaluate.")
+        sys.exit(0)
+
+    load_options = {"snapshot_dir": args.snapshot_dir, "engine_version": args.engine_version}
+    print(f"Building {len(configs)} configurations of {args.search_module}...")
+    load_start = time.perf_counter()
+    engines = build_engines(args.search_module, configs, **load_options)
+    load_seconds = time.perf_counter() - load_start
+    print(f"Engines built in {load_seconds:.3f}s")
+
+    per_config = [[] for _ in configs]
+    total = len(queries) * len(configs)
+    print(f"Evaluating {len(queries)} queries x {len(configs)} configurations...")
+    eval_start = time.perf_counter()
+    results = iter_sweep_evaluations(
+        queries, engines, workers=args.workers, executor=args.executor, metrics=metrics,
+        factory=partial(build_engines, args.search_module, configs, **load_options),
+    )
+    for done, (config_index, result) in enumerate(results, start=1):
+        per_config[config_index].append(result)
+        if done % len(configs) == 0:
+            print(f"  [{done}/{total}] {result['query_id']}")
+    wall_seconds = time.perf_counter() - eval_start
+    print(f"Evaluated in {wall_seconds:.3f}s ({total / wall_seconds if wall_seconds > 0 else 0.0:.1f} evaluations/s)")
+
+    overall = [aggregate_metrics(per_query) for per_query in per_config]
+    latency = [aggregate_latency(per_query) for per_query in per_config]
+    print()
+    print(f"  Sweep — {engines[0].name()} over {len(queries)} queries")
+    print()
+    print_sweep_table(configs, overall, latency)
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        summary = []
+        for i, (config, engine, per_query) in enumerate(zip(configs, engines, per_config)):
+            path = os.path.join(args.output_dir, f"config-{i:03d}.json")
+            write_results(
+                path,
+                f"{engine.name()} ({format_params(config)})",
+                overall[i],
+                {k: aggregate_metrics(v) for k, v in group_by(per_query, "query_type").items()},
+                {k: aggregate_metrics(v) for k, v in group_by(per_query, "query_topic").items()},
+                per_query,
+            )
+            summary.append({"params": config, "results": path, "overall": overall[i], "latency": latency[i]})
+        summary_path = os.path.join(args.output_dir, "sweep.json")
+        with open(summary_path, "w") as f:
+            json.dump({"search_module": args.search_module, "configs": summary}, f, indent=2)
+        print(f"Sweep summary written to {summary_path}")
+
+    # Release what the engines hold open, e.g. PipelineEngine's worker threads
+    for engine in engines:
+        if callable(getattr(engine, "close", None)):
+            engine.close()
+
+
+if __name__ == "__main__":
+    main()
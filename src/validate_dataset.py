@@ -6,13 +6,20 @@ uniqueness, and completeness. Exits 0 on pass, 1 on failure.
 
 Usage:
     python src/validate_dataset.py --dataset eval/dataset.json [--data-dir data/extracted]
+        [--manifest data/manifest.json]
 """
 
 import argparse
+import hashlib
 import json
 import os
 import sys
 
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.corpus import iter_opinion_files
+
 
 VALID_QUERY_TYPES = {"keyword", "natural_language", "fact_pattern"}
 VALID_SCORES = {0, 1, 2}
@@ -26,6 +33,7 @@ EXPECTED_TOPICS = {
 MIN_JUDGMENTS_PER_QUERY = 10
 MIN_QUERIES = 60
 MAX_QUERIES = 80
+MANIFEST_VERSION = 1
 
 
 # ---------------------------------------------------------------------------
@@ -33,16 +41,94 @@ MAX_QUERIES = 80
 # ---------------------------------------------------------------------------
 
 def collect_opinion_ids(data_dir: str) -> set[str]:
-    """Walk data_dir/{year}/*.json and return the set of opinion IDs (filename minus .json)."""
-    ids = set()
-    for year_dir in os.listdir(data_dir):
-        year_path = os.path.join(data_dir, year_dir)
-        if not os.path.isdir(year_path):
-            continue
-        for fname in os.listdir(year_path):
-            if fname.endswith(".json"):
-                ids.add(fname[:-5])
-    return ids
+    """Return the set of opinion IDs in data_dir/{year}/*.json (filename minus .json)."""
+    return {opinion_id for opinion_id, _, _ in iter_opinion_files(data_dir)}
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 16):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_manifest(data_dir: str, previous: dict | None = None) -> dict:
+    """Record mtime, size, and SHA-256 for every data_dir/{year}/*.json file.
+
+    If a previous manifest is given, files whose relative path, mtime, and
+    size are unchanged reuse the recorded hash instead of being re-read, so
+    refreshing the manifest after a small corpus update touches only the
+    files that changed.
+
+    Returns:
+        {"version": ..., "opinions": {opinion_id: {"path", "mtime_ns", "size", "sha256"}}}
+        with paths relative to data_dir.
+    """
+    prior = (previous or {}).get("opinions", {})
+    opinions = {}
+    for opinion_id, _, path in iter_opinion_files(data_dir):
+        rel_path = os.path.relpath(path, data_dir)
+        stat = os.stat(path)
+        old = prior.get(opinion_id)
+        if (
+            old is not None
+            and old["path"] == rel_path
+            and old["mtime_ns"] == stat.st_mtime_ns
+            and old["size"] == stat.st_size
+        ):
+            sha256 = old["sha256"]
+        else:
+            sha256 = _hash_file(path)
+        opinions[opinion_id] = {
+            "path": rel_path,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": sha256,
+        }
+    return {"version": MANIFEST_VERSION, "opinions": opinions}
+
+
+def diff_manifests(old: dict | None, new: dict) -> dict[str, list[str]]:
+    """Compare two manifests. Returns sorted 'added', 'removed', and 'modified' opinion IDs.
+
+    An opinion counts as modified if its content hash changed or it moved to a
+    different year directory; a touched file with identical content does not.
+    With no previous manifest, every opinion is reported as added.
+    """
+    old_opinions = (old or {}).get("opinions", {})
+    new_opinions = new.get("opinions", {})
+    added = sorted(oid for oid in new_opinions if oid not in old_opinions)
+    removed = sorted(oid for oid in old_opinions if oid not in new_opinions)
+    modified = sorted(
+        oid for oid, entry in new_opinions.items()
+        if oid in old_opinions
+        and (
+            entry["sha256"] != old_opinions[oid]["sha256"]
+            or entry["path"] != old_opinions[oid]["path"]
+        )
+    )
+    return {"added": added, "removed": removed, "modified": modified}
+
+
+def load_manifest(path: str) -> dict | None:
+    """Load a manifest written by save_manifest, or None if it does not exist
+    or was written by an incompatible version."""
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(manifest: dict, path: str):
+    """Write a manifest atomically (write to a temp file, then rename)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
 
 
 # ---------------------------------------------------------------------------
@@ -117,14 +203,21 @@ def validate_schema(dataset: dict) -> list[str]:
     return errors
 
 
-def validate_referential_integrity(dataset: dict, data_dir: str) -> list[str]:
-    """Check that every opinion_id in judgments and example_opinion_ids exists on disk."""
-    errors = []
+def validate_referential_integrity(
+    dataset: dict,
+    data_dir: str,
+    corpus_ids: set[str] | None = None,
+) -> list[str]:
+    """Check that every opinion_id in judgments and example_opinion_ids exists on disk.
 
-    if not os.path.isdir(data_dir):
-        return errors  # caller handles the warning
+    Pass corpus_ids (e.g. the keys of a fresh manifest) to skip re-walking data_dir.
+    """
+    errors = []
 
-    corpus_ids = collect_opinion_ids(data_dir)
+    if corpus_ids is None:
+        if not os.path.isdir(data_dir):
+            return errors  # caller handles the warning
+        corpus_ids = collect_opinion_ids(data_dir)
 
     # Check judgment opinion IDs
     for query in dataset.get("queries", []):
@@ -272,7 +365,11 @@ def validate_completeness(dataset: dict) -> list[str]:
     return errors
 
 
-def validate_all(dataset: dict, data_dir: str | None = None) -> tuple[list[str], list[str]]:
+def validate_all(
+    dataset: dict,
+    data_dir: str | None = None,
+    corpus_ids: set[str] | None = None,
+) -> tuple[list[str], list[str]]:
     """Run all validations. Returns (errors, warnings)."""
     errors = []
     warnings = []
@@ -288,7 +385,7 @@ def validate_all(dataset: dict, data_dir: str | None = None) -> tuple[list[str],
 
     if data_dir:
         if os.path.isdir(data_dir):
-            errors.extend(validate_referential_integrity(dataset, data_dir))
+            errors.extend(validate_referential_integrity(dataset, data_dir, corpus_ids))
         else:
             warnings.append(f"Data directory not found: '{data_dir}' — skipping referential integrity check")
 
@@ -313,12 +410,33 @@ def main():
         default=None,
         help="Path to extracted opinion data (e.g., data/extracted)",
     )
+    parser.add_argument(
+        "--manifest",
+        default=None,
+        help="Path to a corpus manifest to refresh and diff against (requires --data-dir)",
+    )
     args = parser.parse_args()
 
+    if args.manifest and not args.data_dir:
+        parser.error("--manifest requires --data-dir")
+
     with open(args.dataset) as f:
         dataset = json.load(f)
 
-    errors, warnings = validate_all(dataset, args.data_dir)
+    corpus_ids = None
+    if args.manifest and os.path.isdir(args.data_dir):
+        previous = load_manifest(args.manifest)
+        manifest = build_manifest(args.data_dir, previous)
+        changes = diff_manifests(previous, manifest)
+        save_manifest(manifest, args.manifest)
+        corpus_ids = set(manifest["opinions"])
+        print(
+            f"Manifest: {len(corpus_ids)} opinions — "
+            f"{len(changes['added'])} added, {len(changes['removed'])} removed, "
+            f"{len(changes['modified'])} modified"
+        )
+
+    errors, warnings = validate_all(dataset, args.data_dir, corpus_ids)
 
     if warnings:
         print(f"\n{len(warnings)} warning(s):")
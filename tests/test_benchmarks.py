@@ -0,0 +1,150 @@
+"""Unit tests for the synthetic corpus and the performance regression suite."""
+
+import json
+import os
+import random
+import re
+import tempfile
+import unittest
+
+from src.baselines.bm25_baseline import BM25Baseline
+from src.benchmarks.regression import (
+    NOISE_FLOORS,
+    compare_to_baseline,
+    measure_engine,
+    median_measurements,
+    run_isolated,
+)
+from src.benchmarks.synthetic import ID_FORMATS, REAL_CORPUS_SIZE, generate, iter_opinion_ids, write_synthetic_corpus, year_for_id
+from src.corpus import iter_opinion_files
+from src.scorer import iter_dataset, load_dataset
+from tests.test_scorer import make_queries
+
+
+DATASET = {
+    "taxonomy": {
+        "gifts_honoraria": {
+            "description": "Gift limits and honoraria accepted by public officials",
+            "issues": [{
+                "id": "travel",
+                "description": "Travel payments and gift reporting",
+                "key_statutes": ["89503", "89506"],
+                "example_opinion_ids": ["A-24-003"],
+            }],
+        },
+    },
+    "queries": [
+        {"id": "q1", "text": "gift limits travel", "relevance_judgments": [{"opinion_id": "A-24-003", "score": 2}]},
+        {"id": "q2", "text": "honoraria", "relevance_judgments": [{"opinion_id": "76ADV-248", "score": 1}]},
+    ],
+}
+
+
+# The ID table in SEARCH_ENGINE_TESTING_GUIDE.md
+ID_PATTERNS = {
+    "five_digit": r"(?:7[5-9]|8[0-3])\d{3}",
+    "letter_number": r"8[2-5][A-Z]\d{3}",
+    "year_dash": r"(?:8[4-9]|9\d|0[0-3])-\d{3}",
+    "advice_letter": r"A-[0-2]\d-\d{3}",
+    "informal": r"I-[0-2]\d-\d{3}",
+    "companion": r"1[4-6]-\d{3}-\d{4}",
+}
+
+
+class TestSyntheticCorpus(unittest.TestCase):
+
+    def test_year_for_id(self):
+        cases = {"76188": "1976", "82A155": "1982", "00-014": "2000", "A-24-003": "2024", "UNK-91-10483": "1991"}
+        for opinion_id, year in cases.items():
+            self.assertEqual(year_for_id(opinion_id), year)
+        with self.assertRaises(ValueError):
+            year_for_id("ADV")
+
+    def test_corpus_shape(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(write_synthetic_corpus(tmp, DATASET, 50, seed=3), 50)
+            files = list(iter_opinion_files(tmp))
+            self.assertEqual(len(files), 50)
+            self.assertIn(("A-24-003", "2024"), [(oid, year) for oid, year, _ in files])
+            engine = BM25Baseline(
+                data_dir=tmp, index_path=os.path.join(tmp, "bm25.idx"), store_path=os.path.join(tmp, "missing"),
+            )
+            self.assertEqual(len(engine.search("gift limits travel")), 20)
+
+    def test_id_formats(self):
+        ids = list(iter_opinion_ids(random.Random(1), 3000, reserved={"76001"}))
+        self.assertEqual(len({opinion_id for opinion_id, _ in ids}), 3000)
+        self.assertNotIn("76001", [opinion_id for opinion_id, _ in ids])
+        self.assertEqual(set(ID_PATTERNS), set(ID_FORMATS))
+        for name, pattern in ID_PATTERNS.items():
+            self.assertTrue(any(re.fullmatch(pattern, oid) for oid, _ in ids), name)
+        for opinion_id, year in ids:
+            self.assertEqual(year_for_id(opinion_id), year)
+
+    def test_ids_keep_documented_formats_at_100x(self):
+        count = REAL_CORPUS_SIZE * 100
+        documented = re.compile("|".join(f"(?:{pattern})" for pattern in ID_PATTERNS.values()))
+        ids = list(iter_opinion_ids(random.Random(2), count))
+        self.assertEqual(len({opinion_id for opinion_id, _ in ids}), count)
+        self.assertEqual([oid for oid, _ in ids if not documented.fullmatch(oid)], [])
+        self.assertEqual([oid for oid, year in ids if year_for_id(oid) != year], [])
+
+    def test_generate_queries_and_qrels(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "a")
+            stats = generate(out, 400, 12, DATASET, seed=5)
+            corpus = {oid for oid, _, _ in iter_opinion_files(stats["data_dir"])}
+            self.assertEqual(len(corpus), 400)
+            queries = load_dataset(stats["dataset"])["queries"]
+            self.assertEqual(len(queries), 12)
+            self.assertEqual(sum(len(q["relevance_judgments"]) for q in queries), stats["judgments"])
+            for query in queries:
+                judged = {j["opinion_id"] for j in query["relevance_judgments"]}
+                self.assertLessEqual(judged, corpus)
+                self.assertGreaterEqual(sum(j["score"] == 2 for j in query["relevance_judgments"]), 3)
+                self.assertEqual((query["topic"], query["issue"]), ("gifts_honoraria", "travel"))
+
+            # Same seed, same dataset; .jsonl streams the same queries
+            again = generate(os.path.join(tmp, "b"), 400, 12, DATASET, seed=5, dataset_format="jsonl")
+            self.assertEqual(list(iter_dataset(again["dataset"])), queries)
+
+
+class TestRegressionSuite(unittest.TestCase):
+
+    def test_compare_to_baseline(self):
+        baseline = {"e": {"p50_ms": 10.0, "mean_ms": 10.0, "peak_rss_mb": 100.0, "cold_start_ms": 1.0}}
+        current = {"e": {"p50_ms": 14.0, "mean_ms": 6.0, "peak_rss_mb": 110.0, "cold_start_ms": 3.0, "p95_ms": 1.0}}
+        rows = {r["metric"]: r for r in compare_to_baseline(current, baseline, {"peak_rss_mb": 0.05})}
+        self.assertEqual(rows["p50_ms"]["status"], "regressed")
+        self.assertAlmostEqual(rows["p50_ms"]["change"], 0.4)
+        self.assertEqual(rows["mean_ms"]["status"], "improved")
+        self.assertEqual(rows["peak_rss_mb"]["status"], "regressed")
+        # Tripled, but by less than the noise floor
+        self.assertEqual(rows["cold_start_ms"]["status"], "ok")
+        self.assertEqual(rows["p95_ms"]["status"], "new")
+
+    def test_measure_engine(self):
+        result = measure_engine("src.benchmarks.regression", {}, make_queries(5), repeat=2)
+        self.assertEqual(result["engine"], "harness")
+        self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+        self.assertGreater(result["overhead_us"], 0.0)
+        merged = median_measurements([result, dict(result, p50_ms=result["p50_ms"] + 2)])
+        self.assertEqual(set(merged) - {"engine"}, set(NOISE_FLOORS))
+        self.assertAlmostEqual(merged["p50_ms"], result["p50_ms"] + 1)
+
+    def test_run_isolated_resolves_a_relative_dataset(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "dataset.json"), "w") as f:
+                json.dump({"queries": make_queries(3)}, f)
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                # The subprocess runs from the project root, not from tmp
+                result = run_isolated("src.benchmarks.regression", {}, "dataset.json", repeat=1)
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(result["engine"], "harness")
+
+
+if __name__ == "__main__":
+    unittest.main()
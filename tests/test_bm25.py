@@ -0,0 +1,233 @@
+"""Unit tests for the BM25 baseline engine and its inverted index."""
+
+import math
+import os
+import random
+import tempfile
+import unittest
+
+from src.baselines.bm25_baseline import BM25Baseline, BM25Index
+from src.baselines.text import tokenize
+from src.baselines.topk import PruningStats
+from tests.test_corpus import write_opinions
+
+
+OPINIONS = {
+    ("1976", "76188"): {"embedding": {"qa_text": "planning commissioner vote zoning property"}},
+    ("1990", "90-162"): {"embedding": {"qa_text": "gift limits lobbyist gift reporting"}},
+    ("2000", "00-014"): {"embedding": {"qa_text": "aviation commissioner consulting airport tenant conflict"}},
+    ("2024", "A-24-003"): {"content": {"full_text": "campaign contribution limits for city council candidates"}},
+    ("2019", "I-19-145"): {"embedding": {"qa_text": "campaign mass mailing disclosure"}},
+}
+
+
+def brute_force_bm25(docs: dict[str, str], query: str, k1: float = 1.2, b: float = 0.75) -> dict[str, float]:
+    """Reference BM25 computed directly from token lists."""
+    tokenized = {oid: tokenize(text) for oid, text in docs.items()}
+    n = len(tokenized)
+    avgdl = sum(len(t) for t in tokenized.values()) / n
+    scores = {}
+    for term in set(tokenize(query)):
+        df = sum(1 for t in tokenized.values() if term in t)
+        if df == 0:
+            continue
+        idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        for oid, tokens in tokenized.items():
+            tf = tokens.count(term)
+            if tf:
+                norm = k1 * (1 - b + b * len(tokens) / avgdl)
+                scores[oid] = scores.get(oid, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+    return scores
+
+
+class TestTokenize(unittest.TestCase):
+
+    def test_lowercases_and_drops_stopwords(self):
+        self.assertEqual(tokenize("The Section 87103(a) of the Act"), ["section", "87103", "act"])
+
+
+class TestBM25Index(unittest.TestCase):
+
+    def setUp(self):
+        self.docs = [("d0", "gift gift limit"), ("d1", "limit"), ("d2", "gift report")]
+        self.index = BM25Index.build(self.docs)
+
+    def test_postings_decode_deltas(self):
+        docs, tfs = self.index.postings(self.index.term_ids["gift"])
+        self.assertEqual(list(docs), [0, 2])
+        self.assertEqual(list(tfs), [2, 1])
+
+    def test_doc_lengths(self):
+        self.assertEqual(list(self.index.doc_lengths), [3, 1, 2])
+        self.assertAlmostEqual(self.index.avg_doc_length, 2.0)
+
+    def test_save_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bm25.idx")
+            self.index.save(path)
+            loaded = BM25Index.load(path)
+            self.assertEqual(loaded.doc_ids, self.index.doc_ids)
+            self.assertEqual(loaded.terms, self.index.terms)
+            for term_id in range(len(loaded.terms)):
+                self.assertEqual(
+                    [list(x) for x in loaded.postings(term_id)],
+                    [list(x) for x in self.index.postings(term_id)],
+                )
+
+    def test_rejects_other_files(self):
+        with tempfile.NamedTemporaryFile(suffix=".idx") as f:
+            f.write(b"\0" * 64)
+            f.flush()
+            with self.assertRaises(ValueError):
+                BM25Index.load(f.name)
+
+
+class TestBM25Baseline(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_dir = os.path.join(self._tmp.name, "extracted")
+        self.index_path = os.path.join(self._tmp.name, "bm25.idx")
+        write_opinions(self.data_dir, OPINIONS)
+        self.engine = BM25Baseline(
+            data_dir=self.data_dir,
+            index_path=self.index_path,
+            store_path=os.path.join(self._tmp.name, "missing.store"),
+        )
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_builds_and_persists_index(self):
+        self.assertTrue(os.path.isfile(self.index_path))
+
+    def test_scores_match_reference(self):
+        texts = {
+            "76188": "planning commissioner vote zoning property",
+            "90-162": "gift limits lobbyist gift reporting",
+            "00-014": "aviation commissioner consulting airport tenant conflict",
+            "A-24-003": "campaign contribution limits for city council candidates",
+            "I-19-145": "campaign mass mailing disclosure",
+        }
+        query = "commissioner gift limits campaign"
+        expected = brute_force_bm25(texts, query)
+        actual = {self.engine.index.doc_ids[d]: s for d, s in self.engine.score_all(query).items()}
+        self.assertEqual(set(actual), set(expected))
+        for oid, score in expected.items():
+            self.assertAlmostEqual(actual[oid], score, places=9)
+
+    def test_falls_back_to_full_text(self):
+        self.assertEqual(self.engine.search("contribution council", top_k=1), ["A-24-003"])
+
+    def test_rebuilds_when_corpus_changes(self):
+        store_path = os.path.join(self._tmp.name, "missing.store")
+        self.assertEqual(self.engine.index.corpus["files"], len(OPINIONS))
+        reused = BM25Baseline(data_dir=self.data_dir, index_path=self.index_path, store_path=store_path)
+        self.assertEqual(reused.index.doc_ids, self.engine.index.doc_ids)
+        write_opinions(self.data_dir, {("2021", "A-21-050"): {"embedding": {"qa_text": "honorarium ban"}}})
+        rebuilt = BM25Baseline(data_dir=self.data_dir, index_path=self.index_path, store_path=store_path)
+        self.assertEqual(rebuilt.search("honorarium", top_k=1), ["A-21-050"])
+
+    def test_loaded_index_gives_same_results(self):
+        reloaded = BM25Baseline(data_dir="/nonexistent", index_path=self.index_path)
+        query = "commissioner campaign gift"
+        self.assertEqual(reloaded.search(query), self.engine.search(query))
+
+    def test_snapshot_round_trip(self):
+        snapshot = os.path.join(self._tmp.name, "snapshot")
+        os.makedirs(snapshot)
+        self.engine.save_state(snapshot)
+        restored = BM25Baseline.load_state(snapshot)
+        query = "commissioner campaign gift"
+        self.assertEqual(restored.search(query), self.engine.search(query))
+        # A restored (memory-mapped) index can itself be snapshotted again
+        again = os.path.join(self._tmp.name, "again")
+        os.makedirs(again)
+        restored.save_state(again)
+        self.assertEqual(BM25Baseline.load_state(again).search(query), self.engine.search(query))
+
+    def test_with_params_shares_index(self):
+        derived = self.engine.with_params(k1=0.9, b=0.4)
+        self.assertIs(derived.index, self.engine.index)
+        self.assertEqual((derived.k1, derived.b, self.engine.k1), (0.9, 0.4, 1.2))
+        texts = {
+            "76188": "planning commissioner vote zoning property",
+            "90-162": "gift limits lobbyist gift reporting",
+            "00-014": "aviation commissioner consulting airport tenant conflict",
+            "A-24-003": "campaign contribution limits for city council candidates",
+            "I-19-145": "campaign mass mailing disclosure",
+        }
+        query = "commissioner gift limits campaign"
+        expected = brute_force_bm25(texts, query, k1=0.9, b=0.4)
+        actual = {derived.index.doc_ids[d]: s for d, s in derived.score_all(query).items()}
+        for oid, score in expected.items():
+            self.assertAlmostEqual(actual[oid], score, places=9)
+        with self.assertRaises(TypeError):
+            self.engine.with_params(k3=1.0)
+
+    def test_top_k_and_unknown_terms(self):
+        self.assertEqual(len(self.engine.search("commissioner campaign gift", top_k=2)), 2)
+        self.assertEqual(self.engine.search("xyzzy"), [])
+
+
+class TestMaxScore(unittest.TestCase):
+    """MaxScore must return exactly the exhaustive top-k, with less work."""
+
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(7)
+        # Zipf-ish vocabulary so some terms are common and some rare
+        vocab = [f"w{i}" for i in range(400)]
+        weights = [1.0 / (i + 1) for i in range(len(vocab))]
+        texts = {}
+        for i in range(1500):
+            texts[f"d{i}"] = " ".join(rng.choices(vocab, weights, k=rng.randint(5, 80)))
+        # Exact duplicates produce tied scores, exercising tie order
+        for i in range(20):
+            texts[f"dup{i}"] = texts[f"d{i}"]
+        cls._tmp = tempfile.TemporaryDirectory()
+        index_path = os.path.join(cls._tmp.name, "bm25.idx")
+        BM25Index.build(sorted(texts.items())).save(index_path)
+        cls.engine = BM25Baseline(index_path=index_path)
+        # Parameters differing from the build's exercise the lazily computed bounds
+        cls.tuned_engine = BM25Baseline(index_path=index_path, k1=0.9, b=0.4)
+        cls.queries = [
+            " ".join(rng.choices(vocab, weights, k=rng.randint(1, 40))) for _ in range(60)
+        ] + [texts["d3"], texts["d7"]]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def test_identical_to_exhaustive(self):
+        for query in self.queries:
+            for k in (1, 5, 20):
+                self.assertEqual(
+                    self.engine.top_k(query, k, pruning="maxscore"),
+                    self.engine.top_k(query, k, pruning="exhaustive"),
+                    f"mismatch for k={k} query={query[:40]!r}",
+                )
+
+    def test_identical_with_non_default_parameters(self):
+        for query in self.queries:
+            self.assertEqual(
+                self.tuned_engine.top_k(query, 20, pruning="maxscore"),
+                self.tuned_engine.top_k(query, 20, pruning="exhaustive"),
+            )
+
+    def test_skips_postings_on_long_queries(self):
+        stats = PruningStats()
+        for query in self.queries:
+            if len(query.split()) >= 20:
+                self.engine.top_k(query, 20, pruning="maxscore", stats=stats)
+        self.assertGreater(stats.postings_total, 0)
+        self.assertLess(stats.postings_scored, stats.postings_total)
+        self.assertGreater(stats.postings_rescored, 0)
+
+    def test_rejects_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            BM25Baseline(index_path="/nonexistent", pruning="wand")
+
+
+if __name__ == "__main__":
+    unittest.main()
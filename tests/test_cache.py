@@ -0,0 +1,111 @@
+"""Unit tests for the on-disk ranking cache."""
+
+import tempfile
+import unittest
+from functools import partial
+
+from src.cache import RunCache, engine_fingerprint, iter_cached_evaluations
+from src.scorer import iter_evaluations, score_query
+from tests.test_scorer import EchoEngine, make_queries, without_timing
+
+
+class CountingEngine(EchoEngine):
+    """Echo engine that records every query it is asked."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def search(self, query: str, top_k: int = 20) -> list[str]:
+        self.calls.append(query)
+        return super().search(query, top_k=top_k)
+
+
+class TestRunCache(unittest.TestCase):
+    """Tests for RunCache storage, eviction and invalidation."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_round_trip_and_key_parts(self):
+        with RunCache(self.tmp.name) as cache:
+            cache.put("E@1", "conflict", 20, ["A-1", "A-2"])
+            self.assertEqual(cache.get("E@1", "conflict", 20), ["A-1", "A-2"])
+            self.assertIsNone(cache.get("E@2", "conflict", 20))
+            self.assertIsNone(cache.get("E@1", "conflict", 10))
+            self.assertIsNone(cache.get("E@1", "gifts", 20))
+            self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_persists_across_instances(self):
+        with RunCache(self.tmp.name) as cache:
+            cache.put("E", "q", 20, ["A-1"])
+        with RunCache(self.tmp.name) as cache:
+            self.assertEqual(cache.get("E", "q", 20), ["A-1"])
+
+    def test_lru_eviction(self):
+        with RunCache(self.tmp.name, max_entries=2) as cache:
+            cache.put("E", "a", 20, ["1"])
+            cache.put("E", "b", 20, ["2"])
+            cache.get("E", "a", 20)  # b is now least recently used
+            cache.put("E", "c", 20, ["3"])
+            cache.flush()
+            self.assertEqual(cache.stats(), {"E": 2})
+            self.assertIsNone(cache.get("E", "b", 20))
+            self.assertEqual(cache.get("E", "a", 20), ["1"])
+
+    def test_invalidate_one_fingerprint(self):
+        with RunCache(self.tmp.name) as cache:
+            cache.put("E@1", "q", 20, ["1"])
+            cache.put("E@1", "r", 20, ["1"])
+            cache.put("F", "q", 20, ["2"])
+            self.assertEqual(cache.invalidate("E@1"), 2)
+            self.assertEqual(cache.stats(), {"F": 1})
+            self.assertEqual(cache.invalidate(), 1)
+            self.assertEqual(cache.stats(), {})
+
+    def test_fingerprint(self):
+        self.assertEqual(engine_fingerprint("BM25Baseline"), "BM25Baseline")
+        self.assertEqual(engine_fingerprint("BM25Baseline", "v2"), "BM25Baseline@v2")
+
+
+class TestCachedEvaluation(unittest.TestCase):
+    """Tests that cached runs match uncached ones and only call the engine on misses."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.queries = make_queries(10)
+
+    def run_cached(self, engine, queries, **kwargs):
+        with RunCache(self.tmp.name) as cache:
+            evaluate = partial(iter_evaluations, engine=engine, **kwargs)
+            return list(iter_cached_evaluations(queries, cache, "Echo", evaluate, score_query))
+
+    def test_second_run_is_served_from_cache(self):
+        engine = CountingEngine()
+        first = self.run_cached(engine, self.queries)
+        self.assertEqual(len(engine.calls), 10)
+        self.assertFalse(any(r["cached"] for r in first))
+
+        second = self.run_cached(engine, self.queries)
+        self.assertEqual(len(engine.calls), 10)
+        self.assertTrue(all(r["cached"] for r in second))
+        self.assertTrue(all(r["latency_ms"] is None for r in second))
+
+        strip = lambda rs: [{k: v for k, v in r.items() if k != "cached"} for r in without_timing(rs)]
+        self.assertEqual(strip(first), strip(second))
+        self.assertEqual(strip(second), without_timing(list(iter_evaluations(self.queries, EchoEngine()))))
+
+    def test_only_misses_reach_engine_in_order(self):
+        engine = CountingEngine()
+        self.run_cached(engine, self.queries[::3])
+        engine.calls.clear()
+        results = self.run_cached(engine, self.queries, workers=3)
+        self.assertEqual(sorted(engine.calls), [q["text"] for i, q in enumerate(self.queries) if i % 3])
+        self.assertEqual([r["query_id"] for r in results], [q["id"] for q in self.queries])
+        self.assertEqual([r["cached"] for r in results], [i % 3 == 0 for i in range(10)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""Unit tests for the citation graph and the graph expansion stage."""
+
+import os
+import tempfile
+import unittest
+
+from src.citation_graph import (
+    CitationGraph,
+    GraphExpansionEngine,
+    graph_rerank,
+    iter_citations,
+    load_or_build_graph,
+    pagerank,
+    to_csr,
+)
+from tests.test_corpus import write_opinions
+from tests.test_pipeline import ListEngine
+
+
+OPINIONS = {
+    ("1976", "76188"): {
+        "citations": {"government_code": ["87103(a)", "87100"], "prior_opinions": []},
+    },
+    ("1990", "90-162"): {
+        "citations": {"government_code": ["87100"], "prior_opinions": ["76188"]},
+    },
+    ("2000", "00-014"): {
+        "citations": {"government_code": ["87103(a)"], "prior_opinions": ["In re Smith (1976) No. 76188", "99-999"]},
+    },
+    ("2024", "A-24-003"): {
+        "citations": {"prior_opinions": ["90-162", "76188", "A-24-003"]},
+    },
+    ("2019", "I-19-145"): {
+        "content": {"full_text": "No citations"},
+    },
+}
+
+
+class TestCitationGraph(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_dir = os.path.join(self._tmp.name, "extracted")
+        write_opinions(self.data_dir, OPINIONS)
+        self.store_path = os.path.join(self._tmp.name, "missing.store")
+        self.graph = CitationGraph.build(iter_citations(self.data_dir, self.store_path))
+        self.doc = self.graph.doc_index
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def ids(self, docs) -> set[str]:
+        return {self.graph.doc_ids[d] for d in docs}
+
+    def test_edges(self):
+        self.assertEqual(self.ids(self.graph.cites(self.doc["A-24-003"])), {"90-162", "76188"})
+        # "In re Smith (1976) No. 76188" resolves; "99-999" is not in the corpus
+        self.assertEqual(self.ids(self.graph.cites(self.doc["00-014"])), {"76188"})
+        self.assertEqual(self.ids(self.graph.cited_by(self.doc["76188"])), {"90-162", "00-014", "A-24-003"})
+        self.assertEqual(self.graph.stats["unresolved_citations"], 1)
+        self.assertEqual(sorted(self.graph.statutes_of(self.doc["76188"])), ["87100", "87103(a)"])
+        self.assertEqual(self.ids(self.graph.opinions_citing("87103(a)")), {"76188", "00-014"})
+        self.assertEqual(self.ids(self.graph.opinions_citing("§ 87103 (A)")), {"76188", "00-014"})
+        self.assertEqual(tuple(self.graph.opinions_citing("99999")), ())
+        self.assertEqual(len(self.graph.cites(self.doc["I-19-145"])), 0)
+
+    def test_pagerank(self):
+        ranks = self.graph.pagerank
+        self.assertAlmostEqual(sum(ranks), 1.0)
+        self.assertEqual(max(self.doc, key=lambda oid: ranks[self.doc[oid]]), "76188")
+        self.assertGreater(ranks[self.doc["90-162"]], ranks[self.doc["A-24-003"]])
+        # Two nodes pointing at each other split rank evenly
+        offsets, targets = to_csr([[1], [0]])
+        self.assertEqual(list(pagerank(offsets, targets)), [0.5, 0.5])
+
+    def test_round_trip(self):
+        path = os.path.join(self._tmp.name, "citations.graph")
+        self.graph.save(path)
+        loaded = CitationGraph.load(path)
+        self.assertEqual(loaded.doc_ids, self.graph.doc_ids)
+        self.assertEqual(list(loaded.pagerank), list(self.graph.pagerank))
+        self.assertEqual(list(loaded.cited_by(self.doc["76188"])), list(self.graph.cited_by(self.doc["76188"])))
+        self.assertEqual(loaded.statutes_of(self.doc["76188"]), self.graph.statutes_of(self.doc["76188"]))
+        with open(path, "r+b") as f:
+            f.write(b"NOTAGRPH")
+        with self.assertRaises(ValueError):
+            CitationGraph.load(path)
+
+    def test_rebuilds_when_corpus_changes(self):
+        path = os.path.join(self._tmp.name, "citations.graph")
+        graph = load_or_build_graph(path, self.data_dir, self.store_path)
+        self.assertEqual(graph.corpus["files"], len(OPINIONS))
+        self.assertEqual(load_or_build_graph(path, self.data_dir, self.store_path).corpus, graph.corpus)
+        write_opinions(self.data_dir, {("2021", "A-21-050"): {"citations": {"prior_opinions": ["76188"]}}})
+        rebuilt = load_or_build_graph(path, self.data_dir, self.store_path)
+        self.assertIn("A-21-050", rebuilt.doc_index)
+        self.assertEqual(CitationGraph.load(path).corpus, rebuilt.corpus)
+
+    def test_graph_rerank(self):
+        # Neighbors of the top seed join the ranking; unknown IDs keep their place
+        ranking = graph_rerank(self.graph, ["A-24-003", "unknown"], authority_weight=0.0)
+        self.assertEqual(ranking[0], "A-24-003")
+        self.assertEqual(set(ranking), {"A-24-003", "unknown", "90-162", "76188"})
+        self.assertEqual(graph_rerank(self.graph, ["I-19-145", "unknown"]), ["I-19-145", "unknown"])
+        self.assertEqual(graph_rerank(self.graph, ["I-19-145", "00-014"], 0, 0.0, 0.0), ["I-19-145", "00-014"])
+        self.assertEqual(graph_rerank(self.graph, []), [])
+
+    def test_expansion_engine(self):
+        base = ListEngine([("00-014", 3.0), ("I-19-145", 2.0)], label="base")
+        engine = GraphExpansionEngine(
+            engine=base,
+            graph_path=os.path.join(self._tmp.name, "citations.graph"),
+            data_dir=self.data_dir,
+            store_path=self.store_path,
+        )
+        self.assertTrue(os.path.isfile(os.path.join(self._tmp.name, "citations.graph")))
+        # With the default weights an expanded neighbor joins below the base candidates
+        self.assertEqual(engine.search("q", top_k=3), ["00-014", "I-19-145", "76188"])
+        strong = engine.with_params(expansion_weight=1.0).search("q", top_k=3)
+        self.assertLess(strong.index("76188"), strong.index("I-19-145"))
+        self.assertEqual(engine.search_batch(["q"], top_k=1), [["00-014"]])
+        self.assertEqual(set(engine.stage_timings()), {"base", "graph"})
+        plain = engine.with_params(expansion_weight=0.0, authority_weight=0.0)
+        self.assertIs(plain.graph, engine.graph)
+        self.assertEqual((plain.depth, plain.seeds), (engine.depth, engine.seeds))
+        self.assertEqual(plain.search("q"), ["00-014", "I-19-145"])
+        self.assertEqual(engine.name(), "GraphExpansion(base)")
+        with self.assertRaises(TypeError):
+            engine.with_params(k1=1.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""Unit tests for paired significance testing between runs."""
+
+import json
+import os
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+if np is not None:
+    from src.compare import (
+        bootstrap_counts,
+        compare_runs,
+        holm_adjust,
+        load_runs,
+        paired_bootstrap,
+        randomization_test,
+        sign_flips,
+    )
+    from src.stream import JsonlResultWriter
+
+
+def write_run(path: str, engine: str, scores: list[float], drop: int = 0):
+    """Write a minimal results file with one ndcg@10 score per query."""
+    per_query = [
+        {
+            "query_id": f"q{i:03d}",
+            "query_type": "keyword" if i % 2 else "fact_pattern",
+            "query_topic": "gifts",
+            "metrics": {"ndcg@10": score},
+        }
+        for i, score in enumerate(scores)
+    ][drop:]
+    with open(path, "w") as f:
+        json.dump({"engine": engine, "per_query": per_query}, f)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestStatistics(unittest.TestCase):
+    """Tests for the resampling primitives and Holm's correction."""
+
+    def test_holm_hand_computed(self):
+        adjusted = holm_adjust([0.01, 0.04, 0.03, 0.20])
+        np.testing.assert_allclose(adjusted, [0.04, 0.09, 0.09, 0.20])
+        np.testing.assert_allclose(holm_adjust([0.5, 0.6]), [1.0, 1.0])
+
+    def test_bootstrap_counts_are_resamples(self):
+        counts = bootstrap_counts(7, 100, np.random.default_rng(0))
+        self.assertEqual(counts.shape, (100, 7))
+        self.assertTrue((counts.sum(axis=1) == 7).all())
+
+    def test_no_difference_is_not_significant(self):
+        rng = np.random.default_rng(1)
+        diffs = np.zeros((1, 40))
+        low, high = paired_bootstrap(diffs, bootstrap_counts(40, 1000, rng))
+        self.assertEqual((low[0], high[0]), (0.0, 0.0))
+        self.assertEqual(randomization_test(diffs, sign_flips(40, 1000, rng))[0], 1.0)
+
+    def test_consistent_improvement_is_significant(self):
+        rng = np.random.default_rng(2)
+        diffs = np.vstack([0.1 + rng.normal(0, 0.05, 50), rng.normal(0, 0.05, 50)])
+        low, high = paired_bootstrap(diffs, bootstrap_counts(50, 2000, rng))
+        pvalues = randomization_test(diffs, sign_flips(50, 2000, rng))
+        self.assertGreater(low[0], 0.0)
+        self.assertLess(low[1], 0.0)
+        self.assertLess(high[1] - low[1], 0.05)
+        self.assertLess(pvalues[0], 0.001)
+        self.assertGreater(pvalues[1], 0.01)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestCompareRuns(unittest.TestCase):
+    """Tests for loading and comparing result files."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        rng = np.random.default_rng(3)
+        base = rng.uniform(0.2, 0.6, 30)
+        self.paths = [os.path.join(self.tmp.name, f"{name}.json") for name in ("base", "better", "same")]
+        write_run(self.paths[0], "Base", base.tolist())
+        write_run(self.paths[1], "Better", (base + 0.2).tolist())
+        write_run(self.paths[2], "Same", base.tolist(), drop=2)
+
+    def test_rows_per_metric_slice_and_run(self):
+        runs = load_runs(self.paths)
+        self.assertEqual(len(runs[0]["per_query"]), 28)
+        rows = compare_runs(runs, ["ndcg@10"], samples=500)
+        self.assertEqual(
+            [(r["slice"], r["run"]) for r in rows],
+            [(s, r) for s in ("overall", "type:fact_pattern", "type:keyword", "topic:gifts")
+             for r in ("Better", "Same")],
+        )
+        overall = {r["run"]: r for r in rows if r["slice"] == "overall"}
+        self.assertAlmostEqual(overall["Better"]["diff"], 0.2)
+        self.assertLess(overall["Better"]["p_holm"], 0.01)
+        self.assertEqual(overall["Same"]["p_value"], 1.0)
+        self.assertGreaterEqual(overall["Better"]["p_holm"], overall["Better"]["p_value"])
+
+    def test_streamed_run(self):
+        # scorer.py --stream --output writes the records to JSONL and points at them
+        stream_path = os.path.join(self.tmp.name, "streamed.jsonl")
+        with open(self.paths[1]) as f:
+            per_query = json.load(f)["per_query"]
+        with JsonlResultWriter(stream_path) as writer:
+            for record in per_query:
+                writer.write(record)
+        summary_path = os.path.join(self.tmp.name, "streamed.json")
+        with open(summary_path, "w") as f:
+            json.dump({"engine": "Streamed", "per_query_stream": stream_path}, f)
+
+        runs = load_runs([self.paths[0], summary_path, stream_path])
+        self.assertEqual([run["name"] for run in runs], ["Base", "Streamed", stream_path])
+        overall = {r["run"]: r for r in compare_runs(runs, ["ndcg@10"], samples=200) if r["slice"] == "overall"}
+        self.assertAlmostEqual(overall["Streamed"]["diff"], 0.2)
+        self.assertAlmostEqual(overall[stream_path]["diff"], 0.2)
+        with open(summary_path, "w") as f:
+            json.dump({"engine": "Neither"}, f)
+        with self.assertRaises(ValueError):
+            load_runs([self.paths[0], summary_path])
+
+    def test_seed_is_reproducible(self):
+        runs = load_runs(self.paths)
+        self.assertEqual(compare_runs(runs, ["ndcg@10"], samples=200, seed=5),
+                         compare_runs(runs, ["ndcg@10"], samples=200, seed=5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,214 @@
+"""Unit tests for the memory-mapped corpus store."""
+
+import contextlib
+import io
+import json
+import os
+import struct
+import sys
+import tempfile
+import unittest
+from array import array
+from unittest import mock
+
+from src.baselines.random_baseline import RandomBaseline
+from src.corpus import (
+    CorpusStore,
+    build_corpus_store,
+    corpus_fingerprint,
+    get_field,
+    iter_citations,
+    iter_opinion_files,
+    load_sections,
+    prefer_store,
+    save_sections,
+)
+
+
+OPINIONS = {
+    ("1976", "76188"): {
+        "embedding": {"qa_text": "May a planning commissioner vote?"},
+        "citations": {"government_code": ["87103(a)", "87100"], "prior_opinions": []},
+        "parsed": {"date": "1976-05-01"},
+        "content": {"full_text": "Full text of 76188"},
+    },
+    ("2000", "00-014"): {
+        "embedding": {"qa_text": "Aviation commissioner consulting"},
+        "sections": {"question": "Is there a conflict?", "conclusion": "Yes."},
+        "classification": {"topic_primary": "conflicts_of_interest"},
+        "content": {"full_text": "Full text of 00-014 — with non-ASCII"},
+    },
+    ("2024", "A-24-003"): {
+        "content": {"full_text": "Only full text"},
+    },
+}
+
+
+def write_opinions(data_dir: str, opinions: dict = OPINIONS):
+    """Write {(year, id): record} as data_dir/{year}/{id}.json."""
+    for (year, opinion_id), record in opinions.items():
+        year_dir = os.path.join(data_dir, year)
+        os.makedirs(year_dir, exist_ok=True)
+        with open(os.path.join(year_dir, f"{opinion_id}.json"), "w") as f:
+            json.dump(record, f)
+
+
+class TestCorpusStore(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_dir = os.path.join(self._tmp.name, "extracted")
+        self.store_path = os.path.join(self._tmp.name, "corpus.store")
+        write_opinions(self.data_dir)
+        build_corpus_store(self.data_dir, self.store_path)
+        self.store = CorpusStore(self.store_path)
+
+    def tearDown(self):
+        self.store.close()
+        self._tmp.cleanup()
+
+    def test_id_table_in_sorted_walk_order(self):
+        self.assertEqual(self.store.ids, ["76188", "00-014", "A-24-003"])
+        self.assertEqual(self.store.years, ["1976", "2000", "2024"])
+        self.assertEqual(len(self.store), 3)
+        self.assertIn("00-014", self.store)
+        self.assertNotIn("99-999", self.store)
+
+    def test_fields_round_trip(self):
+        self.assertEqual(self.store.get("76188", "citations.government_code"), ["87103(a)", "87100"])
+        self.assertEqual(self.store.get("76188", "citations.prior_opinions"), [])
+        self.assertEqual(self.store.get("00-014", "sections.question"), "Is there a conflict?")
+        self.assertEqual(self.store.get("00-014", "content.full_text"), "Full text of 00-014 — with non-ASCII")
+
+    def test_missing_field_is_none(self):
+        self.assertIsNone(self.store.get("A-24-003", "embedding.qa_text"))
+        self.assertIsNone(self.store.record("A-24-003")["parsed.date"])
+
+    def test_unknown_field_or_id(self):
+        with self.assertRaises(KeyError):
+            self.store.get("76188", "nonexistent.field")
+        with self.assertRaises(KeyError):
+            self.store.get("99-999", "embedding.qa_text")
+
+    def test_iter_field(self):
+        topics = dict(self.store.iter_field("classification.topic_primary"))
+        self.assertEqual(topics, {"76188": None, "00-014": "conflicts_of_interest", "A-24-003": None})
+
+    def test_offsets_are_little_endian(self):
+        with open(self.store_path, "rb") as f:
+            data = f.read()
+        num_docs, num_fields, _, offsets_offset = struct.unpack_from("<12xIIxxxxQQ", data)
+        count = num_docs * num_fields + 1
+        self.assertEqual(struct.unpack_from(f"<{count}Q", data, offsets_offset), tuple(self.store._offsets))
+        # The byte-swapping paths taken on big-endian hosts round-trip too
+        swapped_path = os.path.join(self._tmp.name, "swapped.store")
+        with mock.patch.object(sys, "byteorder", "big"):
+            build_corpus_store(self.data_dir, swapped_path)
+            with CorpusStore(swapped_path) as swapped:
+                self.assertEqual(swapped.record("00-014"), self.store.record("00-014"))
+
+    def test_rejects_non_store_file(self):
+        bogus = os.path.join(self._tmp.name, "bogus.store")
+        with open(bogus, "wb") as f:
+            f.write(b"\0" * 128)
+        with self.assertRaises(ValueError):
+            CorpusStore(bogus)
+
+    def test_empty_data_dir(self):
+        empty = os.path.join(self._tmp.name, "empty")
+        os.makedirs(empty)
+        with self.assertRaises(RuntimeError):
+            build_corpus_store(empty, os.path.join(self._tmp.name, "empty.store"))
+        self.assertEqual(os.listdir(self._tmp.name).count("empty.store.field0.tmp"), 0)
+
+    def test_random_baseline_uses_store(self):
+        engine = RandomBaseline(data_dir="/nonexistent", seed=1, store_path=self.store_path)
+        self.assertEqual(sorted(engine.search("q", top_k=20)), sorted(self.store.ids))
+
+    def test_store_only_replaces_its_own_data_dir(self):
+        self.assertEqual(self.store.source["files"], 3)
+        self.assertTrue(prefer_store(self.data_dir, self.store_path))
+        self.assertTrue(prefer_store("/nonexistent", self.store_path))
+        self.assertEqual(corpus_fingerprint(self.data_dir, self.store_path)["store"], 3)
+        # Another tree is read directly, never through this store
+        other = os.path.join(self._tmp.name, "other")
+        write_opinions(other, {("2021", "A-21-050"): {}})
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertFalse(prefer_store(other, self.store_path))
+            self.assertEqual([oid for oid, _, _ in iter_citations(other, self.store_path)], ["A-21-050"])
+            engine = RandomBaseline(data_dir=other, seed=1, store_path=self.store_path)
+            self.assertEqual(engine.search("q"), ["A-21-050"])
+            self.assertEqual(corpus_fingerprint(other, self.store_path)["files"], 1)
+            # So is the store's own tree once it changes
+            write_opinions(self.data_dir, {("2021", "A-21-050"): {}})
+            self.assertFalse(prefer_store(self.data_dir, self.store_path))
+            self.assertEqual(len(list(iter_citations(self.data_dir, self.store_path))), 4)
+
+
+class TestSections(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "test.idx")
+        self.sections = {"ids": array("I", [3, 1, 4]), "weights": array("d", [0.5, 2.0]), "empty": array("Q")}
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def load(self):
+        mm, arrays, meta = load_sections(self.path, b"TESTIDX1", 1, "test index")
+        self.addCleanup(mm.close)
+        self.addCleanup(lambda: [values.release() for values in arrays.values() if isinstance(values, memoryview)])
+        return arrays, meta
+
+    def test_round_trip(self):
+        save_sections(self.path, b"TESTIDX1", 1, self.sections, {"keys": ["a", "b"]})
+        arrays, meta = self.load()
+        self.assertEqual(meta, {"keys": ["a", "b"]})
+        self.assertEqual({name: list(values) for name, values in arrays.items()},
+                         {name: list(values) for name, values in self.sections.items()})
+        # Loaded (memory-mapped) sections can be saved again
+        again = os.path.join(self._tmp.name, "again.idx")
+        save_sections(again, b"TESTIDX1", 1, arrays, meta)
+        with open(self.path, "rb") as a, open(again, "rb") as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_little_endian_on_every_host(self):
+        save_sections(self.path, b"TESTIDX1", 1, self.sections, {})
+        with open(self.path, "rb") as f:
+            data = f.read()
+        self.assertIn(struct.pack("<3I", 3, 1, 4), data)
+        self.assertIn(struct.pack("<2d", 0.5, 2.0), data)
+        # The byte-swapping paths taken on big-endian hosts round-trip too
+        with mock.patch.object(sys, "byteorder", "big"):
+            save_sections(self.path, b"TESTIDX1", 1, self.sections, {})
+            arrays, _ = self.load()
+            self.assertEqual(list(arrays["weights"]), [0.5, 2.0])
+
+    def test_rejects_other_magic_or_version(self):
+        save_sections(self.path, b"TESTIDX1", 1, self.sections, {})
+        with self.assertRaisesRegex(ValueError, "not a version 2 test index"):
+            load_sections(self.path, b"TESTIDX1", 2, "test index")
+        with self.assertRaises(ValueError):
+            load_sections(self.path, b"OTHERIDX", 1, "test index")
+
+
+class TestHelpers(unittest.TestCase):
+
+    def test_get_field(self):
+        record = {"a": {"b": {"c": 1}}, "x": "leaf"}
+        self.assertEqual(get_field(record, "a.b.c"), 1)
+        self.assertIsNone(get_field(record, "a.missing"))
+        self.assertIsNone(get_field(record, "x.y"))
+
+    def test_iter_opinion_files_skips_non_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_opinions(tmp)
+            open(os.path.join(tmp, "1976", "notes.txt"), "w").close()
+            open(os.path.join(tmp, "README"), "w").close()
+            ids = [opinion_id for opinion_id, _, _ in iter_opinion_files(tmp)]
+        self.assertEqual(ids, ["76188", "00-014", "A-24-003"])
+
+
+if __name__ == "__main__":
+    unittest.main()
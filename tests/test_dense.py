@@ -0,0 +1,218 @@
+"""Unit tests for the dense (hashed TF-IDF) baseline engine."""
+
+import math
+import os
+import tempfile
+import unittest
+import zlib
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+from src.baselines.text import tokenize
+from tests.test_bm25 import OPINIONS
+from tests.test_corpus import write_opinions
+
+if np is not None:
+    from src.baselines.dense_baseline import DenseBaseline, DenseIndex, DenseReranker, top_k_indices
+    from src.baselines.ivf import IVFIndex, default_nlist
+    from src.benchmarks.ann_benchmark import recall_against
+
+
+TEXTS = {
+    "76188": "planning commissioner vote zoning property",
+    "90-162": "gift limits lobbyist gift reporting",
+    "00-014": "aviation commissioner consulting airport tenant conflict",
+    "A-24-003": "campaign contribution limits for city council candidates",
+    "I-19-145": "campaign mass mailing disclosure",
+}
+
+
+def reference_embedding(text: str, df: dict[str, int], n: int, dim: int) -> list[float]:
+    """Hashed sublinear TF-IDF vector computed term by term in pure Python."""
+    vector = [0.0] * dim
+    for term, tf in Counter(t for t in tokenize(text) if t in df).items():
+        h = zlib.crc32(term.encode("utf-8"))
+        idf = math.log((1 + n) / (1 + df[term])) + 1
+        vector[h % dim] += (-1 if h >> 31 else 1) * (1 + math.log(tf)) * idf
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class TestDenseBaseline(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_dir = os.path.join(self._tmp.name, "extracted")
+        self.index_dir = os.path.join(self._tmp.name, "dense")
+        write_opinions(self.data_dir, OPINIONS)
+        self.engine = DenseBaseline(
+            data_dir=self.data_dir,
+            index_dir=self.index_dir,
+            store_path=os.path.join(self._tmp.name, "missing.store"),
+            dim=64,
+        )
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_vectors_are_memory_mapped(self):
+        self.assertIsInstance(self.engine.index.vectors, np.memmap)
+        self.assertEqual(self.engine.index.vectors.dtype, np.float32)
+        self.assertEqual(self.engine.index.vectors.shape, (5, 64))
+
+    def test_scores_match_reference(self):
+        df = Counter(t for text in TEXTS.values() for t in set(tokenize(text)))
+        query = "commissioner gift limits campaign"
+        q = reference_embedding(query, df, len(TEXTS), 64)
+        expected = {
+            oid: sum(a * b for a, b in zip(reference_embedding(text, df, len(TEXTS), 64), q))
+            for oid, text in TEXTS.items()
+        }
+        scores, _ = self.engine.score_all([query])
+        for doc, oid in enumerate(self.engine.index.doc_ids):
+            self.assertAlmostEqual(float(scores[doc, 0]), expected[oid], places=5)
+        ranked = sorted(expected, key=lambda oid: (-expected[oid], self.engine.index.doc_ids.index(oid)))
+        self.assertEqual(self.engine.search(query), ranked)
+
+    def test_top_k_indices_breaks_ties_by_position(self):
+        scores = np.array([0.5, 0.9, 0.5, 0.1, 0.9], dtype=np.float32)
+        self.assertEqual(list(top_k_indices(scores, 3)), [1, 4, 0])
+        self.assertEqual(list(top_k_indices(scores, 10)), [1, 4, 0, 2, 3])
+
+    def test_batch_matches_single_queries(self):
+        queries = ["commissioner gift", "campaign disclosure", "xyzzy", "airport tenant conflict"]
+        self.assertEqual(self.engine.search_batch(queries, top_k=3), [self.engine.search(q, top_k=3) for q in queries])
+        self.assertEqual(self.engine.search("xyzzy"), [])
+
+    def test_quantized_copies_rank_alike(self):
+        queries = ["commissioner gift limits campaign", "airport tenant", "mass mailing"]
+        exact, _ = self.engine.score_all(queries)
+        for quantization in ("float16", "int8"):
+            with self.subTest(quantization=quantization):
+                derived = self.engine.with_params(quantization=quantization)
+                self.assertIs(derived.index, self.engine.index)
+                scores, _ = derived.score_all(queries)
+                np.testing.assert_allclose(scores, exact, atol=0.02)
+                self.assertEqual([derived.search(q, top_k=1) for q in queries],
+                                 [self.engine.search(q, top_k=1) for q in queries])
+        self.assertTrue(os.path.isfile(os.path.join(self.index_dir, "vectors.int8.npy")))
+        with self.assertRaises(TypeError):
+            self.engine.with_params(k1=1.2)
+
+    def test_loaded_index_gives_same_results(self):
+        reloaded = DenseBaseline(data_dir="/nonexistent", index_dir=self.index_dir, dim=64)
+        query = "commissioner campaign gift"
+        self.assertEqual(reloaded.search(query), self.engine.search(query))
+
+    def test_snapshot_round_trip(self):
+        engine = self.engine.with_params(quantization="int8")
+        snapshot = os.path.join(self._tmp.name, "snapshot")
+        os.makedirs(snapshot)
+        engine.save_state(snapshot)
+        restored = DenseBaseline.load_state(snapshot)
+        self.assertEqual(restored.quantization, "int8")
+        query = "commissioner campaign gift"
+        self.assertEqual(restored.search(query), engine.search(query))
+
+    def test_ivf_probing_every_list_is_exact(self):
+        ivf = self.engine.with_params(ann="ivf", nlist=3, nprobe=3)
+        self.assertEqual(ivf.ivf.nlist, 3)
+        queries = ["commissioner gift limits campaign", "airport tenant", "xyzzy"]
+        self.assertEqual(ivf.search_batch(queries), self.engine.search_batch(queries))
+        snapshot = os.path.join(self._tmp.name, "snapshot")
+        os.makedirs(snapshot)
+        ivf.save_state(snapshot)
+        restored = DenseBaseline.load_state(snapshot)
+        self.assertEqual((restored.ann, restored.ivf.nlist), ("ivf", 3))
+        self.assertEqual(restored.search_batch(queries), self.engine.search_batch(queries))
+
+    def test_reranker_orders_candidates_by_cosine(self):
+        reranker = DenseReranker(index_dir=self.index_dir, dim=64)
+        query = "commissioner gift limits campaign"
+        exact = self.engine.search(query)
+        candidates = ["missing"] + exact[::-1]
+        self.assertEqual(reranker.rerank(query, candidates), exact + ["missing"])
+        self.assertEqual(reranker.rerank("xyzzy", candidates), candidates)
+
+    def test_rebuilds_when_corpus_changes(self):
+        store_path = os.path.join(self._tmp.name, "missing.store")
+        self.assertEqual(self.engine.index.corpus["files"], len(OPINIONS))
+        reused = DenseBaseline(data_dir=self.data_dir, index_dir=self.index_dir, store_path=store_path, dim=64)
+        self.assertEqual(reused.index.doc_ids, self.engine.index.doc_ids)
+        write_opinions(self.data_dir, {("2021", "A-21-050"): {"embedding": {"qa_text": "honorarium ban"}}})
+        rebuilt = DenseBaseline(data_dir=self.data_dir, index_dir=self.index_dir, store_path=store_path, dim=64)
+        self.assertEqual(rebuilt.search("honorarium", top_k=1), ["A-21-050"])
+
+    def test_score_candidates_matches_score_all(self):
+        query = "commissioner gift limits campaign"
+        scores, _ = self.engine.score_all([query])
+        positions = np.array([4, 0, 2])
+        np.testing.assert_array_equal(self.engine.score_candidates(query, positions), scores[positions, 0])
+        self.assertIsNone(self.engine.score_candidates("xyzzy", positions))
+
+    def test_rejects_other_directories(self):
+        with self.assertRaises(ValueError):
+            DenseIndex.load(self._tmp.name)
+        with self.assertRaises(ValueError):
+            DenseBaseline(index_dir=self.index_dir, quantization="int4")
+        os.makedirs(os.path.join(self._tmp.name, "empty"))
+        with self.assertRaisesRegex(RuntimeError, "No opinions found"):
+            DenseBaseline(
+                data_dir=os.path.join(self._tmp.name, "empty"),
+                index_dir=os.path.join(self._tmp.name, "empty-dense"),
+                store_path=os.path.join(self._tmp.name, "missing.store"),
+            )
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class TestIVFIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(3)
+        # 40 tight clusters of unit vectors, so the coarse quantizer has structure to find
+        centers = rng.normal(size=(40, 32))
+        points = centers[rng.integers(0, 40, size=4000)] + 0.3 * rng.normal(size=(4000, 32))
+        cls.vectors = (points / np.linalg.norm(points, axis=1, keepdims=True)).astype(np.float32)
+        cls.queries = cls.vectors[rng.choice(4000, 50, replace=False)] + 0.05 * rng.normal(size=(50, 32)).astype(np.float32)
+        cls.ivf = IVFIndex.build(cls.vectors, default_nlist(4000))
+
+    def exact_top_k(self, k: int) -> list[list[int]]:
+        return [list(top_k_indices(column, k)) for column in (self.vectors @ self.queries.T).T]
+
+    def ivf_top_k(self, ivf: "IVFIndex", nprobe: int, k: int) -> list[list[int]]:
+        rankings = []
+        for query, candidates in zip(self.queries, ivf.probe(self.queries, nprobe)):
+            rankings.append(list(candidates[top_k_indices(self.vectors[candidates] @ query, k)]))
+        return rankings
+
+    def test_lists_partition_the_corpus(self):
+        self.assertEqual(self.ivf.nlist, 253)
+        self.assertEqual(sorted(self.ivf.docs), list(range(4000)))
+        for lst in range(self.ivf.nlist):
+            docs = self.ivf.docs[self.ivf.offsets[lst]:self.ivf.offsets[lst + 1]]
+            self.assertEqual(list(docs), sorted(docs))
+
+    def test_recall_grows_with_nprobe(self):
+        exact = self.exact_top_k(10)
+        recalls = [recall_against(self.ivf_top_k(self.ivf, n, 10), exact) for n in (1, 4, 16, self.ivf.nlist)]
+        self.assertEqual(recalls, sorted(recalls))
+        self.assertGreater(recalls[2], 0.9)
+        self.assertEqual(recalls[-1], 1.0)
+
+    def test_save_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.ivf.save(tmp)
+            loaded = IVFIndex.load(tmp, self.ivf.nlist)
+            self.assertEqual(self.ivf_top_k(loaded, 4, 10), self.ivf_top_k(self.ivf, 4, 10))
+            with self.assertRaises(ValueError):
+                IVFIndex.load(tmp, 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
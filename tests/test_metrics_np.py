@@ -0,0 +1,88 @@
+"""Unit tests for the vectorized NumPy metric backend."""
+
+import random
+import unittest
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+from src.scorer import rescore_runs, score_query
+from tests.test_scorer import make_queries, without_timing
+
+if np is not None:
+    from src.metrics_np import QrelsMatrix, evaluate_runs, parse_metric, score_rankings
+
+
+def random_queries(rng: random.Random, n: int) -> list[dict]:
+    """Queries with 0-30 graded judgments over a shared pool of opinion IDs."""
+    queries = []
+    for i in range(n):
+        judged = rng.sample(range(200), rng.randint(0, 30))
+        queries.append({
+            "id": f"q{i:03d}",
+            "text": f"query {i}",
+            "relevance_judgments": [{"opinion_id": f"D-{d}", "score": rng.choice([0, 1, 1, 2])} for d in judged],
+        })
+    return queries
+
+
+def random_run(rng: random.Random, queries: list[dict]) -> dict[str, list[str]]:
+    """Rankings of 0-25 opinions (with occasional duplicates and unjudged IDs)."""
+    return {
+        q["id"]: [f"D-{rng.randrange(220)}" for _ in range(rng.randint(0, 25))]
+        for q in queries
+        if rng.random() > 0.05
+    }
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestVectorizedMetrics(unittest.TestCase):
+    """The NumPy backend must match score_query exactly, not approximately."""
+
+    def setUp(self):
+        rng = random.Random(11)
+        self.queries = random_queries(rng, 60)
+        self.runs = [random_run(rng, self.queries) for _ in range(8)]
+
+    def test_identical_to_score_query(self):
+        vectorized = score_rankings(self.queries, self.runs)
+        for run, run_metrics in zip(self.runs, vectorized):
+            for query, metrics in zip(self.queries, run_metrics):
+                expected = score_query(query, run.get(query["id"], []))["metrics"]
+                self.assertEqual(metrics, expected, query["id"])
+
+    def test_rescore_runs_backends_agree(self):
+        python = rescore_runs(self.queries, self.runs, backend="python")
+        vectorized = rescore_runs(self.queries, self.runs, backend="numpy")
+        self.assertEqual(without_timing(sum(vectorized, [])), without_timing(sum(python, [])))
+
+    def test_configured_metrics_identical(self):
+        metrics = ("map", "map@10", "ndcg@3", "recall@100", "judged@5", "judged@50")
+        vectorized = score_rankings(self.queries, self.runs, metrics)
+        for run, run_metrics in zip(self.runs, vectorized):
+            for query, values in zip(self.queries, run_metrics):
+                expected = score_query(query, run.get(query["id"], []), metrics=metrics)["metrics"]
+                self.assertEqual(values, expected, query["id"])
+
+    def test_cutoffs_beyond_run_depth(self):
+        queries = make_queries(3)
+        run = {q["id"]: [f"{q['text']}-{i}" for i in range(3)] for q in queries}
+        qrels = QrelsMatrix(queries)
+        values = evaluate_runs(qrels, qrels.encode(run, 3)[None], ["precision@10", "recall@50", "ndcg@50"])
+        expected = [score_query(q, run[q["id"]])["metrics"] for q in queries]
+        self.assertEqual(values["precision@10"][0].tolist(), [m["precision@10"] for m in expected])
+        self.assertEqual(values["recall@50"][0].tolist(), [1.0, 1.0, 1.0])
+
+    def test_parse_metric(self):
+        self.assertEqual(parse_metric("ndcg@10"), ("ndcg", 10))
+        self.assertEqual(parse_metric("mrr"), ("mrr", None))
+        self.assertEqual(parse_metric("map"), ("map", None))
+        for bad in ("ndcg", "mrr@5", "recall@0", "judged"):
+            with self.assertRaises(ValueError):
+                parse_metric(bad)
+
+
+if __name__ == "__main__":
+    unittest.main()
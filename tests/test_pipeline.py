@@ -0,0 +1,143 @@
+"""Unit tests for the hybrid fusion/rerank pipeline engine."""
+
+import threading
+import unittest
+
+from src.interface import Reranker, SearchEngine
+from src.pipeline import (
+    PipelineEngine,
+    normalized_scores,
+    reciprocal_rank_fusion,
+    weighted_score_fusion,
+)
+from src.scorer import build_latency_report, find_engine_class
+from tests.test_scorer import EchoEngine
+
+
+class ListEngine(SearchEngine):
+    """Returns a fixed scored ranking for every query."""
+
+    def __init__(self, scored: list[tuple[str, float]] = (), label: str = "list"):
+        self.scored = list(scored)
+        self.label = label
+
+    def search(self, query: str, top_k: int = 20) -> list[str]:
+        return [oid for oid, _ in self.scored[:top_k]]
+
+    def search_scored(self, query: str, top_k: int = 20) -> list[tuple[str, float]]:
+        return self.scored[:top_k]
+
+    def name(self) -> str:
+        return self.label
+
+
+class RendezvousEngine(SearchEngine):
+    """Blocks until every engine sharing the barrier is searching at once."""
+
+    def __init__(self, barrier: threading.Barrier, ranking: list[str]):
+        self.barrier = barrier
+        self.ranking = ranking
+
+    def search(self, query: str, top_k: int = 20) -> list[str]:
+        self.barrier.wait()
+        return self.ranking[:top_k]
+
+
+class ReverseReranker(Reranker):
+    """Reverses its candidates and remembers what it was given."""
+
+    def __init__(self):
+        self.seen = []
+
+    def rerank(self, query: str, candidates: list[str]) -> list[str]:
+        self.seen.append(list(candidates))
+        return candidates[::-1]
+
+
+class TestFusion(unittest.TestCase):
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], [1.0, 1.0], k=60)
+        # c: 1/63 + 1/61 beats a: 1/61; b (1/62) and d (1/62) tie, b seen first
+        self.assertEqual(fused, ["c", "a", "b", "d"])
+        self.assertEqual(reciprocal_rank_fusion([["a", "b"], ["b", "a"]], [1.0, 3.0])[0], "b")
+
+    def test_normalized_scores(self):
+        self.assertEqual(normalized_scores([("a", 10.0), ("b", 6.0), ("c", 2.0)]), {"a": 1.0, "b": 0.5, "c": 0.0})
+        self.assertEqual(normalized_scores([("a", None), ("b", None), ("c", None)]), {"a": 1.0, "b": 0.5, "c": 0.0})
+        self.assertEqual(normalized_scores([("a", 3.0), ("b", 3.0)]), {"a": 1.0, "b": 1.0})
+
+    def test_weighted_score_fusion(self):
+        lexical = [("a", 12.0), ("b", 11.0), ("c", 2.0)]
+        dense = [("c", 0.9), ("b", 0.5), ("a", 0.1)]
+        # a: 1.0 + 0, b: 0.9 + 0.5, c: 0 + 1.0
+        self.assertEqual(weighted_score_fusion([lexical, dense], [1.0, 1.0]), ["b", "a", "c"])
+        self.assertEqual(weighted_score_fusion([lexical, dense], [1.0, 2.5]), ["c", "b", "a"])
+
+
+class TestPipelineEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.lexical = ListEngine([("a", 12.0), ("b", 11.0), ("c", 2.0)], label="lexical")
+        self.dense = ListEngine([("c", 0.9), ("b", 0.5), ("a", 0.1)], label="dense")
+
+    def test_fuses_children(self):
+        rrf = PipelineEngine(engines=[self.lexical, self.dense])
+        self.assertEqual(rrf.search("q"), reciprocal_rank_fusion([["a", "b", "c"], ["c", "b", "a"]], [1.0, 1.0]))
+        weighted = rrf.with_params(fusion="weighted", weights="1+2.5")
+        self.assertIs(weighted.engines, rrf.engines)
+        self.assertEqual(weighted.search("q", top_k=2), ["c", "b"])
+        self.assertEqual(weighted.search_batch(["q", "r"], top_k=2), [["c", "b"], ["c", "b"]])
+        with self.assertRaises(ValueError):
+            PipelineEngine(engines=[self.lexical, self.dense], weights=[1.0])
+        with self.assertRaises(TypeError):
+            rrf.with_params(k1=1.2)
+
+    def test_children_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+        engine = PipelineEngine(engines=[
+            RendezvousEngine(barrier, ["a", "b"]), RendezvousEngine(barrier, ["b", "c"]),
+        ])
+        # A serial pipeline would leave the first child waiting at the barrier
+        self.assertEqual(engine.search("q"), ["b", "a", "c"])
+        self.assertEqual(set(engine.stage_timings()), {"RendezvousEngine", "RendezvousEngine#2", "fuse"})
+
+    def test_copies_share_and_close_the_thread_pool(self):
+        with PipelineEngine(engines=[self.lexical, self.dense]) as rrf:
+            weighted = rrf.with_params(fusion="weighted")
+            rrf.search("q")
+            weighted.search("q")
+            pool = rrf._executor()
+            self.assertIs(weighted._executor(), pool)
+        self.assertTrue(pool._shutdown)
+        # A search after close starts a new pool
+        self.assertEqual(weighted.search("q", top_k=1), ["b"])
+        self.assertIsNot(weighted._executor(), pool)
+        weighted.close()
+
+    def test_reranks_only_the_fused_head(self):
+        reranker = ReverseReranker()
+        engine = PipelineEngine(engines=[EchoEngine()], reranker=reranker, rerank_depth=3, depth=10)
+        self.assertEqual(engine.search("q", top_k=5), ["q-2", "q-1", "q-0", "q-3", "q-4"])
+        self.assertEqual(reranker.seen, [["q-0", "q-1", "q-2"]])
+        self.assertEqual(engine.name(), "Pipeline(EchoEngine, rrf, rerank=ReverseReranker@3)")
+
+    def test_stage_timings(self):
+        engine = PipelineEngine(engines=[self.lexical, self.dense], reranker=ReverseReranker())
+        engine.search("q")
+        engine.search_batch(["r", "s"])
+        timings = engine.stage_timings()
+        self.assertEqual(list(timings), ["lexical", "dense", "fuse", "rerank"])
+        self.assertTrue(all(len(values) == 3 for values in timings.values()))
+        latency = build_latency_report([], 0.0, 1.0, stages=timings)
+        self.assertEqual(list(latency["by_stage"]), list(timings))
+        self.assertEqual(latency["by_stage"]["fuse"]["count"], 3)
+        self.assertNotIn("by_stage", build_latency_report([], 0.0, 1.0, stages=EchoEngine().stage_timings()))
+
+    def test_scorer_picks_the_module_own_engine(self):
+        # EchoEngine is imported above and sorts first, but is not defined here
+        self.assertIs(find_engine_class("tests.test_pipeline"), ListEngine)
+
+
+if __name__ == "__main__":
+    unittest.main()
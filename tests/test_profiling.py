@@ -0,0 +1,79 @@
+"""Unit tests for the --profile hooks around engine construction and search."""
+
+import os
+import pstats
+import tempfile
+import tracemalloc
+import unittest
+
+from src.pipeline import PipelineEngine
+from src.profiling import PhaseProfiler, ProfiledEngine, make_profiler
+from src.scorer import iter_evaluations
+from tests.test_scorer import EchoEngine, make_queries
+
+
+class TestProfilers(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.queries = make_queries(6)
+
+    def profile(self, kind: str, **iter_options) -> tuple[list[dict], dict]:
+        profiler = make_profiler(kind, top=5)
+        with profiler.phase("construct"):
+            engine = EchoEngine()
+        results = list(iter_evaluations(self.queries, ProfiledEngine(engine, profiler), **iter_options))
+        return results, profiler.write(self.tmp.name, "tests.test_scorer")
+
+    def test_cprofile(self):
+        results, profile = self.profile("cprofile")
+        expected = list(iter_evaluations(self.queries, EchoEngine()))
+        self.assertEqual([r["metrics"] for r in results], [r["metrics"] for r in expected])
+        self.assertEqual(profile["profiler"], "cprofile")
+        search = profile["phases"]["search"]
+        self.assertEqual(search["calls"], 6)
+        self.assertEqual(len(search["hotspots"]), 5)
+        self.assertTrue(any("(search)" in spot["function"] for spot in search["hotspots"]))
+        # The dump is a regular pstats file and covers only the search phase
+        stats = pstats.Stats(search["file"])
+        self.assertFalse(any(func[2] == "score_query" for func in stats.stats))
+        self.assertTrue(os.path.isfile(profile["phases"]["construct"]["file"]))
+
+    def test_tracemalloc(self):
+        _, profile = self.profile("tracemalloc", batch_size=3)
+        self.assertFalse(tracemalloc.is_tracing())
+        search = profile["phases"]["search"]
+        self.assertEqual(search["calls"], 2)
+        self.assertGreater(search["peak_bytes"], 0)
+        self.assertGreaterEqual(search["peak_bytes"], search["mean_peak_bytes"])
+        self.assertLessEqual(len(search["top_allocations"]), 5)
+        snapshot = tracemalloc.Snapshot.load(search["file"])
+        self.assertIsInstance(snapshot, tracemalloc.Snapshot)
+
+    def test_cprofile_sees_pipeline_children_with_one_worker(self):
+        profiler = make_profiler("cprofile")
+        engine = PipelineEngine(engines=[EchoEngine(), EchoEngine()], workers=1)
+        list(iter_evaluations(self.queries, ProfiledEngine(engine, profiler)))
+        stats = pstats.Stats(profiler.write(self.tmp.name, "src.pipeline")["phases"]["search"]["file"])
+        echo_calls = [
+            calls for (path, _, function), (_, calls, _, _, _) in stats.stats.items()
+            if function == "search" and path.endswith("test_scorer.py")
+        ]
+        self.assertEqual(sum(echo_calls), 2 * len(self.queries))
+
+    def test_hooks_are_abstract(self):
+        class NoHooks(PhaseProfiler):
+            def _enter(self, name):
+                pass
+
+        with self.assertRaises(TypeError):
+            NoHooks()
+
+    def test_unknown_profiler(self):
+        with self.assertRaises(ValueError):
+            make_profiler("perf")
+
+
+if __name__ == "__main__":
+    unittest.main()
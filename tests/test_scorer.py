@@ -1,17 +1,114 @@
 """Unit tests for the scoring harness metric functions."""
 
+import asyncio
+import json
 import math
+import os
+import random
+import sys
+import tempfile
+import time
 import unittest
 
+from src.interface import AsyncSearchEngine, SearchEngine
 from src.scorer import (
+    aggregate_latency,
     aggregate_metrics,
+    build_latency_report,
+    compute_average_precision,
+    compute_judged,
+    compute_metrics,
     compute_mrr,
     compute_ndcg,
     compute_precision,
     compute_recall,
+    evaluate_batch,
+    is_async_engine,
+    iter_async_evaluations,
+    iter_dataset,
+    iter_evaluations,
+    load_dataset,
+    load_engine,
+    load_run,
+    load_trec_run,
+    parse_metric_spec,
+    percentile,
+    report,
+    rescore_run,
+    short_label,
+    snapshot_path,
+    supports_snapshots,
+    top_k_for,
 )
 
 
+class EchoEngine(SearchEngine):
+    """Returns a deterministic ranking derived from the query text."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    def search(self, query: str, top_k: int = 20) -> list[str]:
+        if self.delay:
+            time.sleep(self.delay)
+        return [f"{query}-{i}" for i in range(top_k)]
+
+
+class StaggeredEngine(EchoEngine):
+    """Sleeps less for later queries ("query<i>"), so they finish first."""
+
+    def search(self, query: str, top_k: int = 20) -> list[str]:
+        time.sleep(max(0.0, 0.02 - 0.001 * int(query.removeprefix("query"))))
+        return super().search(query, top_k)
+
+
+class BatchEngine(EchoEngine):
+    """Records the size of every search_batch call."""
+
+    def __init__(self):
+        super().__init__()
+        self.batch_sizes = []
+
+    def search_batch(self, queries: list[str], top_k: int = 20) -> list[list[str]]:
+        self.batch_sizes.append(len(queries))
+        return [self.search(q, top_k=top_k) for q in queries]
+
+
+class SleepyAsyncEngine(AsyncSearchEngine):
+    """Async engine that tracks how many searches overlap."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def search(self, query: str, top_k: int = 20) -> list[str]:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        # Later queries finish first, so completion order differs from input order
+        await asyncio.sleep(0.001 * (int(query[5:]) % 3))
+        self.in_flight -= 1
+        return [f"{query}-{i}" for i in range(top_k)]
+
+
+def without_timing(results: list[dict]) -> list[dict]:
+    """Drop wall-clock fields so results from different runs compare equal."""
+    return [{k: v for k, v in r.items() if k != "latency_ms"} for r in results]
+
+
+def make_queries(n: int) -> list[dict]:
+    """Build n queries whose first result is judged highly relevant."""
+    return [
+        {
+            "id": f"q{i:03d}",
+            "text": f"query{i}",
+            "type": "keyword",
+            "topic": "other",
+            "relevance_judgments": [{"opinion_id": f"query{i}-{i % 5}", "score": 2}],
+        }
+        for i in range(n)
+    ]
+
+
 class TestComputeMRR(unittest.TestCase):
     """Tests for compute_mrr."""
 
@@ -172,6 +269,83 @@ class TestComputeRecall(unittest.TestCase):
         self.assertAlmostEqual(compute_recall(results, judgments, 5), 0.0, places=4)
 
 
+class TestComputeAveragePrecision(unittest.TestCase):
+    """Tests for compute_average_precision."""
+
+    def test_hand_computed(self):
+        results = ["a", "x", "b", "y", "c"]
+        judgments = {"a": 2, "b": 1, "c": 1, "d": 2, "x": 0}
+        # (1/1 + 2/3 + 3/5) / 4 relevant
+        self.assertAlmostEqual(compute_average_precision(results, judgments), (1 + 2 / 3 + 3 / 5) / 4, places=6)
+
+    def test_cutoff(self):
+        results = ["a", "x", "b", "y", "c"]
+        judgments = {"a": 2, "b": 1, "c": 1, "d": 2}
+        self.assertAlmostEqual(compute_average_precision(results, judgments, 3), (1 + 2 / 3) / 4, places=6)
+
+    def test_no_relevant_docs(self):
+        self.assertAlmostEqual(compute_average_precision(["a"], {"a": 0}), 0.0, places=4)
+
+
+class TestComputeJudged(unittest.TestCase):
+    """Tests for compute_judged."""
+
+    def test_score_0_counts_as_judged(self):
+        results = ["a", "x", "b", "y"]
+        judgments = {"a": 2, "b": 0}
+        self.assertAlmostEqual(compute_judged(results, judgments, 4), 0.5, places=4)
+
+    def test_fewer_results_than_k_penalized(self):
+        self.assertAlmostEqual(compute_judged(["a"], {"a": 1}, 10), 0.1, places=4)
+
+
+class TestMetricRegistry(unittest.TestCase):
+    """Tests for metric specs and the single-pass compute_metrics."""
+
+    def test_parse_spec(self):
+        self.assertEqual(parse_metric_spec(" NDCG@3, map,recall@100,map "), ("ndcg@3", "map", "recall@100"))
+        for bad in ("", "ndcg", "mrr@5", "recall@0", "bleu@10", "precision@five"):
+            with self.assertRaises(ValueError):
+                parse_metric_spec(bad)
+
+    def test_top_k_from_largest_cutoff(self):
+        self.assertEqual(top_k_for(("ndcg@3", "map", "recall@100")), 100)
+        self.assertEqual(top_k_for(("mrr", "map")), 20)
+        self.assertEqual(top_k_for(), 20)
+
+    def test_short_labels(self):
+        self.assertEqual(
+            [short_label(m) for m in ("mrr", "map", "map@10", "ndcg@3", "precision@5", "recall@100", "judged@10")],
+            ["MRR", "MAP", "MAP@10", "nDCG@3", "P@5", "R@100", "J@10"],
+        )
+
+    def test_identical_to_per_metric_functions(self):
+        rng = random.Random(7)
+        metrics = ("mrr", "map", "map@5", "ndcg@3", "ndcg@10", "ndcg@50", "precision@5",
+                   "recall@10", "recall@100", "judged@10")
+        for _ in range(200):
+            judgments = {f"d{d}": rng.choice([0, 1, 1, 2]) for d in rng.sample(range(60), rng.randint(0, 30))}
+            results = rng.sample([f"d{d}" for d in range(70)], rng.randint(0, 40))
+            expected = {
+                "mrr": compute_mrr(results, judgments),
+                "map": compute_average_precision(results, judgments),
+                "map@5": compute_average_precision(results, judgments, 5),
+                "ndcg@3": compute_ndcg(results, judgments, 3),
+                "ndcg@10": compute_ndcg(results, judgments, 10),
+                "ndcg@50": compute_ndcg(results, judgments, 50),
+                "precision@5": compute_precision(results, judgments, 5),
+                "recall@10": compute_recall(results, judgments, 10),
+                "recall@100": compute_recall(results, judgments, 100),
+                "judged@10": compute_judged(results, judgments, 10),
+            }
+            self.assertEqual(compute_metrics(results, judgments, metrics), expected)
+
+    def test_engine_asked_for_largest_cutoff(self):
+        results = list(iter_evaluations(make_queries(2), EchoEngine(), metrics=("ndcg@3", "recall@50")))
+        self.assertEqual([r["num_results"] for r in results], [50, 50])
+        self.assertEqual(list(results[0]["metrics"]), ["ndcg@3", "recall@50"])
+
+
 class TestAggregateMetrics(unittest.TestCase):
     """Tests for aggregate_metrics."""
 
@@ -226,5 +400,279 @@ class TestEdgeCases(unittest.TestCase):
         self.assertAlmostEqual(compute_precision(results, judgments, 3), 1.0, places=4)
 
 
+class TestParallelEvaluation(unittest.TestCase):
+    """Tests for iter_evaluations across executor modes."""
+
+    def setUp(self):
+        self.queries = make_queries(12)
+        self.serial = without_timing(iter_evaluations(self.queries, EchoEngine()))
+
+    def test_serial_preserves_order(self):
+        self.assertEqual([r["query_id"] for r in self.serial], [q["id"] for q in self.queries])
+
+    def test_thread_pool_matches_serial(self):
+        # Later queries complete first; output order must not change
+        results = list(iter_evaluations(self.queries, StaggeredEngine(), workers=4))
+        self.assertEqual(without_timing(results), self.serial)
+
+    def test_process_pool_matches_serial(self):
+        results = list(iter_evaluations(
+            self.queries, EchoEngine(), workers=2, executor="process",
+            search_module="tests.test_scorer",
+        ))
+        self.assertEqual(without_timing(results), self.serial)
+
+    def test_unknown_executor(self):
+        with self.assertRaises(ValueError):
+            list(iter_evaluations(self.queries, EchoEngine(), workers=2, executor="gpu"))
+
+
+class TestBatchEvaluation(unittest.TestCase):
+    """Tests for search_batch support in the scorer."""
+
+    def setUp(self):
+        self.queries = make_queries(10)
+        self.serial = without_timing(iter_evaluations(self.queries, EchoEngine()))
+
+    def test_default_search_batch_loops_over_search(self):
+        self.assertEqual(EchoEngine().search_batch(["a", "b"], top_k=2), [["a-0", "a-1"], ["b-0", "b-1"]])
+
+    def test_whole_set_in_one_call(self):
+        engine = BatchEngine()
+        results = list(iter_evaluations(self.queries, engine, batch_size=0))
+        self.assertEqual(engine.batch_sizes, [10])
+        self.assertEqual(without_timing(results), self.serial)
+
+    def test_chunks(self):
+        engine = BatchEngine()
+        results = list(iter_evaluations(self.queries, engine, batch_size=4))
+        self.assertEqual(engine.batch_sizes, [4, 4, 2])
+        self.assertEqual(without_timing(results), self.serial)
+
+    def test_chunks_across_threads(self):
+        results = list(iter_evaluations(self.queries, BatchEngine(), workers=3, batch_size=3))
+        self.assertEqual(without_timing(results), self.serial)
+
+    def test_wrong_number_of_rankings(self):
+        class ShortEngine(EchoEngine):
+            def search_batch(self, queries, top_k=20):
+                return []
+        with self.assertRaises(RuntimeError):
+            evaluate_batch(self.queries, ShortEngine())
+
+
+class TestAsyncEvaluation(unittest.TestCase):
+    """Tests for AsyncSearchEngine support."""
+
+    def setUp(self):
+        self.queries = make_queries(10)
+        self.serial = without_timing(iter_evaluations(self.queries, EchoEngine()))
+
+    def test_detects_async_engine(self):
+        self.assertTrue(is_async_engine(SleepyAsyncEngine()))
+        self.assertFalse(is_async_engine(EchoEngine()))
+
+    def test_results_match_sync_path_in_order(self):
+        results = list(iter_async_evaluations(self.queries, SleepyAsyncEngine(), concurrency=4))
+        self.assertEqual(without_timing(results), self.serial)
+
+    def test_concurrency_limit(self):
+        engine = SleepyAsyncEngine()
+        list(iter_async_evaluations(self.queries, engine, concurrency=3))
+        self.assertGreater(engine.max_in_flight, 1)
+        self.assertLessEqual(engine.max_in_flight, 3)
+
+    def test_early_stop_cancels_pending(self):
+        results = iter_async_evaluations(self.queries, SleepyAsyncEngine(), concurrency=4)
+        self.assertEqual(next(results)["query_id"], "q000")
+        results.close()
+
+
+class TestLatency(unittest.TestCase):
+    """Tests for latency instrumentation and summaries."""
+
+    def test_percentile_interpolates(self):
+        values = [10.0, 20.0, 30.0, 40.0, 50.0]
+        self.assertAlmostEqual(percentile(values, 50), 30.0)
+        self.assertAlmostEqual(percentile(values, 95), 48.0)
+        self.assertAlmostEqual(percentile(values, 100), 50.0)
+        self.assertAlmostEqual(percentile([], 50), 0.0)
+
+    def test_every_query_is_timed(self):
+        results = list(iter_evaluations(make_queries(3), EchoEngine(delay=0.002)))
+        for r in results:
+            self.assertGreaterEqual(r["latency_ms"], 2.0)
+
+    def test_batch_latency_is_amortized(self):
+        results = list(iter_evaluations(make_queries(4), EchoEngine(delay=0.002), batch_size=0))
+        latencies = {r["latency_ms"] for r in results}
+        self.assertEqual(len(latencies), 1)
+        # Four sequential 2ms searches shared across four queries
+        self.assertGreaterEqual(latencies.pop(), 2.0)
+
+    def test_aggregate_skips_missing_latency(self):
+        stats = aggregate_latency([{"latency_ms": 4.0}, {"latency_ms": None}, {"latency_ms": 2.0}])
+        self.assertEqual(stats["count"], 2)
+        self.assertAlmostEqual(stats["mean_ms"], 3.0)
+        self.assertAlmostEqual(stats["max_ms"], 4.0)
+        self.assertEqual(aggregate_latency([{"latency_ms": None}]), {})
+
+    def test_report_breakdowns_and_qps(self):
+        per_query = [
+            {"query_type": "keyword", "query_topic": "lobbying", "latency_ms": 5.0},
+            {"query_type": "fact_pattern", "query_topic": "lobbying", "latency_ms": 15.0},
+        ]
+        report = build_latency_report(per_query, load_seconds=1.5, wall_seconds=0.5)
+        self.assertAlmostEqual(report["qps"], 4.0)
+        self.assertAlmostEqual(report["load_seconds"], 1.5)
+        self.assertAlmostEqual(report["by_type"]["keyword"]["p50_ms"], 5.0)
+        self.assertAlmostEqual(report["by_topic"]["lobbying"]["mean_ms"], 10.0)
+
+
+class TestRescore(unittest.TestCase):
+    """Tests for rescoring saved runs without an engine."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.queries = make_queries(6)
+
+    def test_results_json_round_trip(self):
+        per_query = list(iter_evaluations(self.queries, EchoEngine()))
+        path = os.path.join(self.tmp.name, "run.json")
+        report("Echo", per_query, output=path)
+        name, rankings = load_run(path)
+        self.assertEqual(name, "Echo")
+        rescored = rescore_run(self.queries, rankings)
+        self.assertEqual(without_timing(rescored), without_timing(per_query))
+        self.assertTrue(all(r["latency_ms"] is None for r in rescored))
+
+    def test_trec_run_orders_by_score(self):
+        path = os.path.join(self.tmp.name, "run.trec")
+        with open(path, "w") as f:
+            f.write("q001 Q0 query1-9 1 3.5 bm25\n")
+            f.write("q001 Q0 query1-1 3 9.0 bm25\n")
+            f.write("q001 Q0 query1-2 2 3.5 bm25\n")
+            f.write("\n")
+            f.write("q002 Q0 query2-2 1 1.0 bm25\n")
+        name, rankings = load_trec_run(path)
+        self.assertEqual(name, "bm25")
+        self.assertEqual(rankings["q001"], ["query1-1", "query1-9", "query1-2"])
+        self.assertEqual(rankings["q002"], ["query2-2"])
+
+        rescored = rescore_run(self.queries, rankings)
+        self.assertEqual([r["metrics"]["mrr"] for r in rescored], [0.0, 1.0, 1.0, 0.0, 0.0, 0.0])
+
+    def test_malformed_trec_line(self):
+        path = os.path.join(self.tmp.name, "bad.trec")
+        with open(path, "w") as f:
+            f.write("q001 Q0 query1-1 1\n")
+        with self.assertRaises(ValueError):
+            load_trec_run(path)
+
+
+class TestLazyDataset(unittest.TestCase):
+    """Tests for streaming JSONL datasets."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.queries = make_queries(5)
+        self.queries[2]["relevance_judgments"] = []
+        self.path = os.path.join(self.tmp.name, "queries.jsonl")
+        with open(self.path, "w") as f:
+            for query in self.queries:
+                f.write(json.dumps(query) + "\n")
+            f.write("\n")
+
+    def test_matches_json_dataset(self):
+        json_path = os.path.join(self.tmp.name, "dataset.json")
+        with open(json_path, "w") as f:
+            json.dump({"queries": self.queries}, f)
+        self.assertEqual(list(iter_dataset(self.path)), load_dataset(json_path)["queries"])
+
+    def test_consumed_one_query_at_a_time(self):
+        queries = iter_dataset(self.path)
+        results = iter_evaluations(queries, EchoEngine())
+        self.assertEqual(next(results)["query_id"], "q000")
+        # Only the first query has been read so far
+        self.assertEqual(next(queries)["id"], "q001")
+        self.assertEqual([r["query_id"] for r in results], ["q003", "q004"])
+
+    def test_malformed_line(self):
+        with open(self.path, "a") as f:
+            f.write("[1, 2]\n")
+        with self.assertRaises(ValueError):
+            list(iter_dataset(self.path))
+
+
+SNAPSHOT_ENGINE_MODULE = """
+import os
+
+from src.interface import SearchEngine
+
+
+class SlowEngine(SearchEngine):
+    constructed = 0
+
+    def __init__(self):
+        SlowEngine.constructed += 1
+        self.vocabulary = ["alpha", "beta", "gamma"]
+
+    def search(self, query, top_k=20):
+        return [f"{query}-{word}" for word in self.vocabulary][:top_k]
+
+    def save_state(self, path):
+        with open(os.path.join(path, "vocabulary.txt"), "w") as f:
+            f.write("\\n".join(self.vocabulary))
+
+    @classmethod
+    def load_state(cls, path):
+        engine = cls.__new__(cls)
+        with open(os.path.join(path, "vocabulary.txt")) as f:
+            engine.vocabulary = f.read().split("\\n")
+        return engine
+"""
+
+
+class TestSnapshots(unittest.TestCase):
+    """Tests for warm-starting engines from --snapshot-dir."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        with open(os.path.join(self.tmp.name, "snapshot_test_engine.py"), "w") as f:
+            f.write(SNAPSHOT_ENGINE_MODULE)
+        sys.path.insert(0, self.tmp.name)
+        self.addCleanup(sys.path.remove, self.tmp.name)
+        self.addCleanup(sys.modules.pop, "snapshot_test_engine", None)
+        self.snapshot_dir = os.path.join(self.tmp.name, "snapshots")
+
+    def test_supports_snapshots(self):
+        self.assertFalse(supports_snapshots(EchoEngine))
+        self.assertFalse(supports_snapshots(SleepyAsyncEngine))
+        engine = load_engine("snapshot_test_engine")
+        self.assertTrue(supports_snapshots(type(engine)))
+
+    def test_built_once_then_restored(self):
+        first = load_engine("snapshot_test_engine", snapshot_dir=self.snapshot_dir)
+        cls = type(first)
+        self.assertEqual(cls.constructed, 1)
+        restored = load_engine("snapshot_test_engine", snapshot_dir=self.snapshot_dir)
+        self.assertEqual(cls.constructed, 1)
+        self.assertEqual(restored.search("q"), first.search("q"))
+        # Another version gets its own snapshot
+        load_engine("snapshot_test_engine", snapshot_dir=self.snapshot_dir, engine_version="v2")
+        self.assertEqual(cls.constructed, 2)
+        self.assertTrue(os.path.isdir(snapshot_path(self.snapshot_dir, "snapshot_test_engine", cls, "v2")))
+
+    def test_incomplete_snapshot_is_rebuilt(self):
+        cls = type(load_engine("snapshot_test_engine"))
+        # A directory without a manifest (e.g. from a crashed save) is ignored
+        os.makedirs(snapshot_path(self.snapshot_dir, "snapshot_test_engine", cls))
+        load_engine("snapshot_test_engine", snapshot_dir=self.snapshot_dir)
+        self.assertEqual(cls.constructed, 2)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,136 @@
+"""Unit tests for the Government Code section index and statute stage."""
+
+import os
+import tempfile
+import unittest
+
+from src.statutes import (
+    StatuteEngine,
+    StatuteIndex,
+    index_keys,
+    load_or_build_statute_index,
+    lookup_key,
+    normalize_section,
+    section_keys,
+    statute_rerank,
+)
+from tests.test_corpus import write_opinions
+from tests.test_pipeline import ListEngine
+
+
+OPINIONS = {
+    ("1976", "76188"): {"citations": {"government_code": ["87103(a)", "87100"]}},
+    ("1990", "90-162"): {"citations": {"government_code": ["87103 (A)(1)", "§ 89503"]}},
+    ("2000", "00-014"): {"citations": {"government_code": ["Section 87103", "1090"]}},
+    ("2024", "A-24-003"): {"citations": {"government_code": ["84308"]}},
+    ("2019", "I-19-145"): {"content": {"full_text": "No citations"}},
+}
+
+
+class TestSectionParsing(unittest.TestCase):
+
+    def test_normalize_section(self):
+        for form in ("87103(a)", "87103 (a)", "87103( A )", "Gov. Code § 87103(a)"):
+            self.assertEqual(normalize_section(form), "87103(a)")
+        self.assertEqual(normalize_section("§ 87103"), "87103")
+        self.assertEqual(normalize_section("89506(a)(2)"), "89506(a)(2)")
+        self.assertEqual(normalize_section("1091.5"), "1091.5")
+        self.assertIsNone(normalize_section("et seq."))
+
+    def test_section_keys(self):
+        # Queries from eval/dataset.json
+        self.assertEqual(section_keys("Section 87103(a) disqualification business entity"), ["87103(a)"])
+        self.assertEqual(section_keys("Section 1091 1091.5 remote interest noninterest exception"), ["1091", "1091.5"])
+        self.assertEqual(section_keys("Government Code 1090 self-dealing"), ["1090"])
+        self.assertEqual(section_keys("85800 85801 campaign fund expenditure personal use"), ["85800", "85801"])
+        # Regulations, dollar amounts, distances and other codes are not Government Code sections
+        self.assertEqual(section_keys("500 feet proximity recusal Regulation 18702.2 zoning decision"), [])
+        self.assertEqual(section_keys("A 501(c)(3) nonprofit gift exceeding $250"), [])
+        self.assertEqual(section_keys("§§ 87100 and 87103 (A), then 1090"), ["87100", "87103(a)"])
+        # A regulation listed after a section cue is still a regulation
+        self.assertEqual(section_keys("sections 87100 and 18700"), ["87100"])
+        self.assertEqual(section_keys("Section 18702.2 and 87103"), ["87103"])
+
+    def test_index_keys(self):
+        self.assertEqual(
+            index_keys("87103.5(a)(1)"),
+            ["87103.5(a)(1)", "87103.5(a)", "87103.5", "87103*", "8710*", "871*", "87*", "8*"],
+        )
+        self.assertEqual(lookup_key("871xx"), "871*")
+        self.assertEqual(lookup_key("871*"), "871*")
+        self.assertEqual(lookup_key("87103 (A)"), "87103(a)")
+
+
+class TestStatuteIndex(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_dir = os.path.join(self._tmp.name, "extracted")
+        write_opinions(self.data_dir, OPINIONS)
+        self.index_path = os.path.join(self._tmp.name, "statutes.idx")
+        self.engine = StatuteEngine(
+            engine=ListEngine([(oid, 1.0) for oid in ("I-19-145", "A-24-003", "00-014", "90-162", "76188")], "base"),
+            index_path=self.index_path,
+            data_dir=self.data_dir,
+            store_path=os.path.join(self._tmp.name, "missing.store"),
+        )
+        self.index = self.engine.index
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_lookup(self):
+        self.assertEqual(set(self.index.opinions("87103")), {"76188", "90-162", "00-014"})
+        self.assertEqual(set(self.index.opinions("87103 (a)")), {"76188", "90-162"})
+        self.assertEqual(self.index.opinions("87103(a)(1)"), ["90-162"])
+        self.assertEqual(set(self.index.opinions("871xx")), {"76188", "90-162", "00-014"})
+        self.assertEqual(set(self.index.opinions("8*")), {"76188", "90-162", "00-014", "A-24-003"})
+        self.assertEqual(self.index.opinions("89503"), ["90-162"])
+        self.assertEqual(self.index.opinions("87103(b)"), [])
+        self.assertEqual(self.index.opinions("not a section"), [])
+
+    def test_round_trip(self):
+        loaded = StatuteIndex.load(self.index_path)
+        self.assertEqual(loaded.keys, self.index.keys)
+        for key in self.index.keys:
+            self.assertEqual(list(loaded.lookup(key)), list(self.index.lookup(key)))
+        with open(self.index_path, "r+b") as f:
+            f.write(b"NOTSTATS")
+        with self.assertRaises(ValueError):
+            StatuteIndex.load(self.index_path)
+
+    def test_rebuilds_when_corpus_changes(self):
+        store_path = os.path.join(self._tmp.name, "missing.store")
+        self.assertEqual(self.index.corpus["files"], len(OPINIONS))
+        reused = load_or_build_statute_index(self.index_path, self.data_dir, store_path)
+        self.assertEqual(reused.corpus, self.index.corpus)
+        write_opinions(self.data_dir, {("2021", "A-21-050"): {"citations": {"government_code": ["87200"]}}})
+        rebuilt = load_or_build_statute_index(self.index_path, self.data_dir, store_path)
+        self.assertEqual(rebuilt.opinions("87200"), ["A-21-050"])
+
+    def test_statute_rerank(self):
+        ranking = ["I-19-145", "A-24-003", "00-014", "90-162", "76188"]
+        query = "Section 87103(a) disqualification"
+        self.assertEqual(statute_rerank(self.index, query, ranking), ["90-162", "76188", "I-19-145", "A-24-003", "00-014"])
+        self.assertEqual(statute_rerank(self.index, query, ranking, mode="filter"), ["90-162", "76188"])
+        # Candidates citing both named sections outrank those citing one
+        self.assertEqual(statute_rerank(self.index, "Sections 87103 and 87100", ranking)[:2], ["76188", "00-014"])
+        self.assertEqual(statute_rerank(self.index, "gift limits", ranking), ranking)
+        self.assertEqual(statute_rerank(self.index, "Section 87200", ranking, mode="filter"), ranking)
+
+    def test_engine(self):
+        self.assertEqual(self.engine.search("Section 87103(a)", top_k=2), ["90-162", "76188"])
+        filtered = self.engine.with_params(mode="filter")
+        self.assertIs(filtered.index, self.index)
+        self.assertEqual((filtered.weight, filtered.depth), (self.engine.weight, self.engine.depth))
+        self.assertEqual(filtered.search_batch(["gov. code 1090", "87103(a)(1)"]), [["00-014"], ["90-162"]])
+        self.assertEqual(set(self.engine.stage_timings()), {"base", "statutes"})
+        self.assertEqual(filtered.name(), "Statutes(base, filter)")
+        with self.assertRaises(ValueError):
+            self.engine.with_params(mode="exclude")
+        with self.assertRaises(TypeError):
+            self.engine.with_params(k1=1.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
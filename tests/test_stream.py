@@ -0,0 +1,128 @@
+"""Unit tests for streaming JSONL results and resumable runs."""
+
+import os
+import tempfile
+import tracemalloc
+import unittest
+
+from src.scorer import aggregate_metrics, build_latency_report, group_by, iter_evaluations, load_run
+from src.stream import (
+    JsonlResultWriter,
+    ResultAggregator,
+    aggregate_stream,
+    completed_query_ids,
+    header_mismatches,
+    iter_stream,
+    read_stream_header,
+    repair_stream,
+)
+from tests.test_scorer import EchoEngine, make_queries
+
+
+class TestJsonlStream(unittest.TestCase):
+    """Tests for writing, repairing and aggregating result streams."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "run.jsonl")
+        self.queries = make_queries(10)
+        for i, query in enumerate(self.queries):
+            query["type"] = ("keyword", "fact_pattern")[i % 2]
+        self.results = list(iter_evaluations(self.queries, EchoEngine()))
+
+    def test_round_trip(self):
+        with JsonlResultWriter(self.path, fsync_every=3) as writer:
+            for result in self.results:
+                writer.write(result)
+        self.assertEqual(list(iter_stream(self.path)), self.results)
+        name, rankings = load_run(self.path)
+        self.assertEqual(name, "run")
+        self.assertEqual(rankings["q001"], self.results[1]["results"])
+
+    def test_resume_after_partial_write(self):
+        with JsonlResultWriter(self.path) as writer:
+            for result in self.results[:4]:
+                writer.write(result)
+        # Simulate a crash in the middle of the fifth record
+        with open(self.path, "a") as f:
+            f.write('{"query_id": "q004", "metr')
+
+        self.assertGreater(repair_stream(self.path), 0)
+        done = completed_query_ids(self.path)
+        self.assertEqual(done, {"q000", "q001", "q002", "q003"})
+        with JsonlResultWriter(self.path, append=True) as writer:
+            for result in self.results:
+                if result["query_id"] not in done:
+                    writer.write(result)
+        self.assertEqual(list(iter_stream(self.path)), self.results)
+        self.assertEqual(repair_stream(self.path), 0)
+
+    def test_aggregates_match_in_memory(self):
+        with JsonlResultWriter(self.path) as writer:
+            for result in self.results:
+                writer.write(result)
+        summary = aggregate_stream(self.path)
+        self.assertEqual(summary["num_queries"], 10)
+        self.assertEqual(summary["overall"], aggregate_metrics(self.results))
+        self.assertEqual(
+            summary["by_type"],
+            {k: aggregate_metrics(v) for k, v in group_by(self.results, "query_type").items()},
+        )
+        self.assertEqual(
+            build_latency_report(None, 0.0, 1.0, evaluated=10, latencies=summary["latencies"]),
+            build_latency_report(self.results, 0.0, 1.0),
+        )
+
+    def test_aggregator_memory_is_bounded(self):
+        aggregator = ResultAggregator()
+        template = dict(self.results[0], query_text="x" * 1000, results=[f"r-{i}" for i in range(100)])
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            for i in range(5000):
+                aggregator.add(dict(template, query_id=f"q{i}", query_type=f"type{i % 3}", latency_ms=float(i)))
+            retained = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        # Three 8-byte latencies per query (overall, type, topic), with room
+        # for array over-allocation; any per-query dict would be far larger
+        self.assertLess(retained, 5000 * 3 * 8 * 2)
+        self.assertEqual(len(aggregator.summary()["latencies"]["overall"]), 5000)
+
+    def test_header_is_written_once_and_skipped(self):
+        header = {"search_module": "tests.test_scorer", "metrics": ["mrr", "ndcg@10"]}
+        with JsonlResultWriter(self.path, header=header) as writer:
+            for result in self.results[:4]:
+                writer.write(result)
+        with JsonlResultWriter(self.path, append=True, header=header) as writer:
+            for result in self.results[4:]:
+                writer.write(result)
+        self.assertEqual(read_stream_header(self.path), header)
+        self.assertEqual(list(iter_stream(self.path)), self.results)
+        self.assertEqual(len(completed_query_ids(self.path)), 10)
+        with open(self.path) as f:
+            self.assertEqual(sum("stream_header" in line for line in f), 1)
+
+    def test_header_mismatches(self):
+        header = {"search_module": "a", "params": {"k1": 1.2}, "metrics": ["mrr"]}
+        self.assertEqual(header_mismatches(header, dict(header)), [])
+        self.assertEqual(header_mismatches(header, dict(header, metrics=["mrr", "map"])), ["metrics"])
+        # A stream written before headers existed can't be checked, so it never matches
+        self.assertEqual(header_mismatches(None, header), ["search_module", "params", "metrics"])
+
+    def test_means_skip_records_without_a_metric(self):
+        aggregator = ResultAggregator()
+        aggregator.add({"query_id": "q0", "query_type": "keyword", "query_topic": "gifts", "metrics": {"mrr": 1.0, "map": 0.5}})
+        aggregator.add({"query_id": "q1", "query_type": "keyword", "query_topic": "gifts", "metrics": {"mrr": 0.5}})
+        overall = aggregator.summary()["overall"]
+        self.assertEqual(overall["mrr"], 0.75)
+        self.assertEqual(overall["map"], 0.5)
+
+    def test_missing_file(self):
+        self.assertEqual(completed_query_ids(self.path), set())
+        self.assertEqual(repair_stream(self.path), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
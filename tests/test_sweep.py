@@ -0,0 +1,86 @@
+"""Unit tests for the parameter sweep runner."""
+
+import multiprocessing
+import unittest
+from functools import partial
+from unittest import mock
+
+from src.interface import SearchEngine
+from src.scorer import aggregate_metrics, format_params, iter_evaluations, parse_param
+from src.sweep import build_engines, expand_grid, iter_sweep_evaluations
+from tests.test_scorer import make_queries
+
+
+class ShiftEngine(SearchEngine):
+    """Echo-style ranking rotated by `shift`, so each setting scores differently."""
+
+    def __init__(self, shift: int = 0, label: str = "x"):
+        self.shift = shift
+        self.label = label
+
+    def search(self, query: str, top_k: int = 20) -> list[str]:
+        return [f"{query}-{(i + self.shift) % 5}" for i in range(top_k)]
+
+
+class TestExpandGrid(unittest.TestCase):
+
+    def test_parse_param(self):
+        self.assertEqual(parse_param("k1=0.9, 1.2"), ("k1", [0.9, 1.2]))
+        self.assertEqual(parse_param("pruning=maxscore,exhaustive"), ("pruning", ["maxscore", "exhaustive"]))
+        self.assertEqual(format_params({"k1": 0.9, "pruning": "maxscore"}), 'k1=0.9,pruning="maxscore"')
+        for spec in ("k1", "=1", "k1="):
+            with self.assertRaises(ValueError):
+                parse_param(spec)
+
+    def test_product_order(self):
+        grid = expand_grid([("k1", [0.9, 1.2]), ("b", [0.4, 0.75])])
+        self.assertEqual(grid, [
+            {"k1": 0.9, "b": 0.4},
+            {"k1": 0.9, "b": 0.75},
+            {"k1": 1.2, "b": 0.4},
+            {"k1": 1.2, "b": 0.75},
+        ])
+
+    def test_rejects_duplicate_names(self):
+        with self.assertRaises(ValueError):
+            expand_grid([("k1", [0.9]), ("k1", [1.2])])
+
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.queries = make_queries(12)
+        self.configs = expand_grid([("shift", [0, 1, 2])])
+        self.engines = build_engines("tests.test_sweep", self.configs)
+
+    def test_build_engines(self):
+        self.assertEqual([e.shift for e in self.engines], [0, 1, 2])
+        with self.assertRaises(TypeError):
+            build_engines("tests.test_sweep", [{"alpha": 1}])
+
+    def test_matches_single_runs(self):
+        for workers, executor in ((1, "thread"), (4, "thread"), (2, "process")):
+            with self.subTest(workers=workers, executor=executor):
+                per_config = [[] for _ in self.configs]
+                for index, result in iter_sweep_evaluations(self.queries, self.engines, workers, executor):
+                    per_config[index].append(result)
+                for engine, results in zip(self.engines, per_config):
+                    expected = list(iter_evaluations(self.queries, ShiftEngine(shift=engine.shift)))
+                    self.assertEqual([r["metrics"] for r in results], [r["metrics"] for r in expected])
+                self.assertGreater(
+                    aggregate_metrics(per_config[0])["mrr"], aggregate_metrics(per_config[1])["mrr"],
+                )
+
+    def test_spawned_workers_rebuild_engines(self):
+        # Without fork, scorer.make_pool runs the factory in each worker instead
+        factory = partial(build_engines, "tests.test_sweep", self.configs)
+        with mock.patch.object(multiprocessing, "get_all_start_methods", return_value=["spawn"]):
+            results = list(iter_sweep_evaluations(self.queries, self.engines, 2, "process", factory=factory))
+            with self.assertRaises(ValueError):
+                list(iter_sweep_evaluations(self.queries, self.engines, 2, "process"))
+        serial = list(iter_sweep_evaluations(self.queries, self.engines))
+        self.assertEqual([(i, r["metrics"]) for i, r in results], [(i, r["metrics"]) for i, r in serial])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,17 @@
 """Unit tests for the dataset validation module."""
 
 import copy
+import json
+import os
+import tempfile
 import unittest
 
 from src.validate_dataset import (
+    build_manifest,
+    collect_opinion_ids,
+    diff_manifests,
+    load_manifest,
+    save_manifest,
     validate_all,
     validate_completeness,
     validate_coverage,
@@ -243,5 +251,78 @@ class TestCompletenessValidation(unittest.TestCase):
         self.assertTrue(any("lobbying" in e for e in errors))
 
 
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_dir = self._tmp.name
+        for year, oid in (("1976", "76188"), ("2000", "00-014"), ("2024", "A-24-003")):
+            self._write(year, oid, {"id": oid})
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _write(self, year: str, oid: str, record: dict, mtime_ns: int | None = None):
+        os.makedirs(os.path.join(self.data_dir, year), exist_ok=True)
+        path = os.path.join(self.data_dir, year, f"{oid}.json")
+        with open(path, "w") as f:
+            json.dump(record, f)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    def test_first_build_reports_everything_added(self):
+        manifest = build_manifest(self.data_dir)
+        self.assertEqual(set(manifest["opinions"]), {"76188", "00-014", "A-24-003"})
+        self.assertEqual(manifest["opinions"]["76188"]["path"], os.path.join("1976", "76188.json"))
+        changes = diff_manifests(None, manifest)
+        self.assertEqual(changes["added"], ["00-014", "76188", "A-24-003"])
+
+    def test_manifest_and_id_set_agree(self):
+        # Stray files at the top level and non-JSON files are skipped by both
+        with open(os.path.join(self.data_dir, "README.json"), "w") as f:
+            f.write("{}")
+        with open(os.path.join(self.data_dir, "2000", "notes.txt"), "w") as f:
+            f.write("x")
+        self.assertEqual(set(build_manifest(self.data_dir)["opinions"]), collect_opinion_ids(self.data_dir))
+        self.assertEqual(collect_opinion_ids(self.data_dir), {"76188", "00-014", "A-24-003"})
+
+    def test_detects_added_removed_modified(self):
+        old = build_manifest(self.data_dir)
+        os.remove(os.path.join(self.data_dir, "1976", "76188.json"))
+        self._write("2000", "00-014", {"id": "00-014", "edited": True})
+        self._write("2019", "I-19-145", {"id": "I-19-145"})
+        changes = diff_manifests(old, build_manifest(self.data_dir, old))
+        self.assertEqual(changes, {"added": ["I-19-145"], "removed": ["76188"], "modified": ["00-014"]})
+
+    def test_touch_without_content_change_is_not_modified(self):
+        old = build_manifest(self.data_dir)
+        self._write("2024", "A-24-003", {"id": "A-24-003"}, mtime_ns=1_000_000_000)
+        changes = diff_manifests(old, build_manifest(self.data_dir, old))
+        self.assertEqual(changes["modified"], [])
+
+    def test_unchanged_files_reuse_previous_hash(self):
+        old = build_manifest(self.data_dir)
+        # A stale hash survives because mtime and size still match, proving no re-read
+        old["opinions"]["76188"]["sha256"] = "cached"
+        new = build_manifest(self.data_dir, old)
+        self.assertEqual(new["opinions"]["76188"]["sha256"], "cached")
+
+    def test_save_and_load_round_trip(self):
+        manifest = build_manifest(self.data_dir)
+        path = os.path.join(self.data_dir, "manifest.json")
+        save_manifest(manifest, path)
+        self.assertEqual(load_manifest(path), manifest)
+        self.assertIsNone(load_manifest(os.path.join(self.data_dir, "missing.json")))
+
+    def test_integrity_check_uses_manifest_ids(self):
+        ds = make_mini_dataset()
+        # None of the dataset's opinions exist on disk, so a directory walk would fail
+        judged = {j["opinion_id"] for q in ds["queries"] for j in q["relevance_judgments"]}
+        errors, _ = validate_all(ds, data_dir=self.data_dir, corpus_ids=judged)
+        self.assertEqual(errors, [])
+        errors, _ = validate_all(ds, data_dir=self.data_dir)
+        self.assertTrue(any("missing opinion" in e for e in errors))
+
+
 if __name__ == "__main__":
     unittest.main()